@@ -0,0 +1,261 @@
+"""
+Balances of payment sources over time, from `BalanceSnapshot`.
+
+`ledger` records the net change of every source per UTC day in the same DB
+transaction as the balance change, so the rows are never behind and a write
+dated in the past only adds to its own day. A source's balance at the end
+of a day is its current balance minus everything that changed after it, so
+a history is one query: the changes summed per period (days before the
+range fold into one row, days after it into another) with running totals
+from window functions. Its cost depends on the number of days with
+changes, not the number of transactions.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from uuid import UUID
+from sqlalchemy import Date, case, func, literal, type_coerce
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db import async_engine, insert_on_conflict
+from models import Bank, BalanceSnapshot, Card, Cash, Currency, PaymentType, Resolution
+from fx import RateTable, currency_codes, day_numbers
+import numpy as np
+
+# rows per upsert statement, 5 parameters each.
+UPSERT_BATCH_SIZE = 1000
+
+# labels of the rows days outside the range are summed into.
+BEFORE = date.min
+AFTER = date.max
+
+
+def upsert_statements(deltas: dict[tuple, float]) -> list:
+    """
+    `INSERT .. ON CONFLICT DO UPDATE` statements adding `{(user_id, payment
+    type, source id, day): delta}` to the stored snapshots, in key order so
+    concurrent requests lock rows in the same order.
+    """
+    rows = [
+        {"user_id": user_id, "payment_source_type": payment_type, "payment_source_id": source_id, "day": day, "delta": delta}
+        for (user_id, payment_type, source_id, day), delta in sorted(deltas.items())
+        # an update that didn't move the balance cancels out.
+        if delta
+    ]
+    table = BalanceSnapshot.__table__
+    statements = []
+
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        statement = insert_on_conflict(table).values(rows[start:start + UPSERT_BATCH_SIZE])
+        statements.append(statement.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={"delta": table.c.delta + statement.excluded.delta},
+        ))
+
+    return statements
+
+def period_start(day: date, resolution: Resolution) -> date:
+    if resolution == Resolution.WEEK:
+        return day - timedelta(days=day.weekday())
+    if resolution == Resolution.MONTH:
+        return day.replace(day=1)
+    if resolution == Resolution.YEAR:
+        return day.replace(month=1, day=1)
+
+    return day
+
+def next_period(start: date, resolution: Resolution) -> date | None:
+    """
+    Start of the period after the one starting on `start`, None when that
+    would be past `date.max`.
+    """
+    try:
+        if resolution == Resolution.WEEK:
+            return start + timedelta(days=7)
+        if resolution == Resolution.MONTH:
+            return (start + timedelta(days=32)).replace(day=1)
+        if resolution == Resolution.YEAR:
+            return start.replace(year=start.year + 1)
+
+        return start + timedelta(days=1)
+    except (OverflowError, ValueError):
+        return None
+
+def period_count(from_date: date, to_date: date, resolution: Resolution) -> int:
+    """
+    `len(periods(from_date, to_date, resolution))`, without building them.
+    """
+    if from_date > to_date:
+        return 0
+    if resolution == Resolution.WEEK:
+        return (period_start(to_date, resolution) - period_start(from_date, resolution)).days // 7 + 1
+    if resolution == Resolution.MONTH:
+        return (to_date.year - from_date.year) * 12 + to_date.month - from_date.month + 1
+    if resolution == Resolution.YEAR:
+        return to_date.year - from_date.year + 1
+
+    return (to_date - from_date).days + 1
+
+def periods(from_date: date, to_date: date, resolution: Resolution) -> list[date]:
+    starts = []
+    start = period_start(from_date, resolution)
+
+    while start is not None and start <= to_date:
+        starts.append(start)
+        start = next_period(start, resolution)
+
+    return starts
+
+def _period_column(resolution: Resolution):
+    # weeks start on monday, as in `period_start`.
+    day = BalanceSnapshot.day
+
+    if resolution == Resolution.DAY:
+        return day
+
+    if async_engine.dialect.name == "sqlite":
+        # dates are stored as YYYY-MM-DD text.
+        formats = {
+            Resolution.WEEK: func.date(day, func.printf("-%d days", (func.strftime("%w", day) + 6) % 7)),
+            Resolution.MONTH: func.strftime("%Y-%m-01", day),
+            Resolution.YEAR: func.strftime("%Y-01-01", day),
+        }
+        return type_coerce(formats[resolution], Date)
+
+    return func.date_trunc(resolution.value, day).cast(Date)
+
+async def load_sources(db: AsyncSession, user_id: UUID) -> list[dict]:
+    """
+    The user's payment sources with their current balance, as the history counts it.
+    """
+    banks = (await db.exec(select(Bank).filter(Bank.user_id == user_id))).all()
+    cards = (await db.exec(select(Card).filter(Card.user_id == user_id))).all()
+    cash = (await db.exec(select(Cash).filter(Cash.user_id == user_id))).all()
+
+    return [
+        *({"type": PaymentType.BANK, "source": bank, "name": bank.name, "balance": bank.amount} for bank in banks),
+        # money in lowers the usage, see ledger.SIGNS.
+        *({"type": PaymentType.CARD, "source": card, "name": card.name, "balance": -card.current_usage} for card in cards),
+        *({"type": PaymentType.CASH, "source": cash, "name": "Cash", "balance": cash.amount} for cash in cash),
+    ]
+
+def base_net_worth(sources: list[dict], ends: list[date], rates: RateTable, base_currency: Currency) -> list[float | None]:
+    """
+    The sum of all `sources`' balances converted to `base_currency` at the
+    rates of each of `ends`, one array operation for all of them.
+    """
+    if not sources:
+        return [0.0] * len(ends)
+
+    # a source adds nothing before it existed (None, read as NaN).
+    balances = np.nan_to_num(np.array([source["balances"] for source in sources], dtype=np.float64), nan=0.0)
+    currencies = currency_codes(source["currency"] for source in sources)
+    totals = rates.convert(balances, currencies[:, None], day_numbers(ends)[None, :], base_currency).sum(axis=0)
+
+    # NaN, where a rate was missing, is the only value unequal to itself.
+    return [None if total != total else total for total in np.round(totals, 2).tolist()]
+
+async def history(
+    db: AsyncSession,
+    user_id: UUID,
+    resolution: Resolution,
+    from_date: date,
+    to_date: date,
+    rates: RateTable,
+    base_currency: Currency,
+) -> dict:
+    """
+    Balance of every payment source of the user, and their sum per
+    currency and in `base_currency`, at the end of every `resolution`
+    period from `from_date` to `to_date`, in the shape of `BalanceHistory`.
+    """
+    column = _period_column(resolution)
+    period = case(
+        (BalanceSnapshot.day < from_date, literal(BEFORE, Date)),
+        (BalanceSnapshot.day > to_date, literal(AFTER, Date)),
+        else_=column,
+    )
+    changes = (
+        select(
+            BalanceSnapshot.payment_source_type,
+            BalanceSnapshot.payment_source_id,
+            type_coerce(period, Date).label("period_start"),
+            BalanceSnapshot.delta,
+        )
+        .filter(BalanceSnapshot.user_id == user_id)
+        .subquery()
+    )
+    per_period = (
+        select(
+            changes.c.payment_source_type,
+            changes.c.payment_source_id,
+            changes.c.period_start,
+            func.sum(changes.c.delta).label("delta"),
+        )
+        .group_by(changes.c.payment_source_type, changes.c.payment_source_id, changes.c.period_start)
+        # a day whose transactions were all removed again sums to nothing.
+        .having(func.abs(func.sum(changes.c.delta)) > 1e-9)
+        .subquery()
+    )
+    source = (per_period.c.payment_source_type, per_period.c.payment_source_id)
+    query = select(
+        *source,
+        per_period.c.period_start,
+        func.sum(per_period.c.delta).over(partition_by=source, order_by=per_period.c.period_start).label("running"),
+        func.sum(per_period.c.delta).over(partition_by=source).label("total"),
+    ).order_by(*source, per_period.c.period_start)
+
+    rows = defaultdict(list)
+    # plain rows through core; a daily chart has thousands and needs no ORM.
+    connection = await db.connection()
+    for payment_type, source_id, start, running, total in await connection.execute(query):
+        rows[(PaymentType(payment_type), source_id)].append((start, running, total))
+
+    starts = periods(from_date, to_date, resolution)
+    net_worth = defaultdict(lambda: [0.0] * len(starts))
+    sources = []
+
+    for source in await load_sources(db, user_id):
+        changed = rows.get((source["type"], source["source"].id), [])
+        # the balance before the first recorded change.
+        opening = source["balance"] - (changed[0][2] if changed else 0)
+        balances = {start: opening + running for start, running, _ in changed}
+
+        created = source["source"].created_at.date()
+        first_change = changed[0][0] if changed else created
+        exists_from = period_start(min(created, first_change, to_date), resolution)
+
+        balance = balances.get(BEFORE, opening)
+        totals = net_worth[source["source"].currency]
+        series = []
+
+        for index, start in enumerate(starts):
+            balance = balances.get(start, balance)
+
+            if start < exists_from:
+                series.append(None)
+            else:
+                series.append(round(balance, 2))
+                totals[index] += balance
+
+        sources.append({
+            "payment_source_type": source["type"],
+            "payment_source_id": source["source"].id,
+            "name": source["name"],
+            "currency": source["source"].currency,
+            "balances": series,
+        })
+
+    # periods are back to back, each ends the day before the next starts.
+    ends = [start - timedelta(days=1) for start in starts[1:]] + [to_date]
+
+    return {
+        "resolution": resolution,
+        "periods": starts,
+        "sources": sources,
+        "net_worth": [
+            {"currency": currency, "balances": [round(total, 2) for total in totals]}
+            for currency, totals in sorted(net_worth.items())
+        ],
+        "base_currency": base_currency,
+        "base_net_worth": base_net_worth(sources, ends, rates, base_currency),
+    }
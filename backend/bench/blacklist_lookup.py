@@ -0,0 +1,151 @@
+"""
+Lookup latency of the token blacklist with a large table (10M rows by
+default), half of them expired.
+
+Times, over `--lookups` random keys each,
+  - hit / miss: `jti_hash = ?` point lookups on the unique index
+  - revoke:     the conflict-tolerant insert of `blacklist_token` for a
+                hash that is already there
+  - legacy:     the old lookup by full token text without an index, on a
+                separate table of `--legacy-rows` rows (skipped when 0)
+
+    DB_URL=postgresql://... uv run python manage.py migrate
+    DB_URL=postgresql://... uv run python bench/blacklist_lookup.py --rows 10000000 --purge
+
+`--purge` finally runs `purge_expired_tokens` once and times it (the next
+run seeds the deleted rows again). Seeding is skipped when the table
+already has `--rows` rows.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, text
+from sqlmodel import Session, select
+
+from db import async_engine, async_session, engine, insert_on_conflict
+from models import Token
+from routes.utils import purge_expired_tokens
+
+BATCH = 100_000
+LEGACY_TOKEN_LENGTH = 220
+
+
+def key(i: int) -> str:
+    return hashlib.sha256(f"bench-{i}".encode()).hexdigest()
+
+def seed(rows: int) -> None:
+    with Session(engine) as db:
+        existing = db.exec(select(func.count()).select_from(Token)).one()
+        if existing >= rows:
+            return
+
+        print(f"seeding {rows} rows")
+        db.exec(text("DELETE FROM token_blacklist"))
+
+        if engine.dialect.name == "postgresql":
+            # expiries spread evenly from a day ago to a day ahead: the first half is expired.
+            db.exec(text("""
+                INSERT INTO token_blacklist (jti_hash, expires_at, created_at)
+                SELECT encode(sha256(('bench-' || i)::bytea), 'hex'),
+                       now() - interval '1 day' + i * (interval '2 days' / :rows),
+                       now()
+                FROM generate_series(0, :rows - 1) AS i
+            """), params={"rows": rows})
+        else:
+            start = datetime.now(timezone.utc) - timedelta(days=1)
+            step = timedelta(days=2) / rows
+            for offset in range(0, rows, BATCH):
+                db.exec(insert(Token), params=[
+                    {"jti_hash": key(i), "expires_at": start + i * step, "created_at": start}
+                    for i in range(offset, min(offset + BATCH, rows))
+                ])
+
+        db.commit()
+        db.exec(text("ANALYZE"))
+        db.commit()
+
+def seed_legacy(rows: int) -> Table:
+    table = Table(
+        "token_blacklist_legacy", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("token", String, nullable=False),
+        Column("expries_at", DateTime, nullable=False),
+    )
+    table.create(engine, checkfirst=True)
+
+    with Session(engine) as db:
+        if db.exec(select(func.count()).select_from(table)).one() < rows:
+            print(f"seeding {rows} legacy rows")
+            db.exec(table.delete())
+            for offset in range(0, rows, BATCH):
+                db.exec(insert(table), params=[
+                    {"token": (key(i) * 4)[:LEGACY_TOKEN_LENGTH], "expries_at": datetime.now()}
+                    for i in range(offset, min(offset + BATCH, rows))
+                ])
+            db.commit()
+
+    return table
+
+def timed(label: str, statements: list) -> None:
+    latencies = []
+
+    with Session(engine) as db:
+        for statement in statements:
+            start = time.perf_counter()
+            db.exec(statement)
+            latencies.append((time.perf_counter() - start) * 1000)
+        db.commit()
+
+    latencies.sort()
+    print(
+        f"{label:>8} {len(latencies):>8} {statistics.median(latencies):>9.3f} "
+        f"{latencies[int(len(latencies) * 0.99) - 1]:>9.3f} {latencies[-1]:>9.3f}"
+    )
+
+async def purge() -> None:
+    async with async_session() as db:
+        start = time.perf_counter()
+        deleted = await purge_expired_tokens(db)
+        print(f"purged {deleted} expired rows in {time.perf_counter() - start:.1f}s")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    parser.add_argument("--legacy-rows", type=int, default=0)
+    parser.add_argument("--purge", action="store_true")
+    args = parser.parse_args()
+
+    engine.echo = async_engine.echo = False
+    seed(args.rows)
+
+    hits = [key(random.randrange(args.rows)) for _ in range(args.lookups)]
+    misses = [key(args.rows + i) for i in range(args.lookups)]
+    lookup = lambda jti_hash: select(Token.id).filter(Token.jti_hash == jti_hash)
+
+    print(f"{'':>8} {'queries':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    timed("hit", [lookup(jti_hash) for jti_hash in hits])
+    timed("miss", [lookup(jti_hash) for jti_hash in misses])
+    timed("revoke", [
+        insert_on_conflict(Token)
+        .values(jti_hash=jti_hash, expires_at=datetime.now(timezone.utc), created_at=datetime.now(timezone.utc))
+        .on_conflict_do_nothing(index_elements=["jti_hash"])
+        for jti_hash in hits
+    ])
+
+    if args.legacy_rows:
+        legacy = seed_legacy(args.legacy_rows)
+        tokens = [(key(random.randrange(args.legacy_rows)) * 4)[:LEGACY_TOKEN_LENGTH] for _ in range(20)]
+        timed("legacy", [select(legacy.c.id).where(legacy.c.token == token) for token in tokens])
+
+    if args.purge:
+        engine.dispose()
+        asyncio.run(purge())
@@ -0,0 +1,101 @@
+"""
+Measures how one uvicorn worker holds up as concurrency grows, with a mix of
+authenticated reads (`/users/me`, `/payment/banks/`, `/transactions/`).
+
+    uv run uvicorn main:app --workers 1 &
+    uv run python bench/concurrency.py --url http://localhost:8000 --levels 1 10 50 200
+
+For every level prints throughput and p50/p99 latency. With a blocking
+database layer throughput flattens once the threadpool (40 threads) is busy.
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+import uuid
+
+import httpx
+
+ENDPOINTS = ["/api/v1/users/me", "/api/v1/payment/banks/", "/api/v1/transactions/"]
+
+
+async def setup(client: httpx.AsyncClient) -> dict:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "bench-password"
+
+    await client.post("/api/v1/auth/register", json={"first_name": "bench", "email": email, "password": password})
+    response = await client.post("/api/v1/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    bank = await client.post("/api/v1/payment/banks/", headers=headers, json={
+        "name": "bench",
+        "account_no": uuid.uuid4().hex[:16],
+    })
+    bank.raise_for_status()
+
+    for i in range(20):
+        await client.post("/api/v1/transactions/add", headers=headers, json={
+            "amount": 10 + i,
+            "category": "bench",
+            "type": "Expense",
+            "payment_source_id": bank.json()["id"],
+            "payment_source_type": "Bank",
+        })
+
+    return headers
+
+async def run_level(client: httpx.AsyncClient, headers: dict, concurrency: int, total: int) -> dict:
+    endpoints = itertools.cycle(ENDPOINTS)
+    latencies = []
+    failures = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, failures
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.get(next(endpoints), headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "failures": failures,
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+async def run(url: str, levels: list[int], total: int) -> None:
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        headers = await setup(client)
+
+        print(f"{'concurrency':>12} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'failures':>9}")
+        for level in levels:
+            result = await run_level(client, headers, level, total)
+            print(
+                f"{result['concurrency']:>12} {result['rps']:>10.1f} {result['p50_ms']:>10.2f} "
+                f"{result['p99_ms']:>10.2f} {result['failures']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--requests", type=int, default=3000, help="requests per concurrency level")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.levels, args.requests))
@@ -0,0 +1,98 @@
+"""
+A stand-in for the Ollama server, for testing and benchmarking the extraction
+engine without a model.
+
+It answers `POST /api/chat` like Ollama does for the engine's batch prompts,
+reading each input with a few regexes. Prompts are served one at a time,
+each taking `--latency-ms` plus `--per-item-ms` for every text in it, like a
+single GPU where a bigger batch costs little extra.
+
+    uv run python bench/fake_ollama.py --port 11435
+    OLLAMA_HOST=http://localhost:11435 uv run uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+from datetime import datetime, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+AMOUNT = re.compile(r"(\d+(?:\.\d+)?)")
+INCOME = re.compile(r"\b(received|got|salary|earned|refund|credited)\b", re.I)
+CARD = re.compile(r"\b(\w+)\s+(?:credit\s+|debit\s+)?card\b", re.I)
+BANK = re.compile(r"\b(?:from|via|through|with|using|in|to)\s+(?:my\s+)?(\w+)(?:\s+(?:bank|account))?\b", re.I)
+CATEGORY = re.compile(r"\b(?:on|for)\s+(\w+)", re.I)
+
+app = FastAPI()
+gpu = asyncio.Lock()
+settings = argparse.Namespace(latency_ms=300.0, per_item_ms=30.0)
+
+
+def read(text: str) -> list[dict]:
+    amount = AMOUNT.search(text)
+    if not amount:
+        return []
+
+    card = CARD.search(text)
+    bank = BANK.search(text)
+    category = CATEGORY.search(text)
+
+    if "cash" in text.lower():
+        source_type, source_name = "Cash", None
+    elif card:
+        source_type, source_name = "Card", card.group(1)
+    elif bank:
+        source_type, source_name = "Bank", bank.group(1)
+    else:
+        source_type, source_name = None, None
+
+    return [{
+        "amount": float(amount.group(1)),
+        "type": "Income" if INCOME.search(text) else "Expense",
+        "category": category.group(1).lower() if category else "general",
+        "date": None,
+        "description": text[:80],
+        "payment_source_type": source_type,
+        "payment_source_name": source_name,
+    }]
+
+@app.post("/api/chat")
+async def chat(request: Request) -> dict:
+    body = await request.json()
+    inputs = json.loads(body["messages"][-1]["content"])["inputs"]
+
+    async with gpu:
+        started = time.perf_counter()
+        await asyncio.sleep((settings.latency_ms + settings.per_item_ms * len(inputs)) / 1000)
+        elapsed = time.perf_counter() - started
+
+    content = json.dumps({
+        "results": [{"index": item["index"], "transactions": read(item["text"])} for item in inputs]
+    })
+    # roughly a token per 4 characters.
+    eval_count = len(content) // 4
+
+    return {
+        "model": body.get("model", "fake"),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": content},
+        "done": True,
+        "done_reason": "stop",
+        "total_duration": int(elapsed * 1e9),
+        "prompt_eval_count": len(json.dumps(body["messages"])) // 4,
+        "eval_count": eval_count,
+        "eval_duration": int(elapsed * 1e9),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="fixed cost of a prompt")
+    parser.add_argument("--per-item-ms", type=float, default=30.0, help="extra cost per text in a prompt")
+    parser.parse_args(namespace=settings)
+
+    uvicorn.run(app, port=settings.port, log_level="warning")
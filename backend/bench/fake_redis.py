@@ -0,0 +1,135 @@
+"""
+A stand-in for a Redis server, for testing and benchmarking the response
+cache (response_cache.py) without one.
+
+It speaks enough RESP for redis-py's asyncio client: PING, GET, SET (with
+EX/PX/NX/XX), DEL, EXISTS, FLUSHALL and DBSIZE. Anything else used on
+connect (HELLO, CLIENT SETINFO, SELECT) is acknowledged, in RESP2 or RESP3. Data is one dict,
+expired lazily on read.
+
+    uv run python bench/fake_redis.py --port 6380
+    RESPONSE_CACHE=redis://localhost:6380 uv run uvicorn main:app
+"""
+import argparse
+import asyncio
+import time
+
+store: dict[bytes, tuple[bytes, float | None]] = {}
+
+
+def _live(key: bytes) -> bytes | None:
+    entry = store.get(key)
+    if entry is None:
+        return None
+
+    value, expires_at = entry
+    if expires_at is not None and expires_at <= time.monotonic():
+        del store[key]
+        return None
+
+    return value
+
+def _bulk(value: bytes | None) -> bytes | None:
+    if value is None:
+        return None
+
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+def _set(args: list[bytes]) -> bytes | None:
+    key, value, *options = args
+    expires_at = None
+    exists = _live(key) is not None
+    options = [option.upper() for option in options]
+
+    for flag, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+        if flag in options:
+            expires_at = time.monotonic() + int(options[options.index(flag) + 1]) * scale
+
+    if (b"NX" in options and exists) or (b"XX" in options and not exists):
+        return None
+
+    store[key] = (value, expires_at)
+
+    return b"+OK\r\n"
+
+def handle(command: list[bytes], session: dict) -> bytes | None:
+    """
+    The reply to `command`, None for a null reply. `session` holds the
+    connection's protocol version, which only HELLO changes.
+    """
+    name, args = command[0].upper(), command[1:]
+
+    match name:
+        case b"PING":
+            return _bulk(args[0]) if args else b"+PONG\r\n"
+        case b"GET":
+            return _bulk(_live(args[0]))
+        case b"SET":
+            return _set(args)
+        case b"DEL":
+            return b":%d\r\n" % sum(store.pop(key, None) is not None for key in args)
+        case b"EXISTS":
+            return b":%d\r\n" % sum(_live(key) is not None for key in args)
+        case b"DBSIZE":
+            return b":%d\r\n" % len(store)
+        case b"FLUSHALL" | b"FLUSHDB":
+            store.clear()
+            return b"+OK\r\n"
+        case b"CLIENT" | b"SELECT":
+            return b"+OK\r\n"
+        case b"HELLO":
+            session["protocol"] = protocol = args[0] if args else session["protocol"]
+            fields = b"".join(_bulk(field) for field in (b"server", b"redis", b"version", b"7.0.0", b"proto"))
+            header = b"%3\r\n" if protocol == b"3" else b"*6\r\n"
+            return header + fields + b":%s\r\n" % protocol
+        case _:
+            return b"-ERR unknown command '%s'\r\n" % name
+
+async def read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+    line = await reader.readline()
+    if not line:
+        return None
+
+    if not line.startswith(b"*"):
+        # inline command, as typed into `nc`.
+        return line.split()
+
+    command = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        command.append((await reader.readexactly(length + 2))[:-2])
+
+    return command
+
+async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    session = {"protocol": b"2"}
+
+    try:
+        while (command := await read_command(reader)) is not None:
+            if command:
+                reply = handle(command, session)
+                if reply is None:
+                    # the only reply that's spelled differently in RESP3, besides HELLO's map.
+                    reply = b"_\r\n" if session["protocol"] == b"3" else b"$-1\r\n"
+
+                writer.write(reply)
+                await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def main(host: str, port: int) -> None:
+    server = await asyncio.start_server(serve, host, port)
+
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.host, args.port))
@@ -0,0 +1,100 @@
+"""
+Cost of converting amounts in mixed currencies on different days to one
+currency (fx.py), for:
+
+  - per row:    a Python loop looking up both rates of each row in a
+                `{(day, currency): per_usd}` dict
+  - vectorized: `RateTable.convert` over arrays of the whole set
+  - + arrays:   the same, including turning Python lists of currencies and
+                dates into the arrays it takes
+
+Runs in-process on random rates and amounts, no database involved:
+
+    uv run python bench/fx_conversion.py --rows 1000000 --repeat 5
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from fx import CURRENCIES, RateTable, currency_codes, day_numbers
+from models import Currency
+
+
+def rates(days: int, seed: int) -> list[tuple[date, Currency, float]]:
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    base = {Currency.EUR: 0.9, Currency.GBP: 0.8, Currency.INR: 83.0, Currency.JPY: 150.0}
+
+    return [
+        (start + timedelta(days=day), currency, rate * rng.uniform(0.95, 1.05))
+        for day in range(days)
+        # weekends have no rates, the table fills them in.
+        if (start + timedelta(days=day)).weekday() < 5
+        for currency, rate in base.items()
+    ]
+
+def per_row(lookup: dict, amounts: list[float], currencies: list[Currency], days: list[date], to: Currency) -> list[float]:
+    converted = []
+
+    for amount, currency, day in zip(amounts, currencies, days):
+        while (day, Currency.INR) not in lookup:
+            day -= timedelta(days=1)
+        source = 1.0 if currency == Currency.USD else lookup[(day, currency)]
+        target = 1.0 if to == Currency.USD else lookup[(day, to)]
+        converted.append(amount * target / source)
+
+    return converted
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=5 * 365, help="days of rates")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    loaded = rates(args.days, args.seed)
+    start = time.perf_counter()
+    table = RateTable(loaded)
+    build = time.perf_counter() - start
+    lookup = {(day, currency): rate for day, currency, rate in loaded}
+
+    rng = random.Random(args.seed)
+    first = min(day for day, _, _ in loaded)
+    amounts = [rng.uniform(1, 10_000) for _ in range(args.rows)]
+    currencies = [rng.choice(CURRENCIES) for _ in range(args.rows)]
+    # from the first weekday with rates on, so the per row lookups can step back.
+    days = [first + timedelta(days=rng.randrange(args.days)) for _ in range(args.rows)]
+
+    amount_array = np.array(amounts)
+    code_array = currency_codes(currencies)
+    day_array = day_numbers(days)
+
+    expected = per_row(lookup, amounts[:1000], currencies[:1000], days[:1000], Currency.INR)
+    actual = table.convert(amount_array[:1000], code_array[:1000], day_array[:1000], Currency.INR)
+    assert np.allclose(expected, actual), "vectorized conversion disagrees with the per row one"
+
+    results = {
+        "per row": timed(lambda: per_row(lookup, amounts, currencies, days, Currency.INR), args.repeat),
+        "vectorized": timed(lambda: table.convert(amount_array, code_array, day_array, Currency.INR), args.repeat),
+        "+ arrays": timed(lambda: table.convert(np.array(amounts), currency_codes(currencies), day_numbers(days), Currency.INR), args.repeat),
+    }
+
+    print(f"{args.rows} amounts, {len(loaded)} rates over {args.days} days (table built in {build * 1000:.1f}ms)")
+    for name, seconds in results.items():
+        print(f"  {name:<12} {seconds * 1000:9.1f}ms  {args.rows / seconds / 1e6:7.1f}M/s  {results['per row'] / seconds:6.1f}x")
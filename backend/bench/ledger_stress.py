@@ -0,0 +1,119 @@
+"""
+Hammers one card from many threads and checks that its balance adds up.
+
+Every thread adds expenses and refunds to the same card and deletes some of
+them again. Balance changes are applied in SQL, so no update may be lost: at
+the end `current_usage` and `balance` must match what the surviving
+transactions imply.
+
+    uv run uvicorn main:app --workers 4 &
+    uv run python bench/ledger_stress.py --url http://localhost:8000 --threads 32 --ops 200
+
+Exits with 1 if the balance doesn't add up.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+LIMIT = 1_000_000.0
+START_USAGE = 1_000.0
+
+
+def setup(url: str) -> tuple[dict, str]:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "bench-password"
+
+    with httpx.Client(base_url=url, timeout=60) as client:
+        client.post("/api/v1/auth/register", json={"first_name": "bench", "email": email, "password": password})
+        response = client.post("/api/v1/auth/login", data={"username": email, "password": password})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        card = client.post("/api/v1/payment/card/", headers=headers, json={
+            "name": "bench",
+            "limit": LIMIT,
+            "current_usage": START_USAGE,
+            "issuing_bank_name": "bench",
+            "network": "bench",
+        })
+        card.raise_for_status()
+
+    return headers, card.json()["id"]
+
+def hammer(url: str, headers: dict, card_id: str, ops: int, seed: int) -> tuple[float, int]:
+    """
+    Runs `ops` writes against the card. Returns the usage change of the
+    transactions it left in place and the number of failed requests.
+    """
+    rng = random.Random(seed)
+    kept = {}
+    failures = 0
+
+    with httpx.Client(base_url=url, headers=headers, timeout=60) as client:
+        for _ in range(ops):
+            if kept and rng.random() < 0.2:
+                transaction_id = rng.choice(list(kept))
+                response = client.request("DELETE", "/api/v1/transactions/remove", json={"transaction_id": transaction_id})
+                if response.status_code == 200:
+                    del kept[transaction_id]
+                else:
+                    failures += 1
+                continue
+
+            amount = rng.randint(1, 10_000) / 100
+            transaction_type = "Expense" if rng.random() < 0.8 else "Income"
+            response = client.post("/api/v1/transactions/add", json={
+                "amount": amount,
+                "category": "bench",
+                "type": transaction_type,
+                "payment_source_id": card_id,
+                "payment_source_type": "Card",
+            })
+
+            if response.status_code == 201:
+                kept[response.json()["id"]] = amount if transaction_type == "Expense" else -amount
+            else:
+                failures += 1
+
+    return sum(kept.values()), failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=200, help="writes per thread")
+    args = parser.parse_args()
+
+    headers, card_id = setup(args.url)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(
+            lambda seed: hammer(args.url, headers, card_id, args.ops, seed),
+            range(args.threads)
+        ))
+    elapsed = time.perf_counter() - start
+
+    usage_change = sum(change for change, _ in results)
+    failures = sum(failed for _, failed in results)
+    card = httpx.get(f"{args.url}/api/v1/payment/card/{card_id}", headers=headers).raise_for_status().json()
+
+    expected_usage = START_USAGE + usage_change
+    ok = (
+        abs(card["current_usage"] - expected_usage) < 1e-6
+        and abs(card["balance"] - (LIMIT - expected_usage)) < 1e-6
+    )
+
+    print(f"{args.threads * args.ops} writes from {args.threads} threads in {elapsed:.1f}s ({failures} failed requests)")
+    print(f"usage:   expected {expected_usage:.2f}, got {card['current_usage']:.2f}")
+    print(f"balance: expected {LIMIT - expected_usage:.2f}, got {card['balance']:.2f}")
+    print("ok" if ok else "MISMATCH")
+
+    sys.exit(0 if ok else 1)
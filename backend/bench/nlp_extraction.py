@@ -0,0 +1,65 @@
+"""
+Throughput of the extraction engine against the fake Ollama server, with and
+without micro-batching.
+
+    uv run python bench/fake_ollama.py --port 11435 &
+    uv run python bench/nlp_extraction.py --host http://localhost:11435 --requests 200 --concurrency 50
+
+For every batch size prints requests/s, latency and the engine's own stats
+(tokens/s, queue wait).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from ollama import AsyncClient
+
+from nlp import ExtractionEngine
+
+TEXTS = [
+    "spent 250 on groceries with hdfc card",
+    "paid 1200 for rent from sbi account",
+    "received 50000 salary in icici",
+    "120 on coffee cash",
+    "uber 340 via axis card",
+]
+
+
+async def run(host: str, batch_size: int, requests: int, concurrency: int) -> None:
+    engine = ExtractionEngine(client=AsyncClient(host=host), batch_size=batch_size, max_concurrency=1, timeout=120)
+    engine.start()
+    latencies = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with limit:
+            start = time.perf_counter()
+            await engine.extract(f"{TEXTS[i % len(TEXTS)]} #{i}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stats = engine.stats()
+    await engine.stop()
+
+    latencies.sort()
+    print(
+        f"{batch_size:>6} {requests / elapsed:>8.1f} {statistics.median(latencies):>9.0f} "
+        f"{latencies[int(len(latencies) * 0.99) - 1]:>9.0f} {stats['avg_batch_size']:>10.1f} "
+        f"{stats['tokens_per_second']:>8.0f} {stats['queue_wait_avg_ms']:>10.0f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="http://localhost:11435")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'avg batch':>10} {'tok/s':>8} {'wait ms':>10}")
+    for batch_size in args.batch_sizes:
+        asyncio.run(run(args.host, batch_size, args.requests, args.concurrency))
@@ -0,0 +1,128 @@
+"""
+Cost of turning ORM rows into a JSON response body, per 10k rows, for the
+ways handlers have built responses:
+
+  - copy + json:   `[CardResponse(**row.__dict__) ...]` returned to FastAPI,
+                   which validates and encodes it again, rendered by the
+                   stdlib `JSONResponse` (the old handlers)
+  - rows + orjson: the rows returned as they are, validated once by FastAPI
+                   and rendered by `ORJSONResponse` (single-object handlers)
+  - serialize:     `serialization.dump_json`, one validation from attributes
+                   and pydantic-core's JSON encoder (list endpoints)
+
+Runs in-process on detached rows, no database or HTTP involved:
+
+    uv run python bench/response_serialization.py --rows 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from models import (
+    Bank,
+    BankResponse,
+    Card,
+    CardResponse,
+    PaymentType,
+    Transaction,
+    TransactionPage,
+    TransactionType,
+)
+from serialization import dump_json
+
+
+def cards(rows: int) -> list[Card]:
+    now = datetime.now(timezone.utc)
+    return [
+        Card(
+            id=uuid.uuid4(), user_id=uuid.uuid4(), name=f"card {i}", limit=100_000.0, current_usage=i * 1.5,
+            balance=100_000.0 - i * 1.5, currency="INR", issuing_bank_name="hdfc", network="visa",
+            created_at=now, updated_at=now,
+        )
+        for i in range(rows)
+    ]
+
+def banks(rows: int) -> list[Bank]:
+    now = datetime.now(timezone.utc)
+    return [
+        Bank(
+            id=uuid.uuid4(), user_id=uuid.uuid4(), name=f"bank {i}", account_no=f"{i:012}", amount=i * 10.0,
+            currency="INR", created_at=now, updated_at=now,
+        )
+        for i in range(rows)
+    ]
+
+def transactions(rows: int) -> list[Transaction]:
+    now = datetime.now(timezone.utc)
+    return [
+        Transaction(
+            id=uuid.uuid4(), user_id=uuid.uuid4(), amount=i * 0.75, category="groceries", type=TransactionType.EXPENSE,
+            date=now - timedelta(minutes=i), description=f"transaction {i}", payment_source_id=uuid.uuid4(),
+            payment_source_type=PaymentType.CARD, created_at=now, updated_at=now,
+        )
+        for i in range(rows)
+    ]
+
+def fastapi_body(schema, content, response_class) -> bytes:
+    # what FastAPI does with a handler's return value: validate against the
+    # return type, encode to JSON-able python, render.
+    field = create_model_field(name="Response", type_=schema, mode="serialization")
+    return response_class(asyncio.run(serialize_response(field=field, response_content=content))).body
+
+def timed(fn, repeat: int) -> tuple[float, int]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings), len(body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    card_rows, bank_rows, transaction_rows = cards(args.rows), banks(args.rows), transactions(args.rows)
+    per_10k = 10_000 / args.rows
+
+    cases = {
+        "get_all_cards": {
+            "copy + json": lambda: fastapi_body(
+                list[CardResponse], [CardResponse(**row.__dict__) for row in card_rows], JSONResponse
+            ),
+            "rows + orjson": lambda: fastapi_body(list[CardResponse], card_rows, ORJSONResponse),
+            "serialize": lambda: dump_json(list[CardResponse], card_rows),
+        },
+        "get_bank_accounts": {
+            "copy + json": lambda: fastapi_body(
+                list[BankResponse], [BankResponse(**row.__dict__) for row in bank_rows], JSONResponse
+            ),
+            "rows + orjson": lambda: fastapi_body(list[BankResponse], bank_rows, ORJSONResponse),
+            "serialize": lambda: dump_json(list[BankResponse], bank_rows),
+        },
+        "get_transactions": {
+            "copy + json": lambda: fastapi_body(
+                TransactionPage, TransactionPage(items=transaction_rows, next_cursor=None), JSONResponse
+            ),
+            "rows + orjson": lambda: fastapi_body(
+                TransactionPage, {"items": transaction_rows, "next_cursor": None}, ORJSONResponse
+            ),
+            "serialize": lambda: dump_json(TransactionPage, {"items": transaction_rows, "next_cursor": None}),
+        },
+    }
+
+    print(f"{'endpoint':<18} {'path':<14} {'ms / 10k rows':>14} {'bytes':>10}")
+    for endpoint, paths in cases.items():
+        for path, fn in paths.items():
+            ms, size = timed(fn, args.repeat)
+            print(f"{endpoint:<18} {path:<14} {ms * per_10k:>14.1f} {size:>10}")
@@ -0,0 +1,332 @@
+"""
+Load test of the hot API endpoints, with machine-readable results to compare
+between commits.
+
+Migrates and seeds the database in `DB_URL` (Postgres or SQLite), starts
+`main:app` under uvicorn against it and drives every scenario at every
+concurrency level for `--duration` seconds:
+
+    login         POST /auth/login
+    users_me      GET  /users/me
+    transactions  GET  /transactions/ with rotating filters and a cursor page
+    add           POST /transactions/add
+    payment_list  GET  /payment/banks/, /payment/card/, /payment/cash/
+    dashboard     GET  /dashboard/
+
+    DB_URL=postgresql://... uv run python bench/run.py --users 20 --transactions 2000000 \\
+        --concurrency 1 16 64 --output before.json
+    ... change something ...
+    DB_URL=postgresql://... uv run python bench/run.py --concurrency 1 16 64 \\
+        --output after.json --baseline before.json
+
+The bench users are synthetic histories from datagen.py; users that already
+exist are kept as they are.
+Results are written as JSON (`--output`, default stdout): one entry per
+scenario and concurrency with throughput, error count and p50/p95/p99/max
+latency, plus the commit and settings they were measured with. With
+`--baseline` the change against an earlier result is printed, and
+`--max-regression` fails the run when any p99 got worse by more than that
+many percent.
+
+The load generator is a single asyncio process; keep an eye on its CPU at
+high concurrency, or run it against `--url` of a server on another machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from datagen import Settings, generate
+from db import engine
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = "bench-password"
+CATEGORIES = ["groceries", "rent", "fuel", "dining", "shopping", "utilities", "travel", "health"]
+SCENARIOS = ["login", "users_me", "transactions", "add", "payment_list", "dashboard"]
+PAYMENT_LISTINGS = ["/api/v1/payment/banks/", "/api/v1/payment/card/", "/api/v1/payment/cash/"]
+
+
+def bench_email(index: int) -> str:
+    return f"bench-run-{index}@example.com"
+
+def seed(users: int, transactions: int, jobs: int) -> None:
+    """
+    `users` synthetic users (see datagen.py) with `transactions` rows spread
+    evenly over them.
+    """
+    settings = Settings(users=users, transactions=transactions // users, email="bench-run-{index}@example.com")
+    generate(settings, jobs=jobs, password=PASSWORD, progress=lambda line: print(f"seeded {line}", file=sys.stderr))
+
+
+class Server:
+    """
+    `uvicorn main:app` on `DB_URL`, for the duration of the run.
+    """
+
+    def __init__(self, port: int, workers: int):
+        self.url = f"http://127.0.0.1:{port}"
+        self.command = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+        ]
+        self.process: subprocess.Popen | None = None
+
+    def __enter__(self) -> str:
+        self.process = subprocess.Popen(self.command, cwd=BASE_DIR, stdout=subprocess.DEVNULL)
+        deadline = time.monotonic() + 60
+
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"server exited with {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.url}/openapi.json").status_code == 200:
+                    return self.url
+            except httpx.TransportError:
+                pass
+            time.sleep(0.5)
+
+        raise RuntimeError("server didn't start within 60s")
+
+    def __exit__(self, *exc) -> None:
+        self.process.terminate()
+        self.process.wait(30)
+
+
+class BenchUser:
+    """
+    A logged in bench user and what its requests need.
+    """
+
+    def __init__(self, email: str, headers: dict, sources: list[tuple[str, str]], listings: list[str], cursor: str | None):
+        self.email = email
+        self.headers = headers
+        self.sources = sources
+        # the payment listings that have something to list; the others are 404s.
+        self.listings = listings
+        self.cursor = cursor
+
+async def login(client: httpx.AsyncClient, email: str) -> httpx.Response:
+    return await client.post("/api/v1/auth/login", data={"username": email, "password": PASSWORD})
+
+async def prepare(client: httpx.AsyncClient, users: int) -> list[BenchUser]:
+    bench_users = []
+
+    for index in range(users):
+        response = await login(client, bench_email(index))
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        listings = {}
+        for path in PAYMENT_LISTINGS:
+            response = await client.get(path, headers=headers)
+            if response.is_success:
+                listings[path] = response.json()
+        page = (await client.get("/api/v1/transactions/", headers=headers, params={"n": 50})).json()
+
+        sources = [
+            (source_type, source["id"])
+            for source_type, path in (("Bank", "/api/v1/payment/banks/"), ("Card", "/api/v1/payment/card/"))
+            for source in listings.get(path, [])
+        ]
+        bench_users.append(BenchUser(bench_email(index), headers, sources, list(listings), page["next_cursor"]))
+
+    return bench_users
+
+def request_for(scenario: str, session: BenchUser, rng: random.Random) -> tuple[str, str, dict]:
+    """
+    (method, path, httpx keyword arguments) of one request of `scenario`.
+    """
+    if scenario == "login":
+        return "POST", "/api/v1/auth/login", {"data": {"username": session.email, "password": PASSWORD}}
+
+    if scenario == "users_me":
+        return "GET", "/api/v1/users/me", {"headers": session.headers}
+
+    if scenario == "transactions":
+        now = datetime.now(timezone.utc)
+        params = rng.choice([
+            {},
+            {"n": 50},
+            {"payment_type": rng.choice(["Bank", "Card", "Cash"])},
+            {"from_date": (now - timedelta(days=30)).isoformat(), "to_date": now.isoformat()},
+            {"payment_type": "Bank", "from_date": (now - timedelta(days=7)).isoformat()},
+            {"cursor": session.cursor} if session.cursor else {},
+        ])
+        return "GET", "/api/v1/transactions/", {"headers": session.headers, "params": params}
+
+    if scenario == "add":
+        source_type, source_id = rng.choice(session.sources)
+        return "POST", "/api/v1/transactions/add", {"headers": session.headers, "json": {
+            "amount": round(rng.uniform(10, 500), 2),
+            "category": rng.choice(CATEGORIES),
+            "type": "Expense",
+            "payment_source_id": source_id,
+            "payment_source_type": source_type,
+        }}
+
+    if scenario == "payment_list":
+        path = rng.choice(session.listings)
+        return "GET", path, {"headers": session.headers}
+
+    if scenario == "dashboard":
+        return "GET", "/api/v1/dashboard/", {"headers": session.headers}
+
+    raise ValueError(scenario)
+
+def percentile(latencies: list[float], q: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+async def run_level(
+    client: httpx.AsyncClient, bench_users: list[BenchUser], scenario: str, concurrency: int, duration: float, warmup: float
+) -> dict:
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def worker(index: int):
+        nonlocal errors
+        rng = random.Random(index)
+
+        while (start := time.perf_counter()) < stop_at:
+            method, path, kwargs = request_for(scenario, bench_users[rng.randrange(len(bench_users))], rng)
+            try:
+                ok = (await client.request(method, path, **kwargs)).is_success
+            except httpx.TransportError:
+                ok = False
+
+            if start >= measure_from:
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += not ok
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    latencies.sort()
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+
+async def run(url: str, args: argparse.Namespace) -> list[dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results = []
+
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        bench_users = await prepare(client, args.users)
+
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_level(client, bench_users, scenario, concurrency, args.duration, args.warmup)
+                results.append(result)
+                print(
+                    f"{scenario:<14} {concurrency:>5} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:>8} "
+                    f"p99 {result['p99_ms']:>8} ms  errors {result['errors']}",
+                    file=sys.stderr
+                )
+
+    return results
+
+def git(*command: str) -> str:
+    try:
+        return subprocess.run(["git", *command], cwd=BASE_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+def compare(results: list[dict], baseline: dict) -> float:
+    """
+    Prints the change of every result against `baseline`. Returns the worst
+    p99 regression in percent.
+    """
+    before = {(result["scenario"], result["concurrency"]): result for result in baseline["results"]}
+    worst = 0.0
+
+    print(f"against {baseline['meta'].get('commit', '?')[:10]}:", file=sys.stderr)
+    for result in results:
+        old = before.get((result["scenario"], result["concurrency"]))
+        if not old or not old["p99_ms"] or not result["p99_ms"]:
+            continue
+
+        p99 = (result["p99_ms"] / old["p99_ms"] - 1) * 100
+        rps = (result["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0.0
+        worst = max(worst, p99)
+        print(f"{result['scenario']:<14} {result['concurrency']:>5}  rps {rps:>+7.1f}%  p99 {p99:>+7.1f}%", file=sys.stderr)
+
+    return worst
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=1_000_000, help="seeded transactions across all users")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="processes seeding at once, postgres only")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per scenario and level")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each measurement")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, help="fail if any p99 got worse by more than this many percent")
+    args = parser.parse_args()
+
+    engine.echo = False
+
+    if not args.url:
+        subprocess.run([sys.executable, "manage.py", "migrate"], cwd=BASE_DIR, check=True, stdout=subprocess.DEVNULL)
+        seed(args.users, args.transactions, args.jobs)
+        engine.dispose()
+
+    if args.url:
+        results = asyncio.run(run(args.url, args))
+    else:
+        with Server(args.port, args.workers) as url:
+            results = asyncio.run(run(url, args))
+
+    report = {
+        "meta": {
+            "commit": git("rev-parse", "HEAD"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "database": engine.dialect.name,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "settings": {
+                key: getattr(args, key)
+                for key in ("workers", "users", "transactions", "duration", "warmup", "url")
+            },
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            worst = compare(results, json.load(file))
+
+        if args.max_regression is not None and worst > args.max_regression:
+            print(f"p99 regressed by {worst:.1f}%, more than {args.max_regression}%", file=sys.stderr)
+            sys.exit(1)
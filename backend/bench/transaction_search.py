@@ -0,0 +1,99 @@
+"""
+Latency of `GET /api/v1/transactions/search` (search.py) for users of a
+database filled by `manage.py generate-data`, next to the `LIKE '%word%'`
+scan of the same user's category and description it replaces.
+
+For each query it times the first page over `--users` users:
+  - search: the endpoint, in-process, with the response cache off
+  - like:   `ILIKE` on category or description for the same user, newest
+            first, without ranking (what a filter on the listing would do)
+
+    DB_URL=postgresql://... uv run python manage.py generate-data --users 1000 --transactions 10000
+    DB_URL=postgresql://... uv run python bench/transaction_search.py --users 50
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, or_
+from sqlmodel import Session, select
+
+from db import engine
+from main import app
+from models import Transaction, User
+from response_cache import response_cache
+from routes.utils import generate_jwt_token
+
+QUERIES = ["uber", "rent", "amazon", "groceries", "reliance fresh", "nothing-matches", "sw*", "groc*"]
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    samples = sorted(samples)
+
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+def like_page(user: User, query: str, n: int) -> None:
+    pattern = f"%{query}%"
+
+    with Session(engine) as db:
+        db.exec(
+            select(Transaction)
+            .filter(Transaction.user_id == user.id)
+            .filter(or_(Transaction.category.ilike(pattern), func.coalesce(Transaction.description, "").ilike(pattern)))
+            .order_by(Transaction.created_at.desc())
+            .limit(n)
+        ).all()
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--page", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", nargs="+", default=QUERIES)
+    parser.add_argument("--skip-like", action="store_true")
+    args = parser.parse_args()
+
+    # every repeat should reach the database.
+    response_cache.backend = None
+
+    with Session(engine) as db:
+        transactions = db.exec(select(func.count()).select_from(Transaction)).one()
+        users = db.exec(select(User).order_by(User.email).limit(args.users)).all()
+
+    headers = {
+        user.id: {"Authorization": f"Bearer {generate_jwt_token(user.id, user.email, timedelta(hours=1))}"}
+        for user in users
+    }
+
+    print(f"{transactions} transactions, {len(users)} users, first page of {args.page}")
+    print(f"{'query':<18} {'matches':>8} {'search p50':>11} {'p95':>8} {'like p50':>10} {'p95':>8}")
+
+    with TestClient(app) as client:
+        for query in args.queries:
+            search, like, matches = [], [], []
+            params = {"q": query, "n": args.page}
+
+            for user in users:
+                page = client.get("/api/v1/transactions/search", headers=headers[user.id], params=params)
+                page.raise_for_status()
+                matches.append(len(page.json()["items"]))
+
+                for _ in range(args.repeat):
+                    search.append(timed(lambda: client.get("/api/v1/transactions/search", headers=headers[user.id], params=params)))
+                    if not args.skip_like:
+                        like.append(timed(lambda: like_page(user, query, args.page)))
+
+            like_columns = f"{statistics.median(like):>10.2f} {percentile(like, 0.95):>8.2f}" if like else ""
+            print(
+                f"{query:<18} {statistics.mean(matches):>8.1f} {statistics.median(search):>11.2f} "
+                f"{percentile(search, 0.95):>8.2f} {like_columns}"
+            )
@@ -0,0 +1,136 @@
+"""
+Compares page latency of `GET /api/v1/transactions/` at increasing depths for
+a single user with a large history (1M transactions by default).
+
+For each depth it times
+  - keyset: one page of `--page` rows fetched with the cursor at that depth
+  - limit:  the old way of reaching that depth, fetching and serializing
+            `depth + page` rows (timed in-process, since `n` is now capped)
+
+    DB_URL=sqlite:///bench.db uv run python manage.py migrate
+    DB_URL=sqlite:///bench.db uv run python bench/transactions_pagination.py --rows 1000000
+
+Seeding is skipped when the bench user already has `--rows` transactions.
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+
+from db import engine
+from main import app
+from models import Bank, PaymentType, Transaction, TransactionPage, TransactionType, User
+from passwords import bcrypt_context
+from routes.utils import encode_cursor, generate_jwt_token
+
+BENCH_EMAIL = "bench-pagination@example.com"
+BATCH = 10_000
+
+
+def seed(rows: int) -> User:
+    with Session(engine, expire_on_commit=False) as db:
+        user = db.exec(select(User).filter(User.email == BENCH_EMAIL)).first()
+
+        if not user:
+            user = User(first_name="bench", email=BENCH_EMAIL, hashed_password=bcrypt_context.hash("bench"))
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+
+        bank = db.exec(select(Bank).filter(Bank.user_id == user.id)).first()
+
+        if not bank:
+            bank = Bank(name="bench", account_no=uuid.uuid4().hex, user_id=user.id)
+            db.add(bank)
+            db.commit()
+            db.refresh(bank)
+
+        existing = db.exec(select(func.count()).select_from(Transaction).filter(Transaction.user_id == user.id)).one()
+        start = datetime.now(timezone.utc) - timedelta(minutes=rows)
+
+        for offset in range(existing, rows, BATCH):
+            batch = []
+            for i in range(offset, min(offset + BATCH, rows)):
+                created_at = start + timedelta(minutes=i)
+                batch.append({
+                    "id": uuid.uuid4(),
+                    "user_id": user.id,
+                    "amount": float(i % 500),
+                    "category": "bench",
+                    "type": TransactionType.EXPENSE.value,
+                    "date": created_at,
+                    "payment_source_id": bank.id,
+                    "payment_source_type": PaymentType.BANK,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+            db.exec(insert(Transaction), params=batch)
+            db.commit()
+            print(f"seeded {offset + len(batch)}/{rows}")
+
+        return user
+
+def cursor_at(user: User, depth: int) -> str:
+    with Session(engine) as db:
+        row = db.exec(
+            select(Transaction.created_at, Transaction.id)
+            .filter(Transaction.user_id == user.id)
+            .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+            .offset(depth - 1)
+            .limit(1)
+        ).one()
+
+    return encode_cursor(*row)
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(samples)
+
+def keyset_page(client: TestClient, headers: dict, params: dict) -> None:
+    client.get("/api/v1/transactions/", headers=headers, params=params).raise_for_status()
+
+def limit_page(user: User, n: int) -> None:
+    with Session(engine) as db:
+        rows = db.exec(
+            select(Transaction)
+            .filter(Transaction.user_id == user.id)
+            .order_by(Transaction.created_at.desc())
+            .limit(n)
+        ).all()
+        TransactionPage(items=rows).model_dump_json()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1_000, 10_000, 100_000, 900_000])
+    args = parser.parse_args()
+
+    user = seed(args.rows)
+    token = generate_jwt_token(user.id, user.email, timedelta(hours=1))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(app) as client:
+        print(f"{'depth':>10} {'keyset ms':>12} {'limit ms':>12}")
+
+        for depth in [d for d in args.depths if d < args.rows]:
+            keyset_params = {"n": args.page}
+            if depth:
+                keyset_params["cursor"] = cursor_at(user, depth)
+            keyset = timed(lambda: keyset_page(client, headers, keyset_params), args.repeat)
+            limit = timed(lambda: limit_page(user, depth + args.page), args.repeat)
+
+            print(f"{depth:>10} {keyset:>12.2f} {limit:>12.2f}")
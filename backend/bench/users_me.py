@@ -0,0 +1,67 @@
+"""
+Measures req/s on `GET /api/v1/users/me` against a running server.
+
+    uv run uvicorn main:app --workers 1 &
+    uv run python bench/users_me.py --url http://localhost:8000 --requests 5000 --concurrency 50
+
+Run it once on the commit before the token cache and once after to compare.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "bench-password"
+
+    await client.post("/api/v1/auth/register", json={
+        "first_name": "bench",
+        "email": email,
+        "password": password,
+    })
+    response = await client.post("/api/v1/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+
+    return response.json()["access_token"]
+
+async def run(url: str, total: int, concurrency: int) -> None:
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        token = await login(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        remaining = total
+        failures = 0
+
+        async def worker():
+            nonlocal remaining, failures
+            while remaining > 0:
+                remaining -= 1
+                response = await client.get("/api/v1/users/me", headers=headers)
+                if response.status_code != 200:
+                    failures += 1
+
+        # warm up connections and caches before timing.
+        await asyncio.gather(*(client.get("/api/v1/users/me", headers=headers) for _ in range(concurrency)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"requests:    {total}")
+    print(f"concurrency: {concurrency}")
+    print(f"failures:    {failures}")
+    print(f"elapsed:     {elapsed:.2f}s")
+    print(f"req/s:       {total / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.requests, args.concurrency))
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+import time
+
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU mapping whose entries expire.
+
+    Every entry expires after `ttl` seconds unless an explicit `expires_at`
+    (unix timestamp) is given when it is set. When `maxsize` is reached the
+    least recently used entry is evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None) -> None:
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class ExpiringSet:
+    """
+    Unbounded set of keys that each drop out once their `expires_at`
+    (unix timestamp) has passed.
+
+    Unlike `TTLCache` nothing is ever evicted early, which is what a
+    revocation list needs: forgetting a revoked key would make it valid again.
+    """
+
+    def __init__(self, prune_interval: float = 60):
+        self.prune_interval = prune_interval
+        self._data: dict[Hashable, float] = {}
+        self._lock = Lock()
+        self._last_prune = time.time()
+
+    def add(self, key: Hashable, expires_at: float) -> None:
+        with self._lock:
+            self._data[key] = max(expires_at, self._data.get(key, 0))
+
+    def __contains__(self, key: Hashable) -> bool:
+        now = time.time()
+
+        if now - self._last_prune > self.prune_interval:
+            self.prune(now)
+
+        expires_at = self._data.get(key)
+        return expires_at is not None and expires_at > now
+
+    def prune(self, now: float | None = None) -> None:
+        now = now or time.time()
+
+        with self._lock:
+            self._data = {key: exp for key, exp in self._data.items() if exp > now}
+            self._last_prune = now
+
+    def __len__(self) -> int:
+        return len(self._data)
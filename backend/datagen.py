@@ -0,0 +1,370 @@
+"""
+Synthetic users and transaction histories that look like production data,
+for sizing the database, checking query plans and benchmarks.
+
+Every user gets one to three banks, usually a card or two and often cash,
+a monthly salary, rent and bills, a skewed mix of everyday spending over the
+history, refunds and a few balance adjustments. Source balances are an
+opening amount plus what those transactions add up to (see ledger.py) and the
+spending rollups and balance snapshots are written alongside, so the data is
+consistent with what the API maintains.
+
+Generation is deterministic: every user is built from its own
+`Random(f"{seed}-{email}")`, ids included, so the same settings always give
+the same rows, users can be generated in any order by several processes, and
+a rerun skips the users whose email is already taken.
+
+Rows are written with `COPY` on Postgres and `executemany` on SQLite,
+bypassing the ORM.
+"""
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta, timezone
+from enum import Enum
+from math import exp
+from sqlmodel import select
+from db import engine
+from ledger import SIGNS, daily_deltas
+from models import Currency, PaymentType, TransactionType, User
+from passwords import bcrypt_context
+from rollups import aggregate
+import csv
+import io
+import multiprocessing
+import random
+import uuid
+
+
+# category: (weight, median amount, preferred payment sources). The weights
+# follow a long tail: a few categories make up most everyday spending.
+SPENDING = {
+    "groceries": (22, 900, (PaymentType.CARD, PaymentType.BANK)),
+    "dining": (15, 600, (PaymentType.CARD, PaymentType.CASH)),
+    "fuel": (10, 1_500, (PaymentType.CARD,)),
+    "shopping": (9, 2_500, (PaymentType.CARD,)),
+    "transport": (8, 250, (PaymentType.CASH, PaymentType.BANK)),
+    "coffee": (7, 180, (PaymentType.CASH, PaymentType.CARD)),
+    "entertainment": (5, 800, (PaymentType.CARD,)),
+    "health": (4, 1_200, (PaymentType.BANK, PaymentType.CARD)),
+    "personal care": (3, 700, (PaymentType.CASH, PaymentType.CARD)),
+    "travel": (3, 9_000, (PaymentType.CARD, PaymentType.BANK)),
+    "gifts": (2, 2_000, (PaymentType.BANK, PaymentType.CASH)),
+    "education": (1, 5_000, (PaymentType.BANK,)),
+    "electronics": (1, 15_000, (PaymentType.CARD,)),
+}
+MERCHANTS = {
+    "groceries": ["bigbasket", "dmart", "reliance fresh", "local market"],
+    "dining": ["swiggy", "zomato", "cafe", "restaurant"],
+    "fuel": ["indian oil", "hp", "bharat petroleum"],
+    "shopping": ["amazon", "flipkart", "myntra", "mall"],
+    "transport": ["uber", "ola", "metro", "auto"],
+    "coffee": ["starbucks", "ccd", "chai point"],
+    "entertainment": ["pvr", "bookmyshow", "spotify"],
+    "travel": ["irctc", "makemytrip", "indigo"],
+}
+BANK_NAMES = ["hdfc", "sbi", "icici", "axis", "kotak", "yes bank"]
+CARD_NETWORKS = ["visa", "mastercard", "rupay"]
+# share of rows that are balance adjustments.
+ADJUSTMENT_RATE = 0.002
+REFUND_RATE = 0.01
+# recurring rows take at most this share of a user's transactions.
+RECURRING_SHARE = 0.6
+
+# transactions written per database transaction (and per task of a job).
+CHUNK_ROWS = 200_000
+
+TRANSACTION_COLUMNS = (
+    "id", "user_id", "amount", "category", "type", "date", "description",
+    "payment_source_id", "payment_source_type", "created_at", "updated_at",
+)
+# in the order of the keys of `rollups.aggregate`.
+ROLLUP_COLUMNS = ("user_id", "period", "period_start", "category", "payment_source_type", "currency", "type", "total", "count")
+# in the order of the keys of `ledger.daily_deltas`.
+SNAPSHOT_COLUMNS = ("user_id", "payment_source_type", "payment_source_id", "day", "delta")
+SOURCE_COLUMNS = {
+    "users": ("id", "first_name", "last_name", "email", "hashed_password", "created_at", "updated_at"),
+    "bank": ("id", "user_id", "name", "account_no", "amount", "currency", "version", "created_at", "updated_at"),
+    "card": (
+        "id", "user_id", "name", "limit", "current_usage", "balance", "currency", "issuing_bank_name",
+        "network", "version", "created_at", "updated_at",
+    ),
+    "cash": ("id", "user_id", "amount", "currency", "version", "created_at", "updated_at"),
+}
+
+_categories = [category for category, (weight, _, _) in SPENDING.items() for _ in range(weight)]
+
+
+@dataclass(frozen=True)
+class Settings:
+    users: int
+    transactions: int
+    seed: int = 0
+    days: int = 730
+    end: datetime | None = None
+    email: str = "user{index}@example.com"
+    hashed_password: str = ""
+    rollups: bool = True
+
+
+@dataclass
+class GeneratedUser:
+    id: uuid.UUID
+    rows: dict[str, list[tuple]]
+    # (id, date, amount, category, type, source type, source id, description)
+    transactions: list[tuple]
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+def _amount(rng: random.Random, median: float, sigma: float = 0.6) -> float:
+    return round(median * exp(rng.gauss(0, sigma)), 2)
+
+def _monthly(start: datetime, end: datetime, day: int) -> Iterable[datetime]:
+    moment = start.replace(day=day, hour=9, minute=0, second=0, microsecond=0)
+    while moment < end:
+        if moment >= start:
+            yield moment
+        moment = (moment.replace(day=1) + timedelta(days=32)).replace(day=day)
+
+def generate_user(settings: Settings, index: int, end: datetime) -> GeneratedUser:
+    email = settings.email.format(index=index)
+    rng = random.Random(f"{settings.seed}-{email}")
+    id = _uuid(rng)
+    start = end - timedelta(days=settings.days)
+    joined = start - timedelta(days=rng.randint(1, 60))
+
+    banks = [
+        (_uuid(rng), name, f"{rng.getrandbits(48):015d}", round(rng.uniform(5_000, 200_000), 2))
+        for name in rng.sample(BANK_NAMES, rng.choices([1, 2, 3], weights=[5, 4, 1])[0])
+    ]
+    cards = [
+        (
+            _uuid(rng), f"{bank} {network}", float(rng.choice([50_000, 100_000, 200_000, 500_000])),
+            bank, network,
+        )
+        for bank, network in (
+            (rng.choice(BANK_NAMES), rng.choice(CARD_NETWORKS))
+            for _ in range(rng.choices([0, 1, 2], weights=[2, 5, 3])[0])
+        )
+    ]
+    cash = (_uuid(rng), round(rng.uniform(500, 5_000), 2)) if rng.random() < 0.7 else None
+
+    sources = {
+        PaymentType.BANK: [bank[0] for bank in banks],
+        PaymentType.CARD: [card[0] for card in cards],
+        PaymentType.CASH: [cash[0]] if cash else [],
+    }
+    primary = banks[0][0]
+    transactions = []
+
+    def add(moment, amount, category, type, source_type, source_id, description=None):
+        transactions.append((_uuid(rng), moment, amount, category, type, source_type, source_id, description))
+
+    # recurring: salary, rent, bills and subscriptions, newest months first so
+    # a small budget still covers the recent history.
+    recurring = [(rng.randint(1, 5), _amount(rng, 60_000, 0.5), "salary", TransactionType.INCOME, PaymentType.BANK, primary)]
+    if rng.random() < 0.7:
+        recurring.append((rng.randint(1, 7), _amount(rng, 18_000, 0.4), "rent", TransactionType.EXPENSE, PaymentType.BANK, primary))
+    recurring.append((rng.randint(5, 15), _amount(rng, 2_500, 0.3), "utilities", TransactionType.EXPENSE, PaymentType.BANK, primary))
+    if rng.random() < 0.2:
+        recurring.append((rng.randint(1, 10), _amount(rng, 12_000, 0.4), "emi", TransactionType.EXPENSE, PaymentType.BANK, primary))
+    for _ in range(rng.randint(0, 3) if cards else 0):
+        recurring.append((rng.randint(1, 28), _amount(rng, 400, 0.5), "subscriptions", TransactionType.EXPENSE, PaymentType.CARD, rng.choice(sources[PaymentType.CARD])))
+
+    budget = int(settings.transactions * RECURRING_SHARE)
+    scheduled = sorted(
+        ((moment, item) for item in recurring for moment in _monthly(start, end, item[0])),
+        key=lambda entry: entry[0], reverse=True
+    )[:budget]
+    for moment, (_, amount, category, type, source_type, source_id) in scheduled:
+        # the same bill varies a little from month to month.
+        add(moment, round(amount * rng.uniform(0.97, 1.03), 2), category, type.value, source_type, source_id)
+
+    span = (end - start).total_seconds()
+    owned = [source_type for source_type, ids in sources.items() if ids]
+
+    while len(transactions) < settings.transactions:
+        moment = start + timedelta(seconds=rng.random() * span)
+        roll = rng.random()
+
+        if roll < ADJUSTMENT_RATE:
+            source_type = rng.choice(owned)
+            type = rng.choice([TransactionType.IADJUST, TransactionType.DADJUST])
+            add(moment, _amount(rng, 500, 1.0), "Adjustment", type.value, source_type, rng.choice(sources[source_type]), "balance correction")
+            continue
+
+        category = _categories[int(rng.random() * len(_categories))]
+        _, median, preferred = SPENDING[category]
+        source_type = next((kind for kind in preferred if sources[kind] and rng.random() < 0.8), rng.choice(owned))
+        merchant = rng.choice(MERCHANTS[category]) if category in MERCHANTS and rng.random() < 0.6 else None
+        type = TransactionType.INCOME if roll < ADJUSTMENT_RATE + REFUND_RATE else TransactionType.EXPENSE
+
+        add(
+            moment, _amount(rng, median), category, type.value, source_type, rng.choice(sources[source_type]),
+            f"refund from {merchant}" if merchant and type == TransactionType.INCOME else merchant
+        )
+
+    # balances: what the transactions add up to, as the ledger would have kept them.
+    deltas = dict.fromkeys((source_id for ids in sources.values() for source_id in ids), 0.0)
+    for _, _, amount, _, type, _, source_id, _ in transactions:
+        deltas[source_id] += SIGNS[TransactionType(type)] * amount
+
+    rows = {
+        "users": [(id, "user", str(index), email, settings.hashed_password, joined, joined)],
+        "bank": [
+            (bank_id, id, name, account_no, round(opening + deltas[bank_id], 2), Currency.INR.name, 0, joined, end)
+            for bank_id, name, account_no, opening in banks
+        ],
+        "card": [
+            (card_id, id, name, limit, round(-deltas[card_id], 2), round(limit + deltas[card_id], 2),
+             Currency.INR.name, bank, network, 0, joined, end)
+            for card_id, name, limit, bank, network in cards
+        ],
+        "cash": [(cash[0], id, round(cash[1] + deltas[cash[0]], 2), Currency.INR.name, 0, joined, end)] if cash else [],
+    }
+
+    return GeneratedUser(id, rows, transactions)
+
+
+class _Writer:
+    """
+    Raw rows into the tables of one connection: `COPY` on Postgres,
+    `executemany` on SQLite. Values are converted the way SQLAlchemy stores
+    them: uuids as hex, enums by name, sqlite timestamps without offset.
+    A column's conversion is picked from its value in the first row, so a
+    column may only hold None besides plain strings and numbers.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.postgres = connection.dialect.name == "postgresql"
+
+    def converter(self, value):
+        if isinstance(value, uuid.UUID):
+            return lambda value: value.hex
+        if isinstance(value, datetime):
+            if self.postgres:
+                return lambda value: value.isoformat(" ")
+            return lambda value: value.strftime("%Y-%m-%d %H:%M:%S.%f")
+        if isinstance(value, date):
+            return date.isoformat
+        if isinstance(value, Enum):
+            return lambda value: value.name
+
+        return None
+
+    def write(self, table: str, columns: Sequence[str], rows: Iterable[tuple]) -> None:
+        rows = [list(row) for row in rows]
+        if not rows:
+            return
+
+        for index, convert in enumerate(map(self.converter, rows[0])):
+            if convert:
+                for row in rows:
+                    row[index] = convert(row[index])
+
+        names = ", ".join(f'"{column}"' for column in columns)
+        cursor = self.connection.connection.dbapi_connection.cursor()
+
+        if self.postgres:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY "{table}" ({names}) FROM STDIN WITH (FORMAT csv)', buffer)
+        else:
+            cursor.executemany(
+                f'INSERT INTO "{table}" ({names}) VALUES ({", ".join("?" * len(columns))})', rows
+            )
+
+def _transaction_rows(user: GeneratedUser) -> Iterable[tuple]:
+    for id, moment, amount, category, type, source_type, source_id, description in user.transactions:
+        # entered a little after it happened.
+        created_at = moment + timedelta(seconds=(id.int % 3_600))
+        yield (id, user.id, amount, category, type, moment, description, source_id, source_type, created_at, created_at)
+
+def _transaction_fields(user: GeneratedUser) -> Iterable[dict]:
+    for _, moment, amount, category, type, source_type, source_id, _ in user.transactions:
+        yield {
+            "user_id": user.id, "date": moment, "category": category, "type": type, "amount": amount,
+            "payment_source_type": source_type, "payment_source_id": source_id,
+        }
+
+def _currencies(user: GeneratedUser) -> dict[uuid.UUID, Currency]:
+    # generated sources are all in rupees.
+    return {row[0]: Currency.INR for table in ("bank", "card", "cash") for row in user.rows[table]}
+
+def generate_range(settings: Settings, start: int, stop: int) -> int:
+    """
+    Generates and writes users `start` to `stop`, skipping those whose email
+    is taken, in one database transaction. Returns the number of transactions
+    written.
+    """
+    end = settings.end or datetime.now(timezone.utc)
+    emails = {settings.email.format(index=index): index for index in range(start, stop)}
+    written = 0
+
+    with engine.begin() as connection:
+        existing = set(connection.execute(select(User.email).filter(User.email.in_(list(emails)))).scalars())
+        users = [generate_user(settings, index, end) for email, index in emails.items() if email not in existing]
+        writer = _Writer(connection)
+
+        for table, columns in SOURCE_COLUMNS.items():
+            writer.write(table, columns, (row for user in users for row in user.rows[table]))
+
+        for user in users:
+            writer.write("transaction", TRANSACTION_COLUMNS, _transaction_rows(user))
+            written += len(user.transactions)
+
+            if settings.rollups:
+                # new users have no rollups or snapshots yet, so these are plain inserts.
+                writer.write("spending_rollup", ROLLUP_COLUMNS, (
+                    (*key, total, count) for key, (total, count) in aggregate(_transaction_fields(user), _currencies(user)).items()
+                ))
+                writer.write("balance_snapshot", SNAPSHOT_COLUMNS, (
+                    (*key, delta) for key, delta in daily_deltas(_transaction_fields(user)).items() if delta
+                ))
+
+    return written
+
+def generate(settings: Settings, jobs: int = 1, password: str = "password", progress=print) -> int:
+    """
+    Generates `settings.users` users with `settings.transactions`
+    transactions each. With `jobs` > 1 (Postgres only) ranges of users are
+    written by that many processes at once. Returns the number of
+    transactions written.
+    """
+    settings = replace(
+        settings,
+        # a fixed end keeps the data deterministic across runs.
+        end=settings.end or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0),
+        hashed_password=settings.hashed_password or bcrypt_context.hash(password),
+    )
+    per_task = max(1, CHUNK_ROWS // max(1, settings.transactions))
+    ranges = [(start, min(start + per_task, settings.users)) for start in range(0, settings.users, per_task)]
+
+    if engine.dialect.name != "postgresql":
+        jobs = 1
+
+    written = 0
+    done = 0
+
+    if jobs == 1:
+        for start, stop in ranges:
+            written += generate_range(settings, start, stop)
+            done = stop
+            progress(f"{done}/{settings.users} users, {written} transactions")
+
+        return written
+
+    engine.dispose()
+    with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+        tasks = {pool.submit(generate_range, settings, start, stop): stop - start for start, stop in ranges}
+
+        for task in as_completed(tasks):
+            written += task.result()
+            done += tasks[task]
+            progress(f"{done}/{settings.users} users, {written} transactions")
+
+    return written
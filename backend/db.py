@@ -1,18 +1,56 @@
 from fastapi import Depends
-from sqlmodel import create_engine, Session
+from sqlalchemy import make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
-from typing import Annotated 
+from typing import Annotated
 import os
 
 load_dotenv()
 
 
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_url(url: str) -> str:
+    """
+    Maps a sync DB_URL (postgresql://, postgresql+psycopg2://, sqlite://)
+    to the same database on its async driver.
+    """
+    url = make_url(url)
+
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+
 DB_URL = os.getenv('DB_URL')
+ASYNC_DB_URL = os.getenv('ASYNC_DB_URL') or async_url(DB_URL)
+# logs every statement; for debugging only, it's synchronous and verbose.
+DB_ECHO = os.getenv("DB_ECHO", "").lower() in ("1", "true", "yes")
 
-engine = create_engine(DB_URL, echo=True)
+# sync engine for migrations and manage.py commands, the API only uses `async_engine`.
+engine = create_engine(DB_URL, echo=DB_ECHO)
+async_engine = create_async_engine(ASYNC_DB_URL, echo=DB_ECHO)
 
-def get_session():
-    with Session(engine) as session:
+# objects stay usable after commit; expiring them would need lazy loads,
+# which AsyncSession can't do implicitly.
+async_session = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_session():
+    async with async_session() as session:
         yield session
 
-db_dependency = Annotated[Session, Depends(get_session)]
+db_dependency = Annotated[AsyncSession, Depends(get_session)]
+
+def insert_on_conflict(model):
+    """
+    `INSERT` for the configured database that supports
+    `.on_conflict_do_nothing()` / `.on_conflict_do_update()`.
+    """
+    if async_engine.dialect.name == "postgresql":
+        return postgresql.insert(model)
+
+    return sqlite.insert(model)
@@ -0,0 +1,24 @@
+from typing import AsyncIterator
+from models.transaction import ImportFormat, CsvColumnMapping
+from .records import ImportedRecord, RecordError, Fingerprinter
+from .csv_parser import parse_csv
+from .ofx import parse_ofx
+from .qif import parse_qif
+
+
+def parse_statement(
+    format: ImportFormat,
+    chunks: AsyncIterator[bytes],
+    mapping: CsvColumnMapping,
+    date_format: str | None = None,
+) -> AsyncIterator[ImportedRecord | RecordError]:
+    """
+    Incrementally parses a statement from a stream of bytes, yielding a
+    record (or the error for a record that couldn't be read) at a time.
+    """
+    if format == ImportFormat.CSV:
+        return parse_csv(chunks, mapping, date_format)
+    if format == ImportFormat.OFX:
+        return parse_ofx(chunks, date_format)
+
+    return parse_qif(chunks, date_format)
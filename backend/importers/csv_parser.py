@@ -0,0 +1,92 @@
+from typing import AsyncIterator
+from models.transaction import CsvColumnMapping
+from .records import ImportedRecord, RecordError, aiter_lines, parse_amount, parse_date
+import csv
+
+
+# a record spanning more than this is taken to be an unmatched quote.
+MAX_RECORD_LENGTH = 64 * 1024
+
+
+async def _records(lines: AsyncIterator[str], max_length: int = MAX_RECORD_LENGTH) -> AsyncIterator[str | None]:
+    """
+    Joins physical lines back into CSV records: a quoted field may contain
+    newlines, in which case the quote count of the line so far is odd.
+
+    A record that grows past `max_length` is dropped and yields None, and
+    the next line starts a new record, so an unmatched quote can't make it
+    buffer the rest of the file.
+    """
+    pending = None
+
+    async for line in lines:
+        pending = line if pending is None else f"{pending}\n{line}"
+
+        if pending.count('"') % 2 == 0:
+            yield pending
+            pending = None
+        elif len(pending) > max_length:
+            yield None
+            pending = None
+
+    if pending is not None:
+        yield pending
+
+async def parse_csv(
+    chunks: AsyncIterator[bytes], mapping: CsvColumnMapping, date_format: str | None = None
+) -> AsyncIterator[ImportedRecord | RecordError]:
+    header = None
+    position = 0
+
+    async for text in _records(aiter_lines(chunks)):
+        if text is None:
+            if header is None:
+                raise ValueError("CSV header has an unmatched quote.")
+            position += 1
+            yield RecordError(position, f"record longer than {MAX_RECORD_LENGTH} characters, unmatched quote?")
+            continue
+
+        if not text.strip():
+            continue
+
+        row = next(csv.reader([text], delimiter=mapping.delimiter))
+
+        if header is None:
+            header = {name.strip().lower(): index for index, name in enumerate(row)}
+            missing = [
+                column for column in (mapping.date, mapping.amount, mapping.debit, mapping.credit)
+                if column and column.lower() not in header
+            ]
+            if missing or not (mapping.amount or (mapping.debit and mapping.credit)):
+                raise ValueError(f"CSV header is missing columns: {', '.join(missing) or 'amount'}")
+            continue
+
+        position += 1
+
+        def field(column: str | None) -> str | None:
+            if not column or column.lower() not in header:
+                return None
+            index = header[column.lower()]
+            return row[index].strip() if index < len(row) else None
+
+        required = [mapping.date, mapping.amount] if mapping.amount else [mapping.date, mapping.debit, mapping.credit]
+        missing = [column for column in required if field(column) is None]
+        if missing:
+            yield RecordError(position, f"missing column {', '.join(missing)}")
+            continue
+
+        try:
+            if mapping.amount:
+                amount = parse_amount(field(mapping.amount))
+            else:
+                debit, credit = field(mapping.debit), field(mapping.credit)
+                amount = (parse_amount(credit) if credit else 0) - (parse_amount(debit) if debit else 0)
+
+            yield ImportedRecord(
+                date=parse_date(field(mapping.date), date_format),
+                amount=amount,
+                description=field(mapping.description) or None,
+                category=field(mapping.category) or None,
+            )
+        except (TypeError, ValueError) as e:
+            yield RecordError(position, str(e))
@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from typing import AsyncIterator
+from .records import ImportedRecord, RecordError, aiter_text, parse_amount
+import html
+import re
+
+
+TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def parse_ofx_date(value: str) -> datetime:
+    # YYYYMMDD[HHMMSS[.XXX]][[offset:TZ]], the offset is dropped.
+    match = re.match(r"\d{8}(\d{6})?", value.strip())
+    parsed = datetime.strptime(match.group(), "%Y%m%d%H%M%S" if match.group(1) else "%Y%m%d")
+
+    return parsed.replace(tzinfo=timezone.utc)
+
+def _record(fields: dict[str, str], position: int) -> ImportedRecord | RecordError:
+    try:
+        description = " - ".join(value for value in (fields.get("NAME"), fields.get("MEMO")) if value)
+
+        return ImportedRecord(
+            date=parse_ofx_date(fields["DTPOSTED"]),
+            amount=parse_amount(fields["TRNAMT"]),
+            description=description or None,
+            external_id=fields.get("FITID") or None,
+        )
+    except (KeyError, AttributeError, ValueError) as e:
+        return RecordError(position, f"invalid STMTTRN ({e})")
+
+async def _complete_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Yields the text up to the last tag start seen so far, the value of
+    that tag may continue in the next chunk.
+    """
+    buffer = ""
+
+    async for text in aiter_text(chunks):
+        buffer += text
+        cut = buffer.rfind("<")
+
+        if cut > 0:
+            complete, buffer = buffer[:cut], buffer[cut:]
+            yield complete
+
+    yield buffer
+
+async def parse_ofx(chunks: AsyncIterator[bytes], date_format: str | None = None) -> AsyncIterator[ImportedRecord | RecordError]:
+    """
+    Reads `<STMTTRN>` aggregates from OFX 1.x (SGML, closing tags optional
+    for leaf elements) and OFX 2.x (XML). Works on the raw text stream
+    rather than lines, since OFX 2 files are often a single line.
+    """
+    current = None
+    position = 0
+
+    async for text in _complete_text(chunks):
+        for closing, tag, value in TAG.findall(text):
+            tag = tag.upper()
+
+            if tag == "STMTTRN":
+                if current is not None:
+                    position += 1
+                    yield _record(current, position)
+                current = None if closing else {}
+            elif current is not None and not closing:
+                current[tag] = html.unescape(value.strip())
+
+    if current is not None:
+        position += 1
+        yield _record(current, position)
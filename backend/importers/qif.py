@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from typing import AsyncIterator
+from .records import ImportedRecord, RecordError, aiter_lines, parse_amount
+import re
+
+
+def parse_qif_date(value: str, date_format: str | None = None) -> datetime:
+    """
+    QIF dates are US month-first: 1/15/2024, 01/15'24, 1-15-24.
+    """
+    value = value.strip()
+
+    if date_format:
+        parsed = datetime.strptime(value, date_format)
+    else:
+        month, day, year = (int(part) for part in re.split(r"[/'\-. ]+", value) if part)
+        if year < 100:
+            year += 1900 if year >= 70 else 2000
+        parsed = datetime(year, month, day)
+
+    return parsed.replace(tzinfo=timezone.utc)
+
+async def parse_qif(chunks: AsyncIterator[bytes], date_format: str | None = None) -> AsyncIterator[ImportedRecord | RecordError]:
+    fields: dict[str, str] = {}
+    position = 0
+
+    async for line in aiter_lines(chunks):
+        if not line or line.startswith("!"):
+            continue
+
+        code, value = line[0], line[1:].strip()
+
+        if code != "^":
+            # split transactions repeat S/E/$ lines, only the totals are kept.
+            fields.setdefault(code, value)
+            continue
+
+        if not fields:
+            continue
+
+        position += 1
+        try:
+            description = " - ".join(value for value in (fields.get("P"), fields.get("M")) if value)
+
+            yield ImportedRecord(
+                date=parse_qif_date(fields["D"], date_format),
+                amount=parse_amount(fields.get("T") or fields["U"]),
+                description=description or None,
+                category=fields.get("L") or None,
+            )
+        except (KeyError, ValueError) as e:
+            yield RecordError(position, f"invalid record ({e})")
+
+        fields = {}
@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+from typing import AsyncIterator, NamedTuple
+import codecs
+import hashlib
+import re
+import uuid
+
+
+class ImportedRecord(NamedTuple):
+    date: datetime
+    # signed, negative for money going out of the account.
+    amount: float
+    description: str | None = None
+    category: str | None = None
+    # id the bank gave the transaction (OFX FITID), when there is one.
+    external_id: str | None = None
+
+class RecordError(ValueError):
+    def __init__(self, position: int, message: str):
+        super().__init__(f"record {position}: {message}")
+
+
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d", "%m/%d/%Y"]
+
+
+def parse_date(value: str, date_format: str | None = None) -> datetime:
+    """
+    Parses with `date_format` when given, otherwise ISO 8601 and then
+    `DATE_FORMATS` in order. Naive results are taken to be UTC.
+    """
+    value = value.strip()
+
+    if date_format:
+        parsed = datetime.strptime(value, date_format)
+    else:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            for candidate in DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(value, candidate)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f"unrecognised date {value!r}")
+
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def parse_amount(value: str) -> float:
+    value = value.strip()
+    negative = value.startswith("(") and value.endswith(")")
+    # drop currency symbols and thousands separators: "₹1,250.00" -> "1250.00"
+    amount = float(re.sub(r"[^0-9.\-+]", "", value))
+
+    return -amount if negative else amount
+
+async def aiter_text(chunks: AsyncIterator[bytes], encoding: str = "utf-8-sig") -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+async def aiter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Splits a byte stream into lines without ever holding more than the
+    current chunk and one partial line.
+    """
+    buffer = ""
+
+    async for text in aiter_text(chunks):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+
+        for line in lines:
+            yield line.rstrip("\r")
+
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+class Fingerprinter:
+    """
+    Stable ids for imported records, so importing the same statement twice
+    doesn't duplicate rows.
+
+    Records with an `external_id` are keyed by it. Otherwise the key is the
+    date, amount and description plus how many identical records came before
+    it on the same day, so two real, identical purchases on one day stay
+    distinct. Counts are only kept for the current date, which keeps memory
+    flat for date-ordered statements.
+    """
+
+    def __init__(self, payment_source_id: uuid.UUID):
+        self.payment_source_id = payment_source_id
+        self._day = None
+        self._seen: dict[str, int] = {}
+
+    def __call__(self, record: ImportedRecord) -> str:
+        if record.external_id:
+            key = f"{self.payment_source_id}|id|{record.external_id}"
+        else:
+            day = record.date.date()
+            if day != self._day:
+                self._day = day
+                self._seen.clear()
+
+            base = f"{self.payment_source_id}|{record.date.isoformat()}|{record.amount:.2f}|{record.description or ''}"
+            occurrence = self._seen.get(base, 0)
+            self._seen[base] = occurrence + 1
+            key = f"{base}|{occurrence}"
+
+        return hashlib.sha256(key.encode()).hexdigest()
@@ -0,0 +1,136 @@
+"""
+Balances of banks, cards and cash follow their transactions.
+
+Every write path passes the transactions it inserted (`added`) or deleted
+(`removed`) to `apply_transactions` before committing. The balance change is
+a single `UPDATE .. SET amount = amount + :delta` per payment source, so
+concurrent requests never overwrite each other's changes and don't need to
+lock the row in Python.
+
+Each source also has a `version`, bumped by every balance change. Setting a
+balance to an absolute value (`adjust_balance`) is only applied if the
+version still matches the one the request read; otherwise it's a 409.
+
+Both also add the change to the source's `BalanceSnapshot` of the
+transaction's day, which balance histories are read from (see
+balance_history.py).
+"""
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from balance_history import upsert_statements
+from models import Bank, Card, Cash, PaymentType, RollupPeriod, Transaction, TransactionType
+from rollups import PAYMENT_MODELS, period_starts
+
+# money in is positive. For a card that means lower usage and more available balance.
+SIGNS = {
+    TransactionType.INCOME: 1,
+    TransactionType.IADJUST: 1,
+    TransactionType.EXPENSE: -1,
+    TransactionType.DADJUST: -1,
+}
+
+
+def version_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="balance was changed by another request, reload and retry."
+    )
+
+def check_version(source: Bank | Card | Cash, version: int | None) -> None:
+    # `version` is what the client last read, when it sent one.
+    if version is not None and version != source.version:
+        raise version_conflict()
+
+def _field(transaction: Transaction | Mapping, name: str):
+    if isinstance(transaction, Mapping):
+        return transaction[name]
+
+    return getattr(transaction, name)
+
+def balance_delta(transaction: Transaction | Mapping) -> float:
+    return SIGNS[TransactionType(_field(transaction, "type"))] * _field(transaction, "amount")
+
+def daily_deltas(transactions: Iterable, sign: int = 1, totals: dict | None = None) -> dict[tuple, float]:
+    """
+    Sums balance changes into `{(user_id, payment type, source id, UTC day): delta}`,
+    adding to `totals` when given.
+    """
+    if totals is None:
+        totals = defaultdict(float)
+
+    for transaction in transactions:
+        day = period_starts(_field(transaction, "date"))[RollupPeriod.DAY]
+        key = (
+            _field(transaction, "user_id"),
+            PaymentType(_field(transaction, "payment_source_type")),
+            _field(transaction, "payment_source_id"),
+            day,
+        )
+        totals[key] += sign * balance_delta(transaction)
+
+    return totals
+
+async def record_snapshots(db: AsyncSession, deltas: dict[tuple, float]) -> None:
+    for statement in upsert_statements(deltas):
+        await db.exec(statement)
+
+def balance_update(payment_type: PaymentType, payment_id, delta: float):
+    model = PAYMENT_MODELS[payment_type]
+
+    if model is Card:
+        values = {"balance": Card.balance + delta, "current_usage": Card.current_usage - delta}
+    else:
+        values = {"amount": model.amount + delta}
+
+    return (
+        update(model)
+        .filter(model.id == payment_id)
+        .values(**values, version=model.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def apply_transactions(db: AsyncSession, added: Iterable = (), removed: Iterable = ()) -> None:
+    """
+    Applies the balance change of `added` and reverts the one of `removed`
+    (an update is both), one `UPDATE` per payment source.
+    Doesn't commit; the caller commits it along with the transactions.
+    """
+    deltas = defaultdict(float)
+
+    for sign, transactions in ((1, added), (-1, removed)):
+        for transaction in transactions:
+            key = (PaymentType(_field(transaction, "payment_source_type")), _field(transaction, "payment_source_id"))
+            deltas[key] += sign * balance_delta(transaction)
+
+    # same row order in every request, so two requests touching the same
+    # sources can't deadlock each other.
+    for (payment_type, payment_id), delta in sorted(deltas.items()):
+        if delta:
+            await db.exec(balance_update(payment_type, payment_id, delta))
+
+    await record_snapshots(db, daily_deltas(removed, sign=-1, totals=daily_deltas(added)))
+
+async def adjust_balance(db: AsyncSession, source: Bank | Card | Cash, adjustment: Transaction) -> None:
+    """
+    Applies an adjustment computed from `source` as the request read it,
+    unless the source's balance changed since (its version moved on).
+    """
+    statement = balance_update(adjustment.payment_source_type, source.id, balance_delta(adjustment))
+    statement = statement.filter(type(source).version == source.version)
+
+    if (await db.exec(statement)).rowcount == 0:
+        raise version_conflict()
+
+    await record_snapshots(db, daily_deltas([adjustment]))
+
+async def set_card_limit(db: AsyncSession, card: Card, limit: float) -> None:
+    # balance is derived from the limit, recompute it from the stored usage.
+    await db.exec(
+        update(Card)
+        .filter(Card.id == card.id)
+        .values(limit=limit, balance=limit - Card.current_usage, version=Card.version + 1)
+        .execution_options(synchronize_session=False)
+    )
@@ -1,10 +1,85 @@
-from fastapi import FastAPI
-from db import engine
-from sqlmodel import SQLModel
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
+from db import async_engine, async_session
+from metrics import CONTENT_TYPE, Collected, MetricsMiddleware, instrument_engine, register, register_stats, render
 from routes import router
-import models
+from routes.utils import sync_token_blacklist, purge_expired_tokens, revoked_tokens, token_claims_cache, user_cache
+from passwords import start_pool, shutdown_pool, pool_stats
+from nlp import extraction_engine, job_workers
+from nlp.extract import extraction_cache, path_counts
+from response_cache import response_cache
+from fx import rate_cache
+import asyncio
+import logging
+import os
 
-app = FastAPI()
-SQLModel.metadata.create_all(bind=engine)
+
+BLACKLIST_SYNC_SECONDS = float(os.getenv("BLACKLIST_SYNC_SECONDS", 5))
+BLACKLIST_PURGE_SECONDS = float(os.getenv("BLACKLIST_PURGE_SECONDS", 15 * 60))
+
+log = logging.getLogger(__name__)
+
+
+async def _sync_blacklist():
+    async with async_session() as db:
+        await sync_token_blacklist(db)
+
+async def _blacklist_sync_loop():
+    # picks up tokens revoked by other workers since the last sync.
+    while True:
+        await asyncio.sleep(BLACKLIST_SYNC_SECONDS)
+        try:
+            await _sync_blacklist()
+        except Exception:
+            log.exception("token blacklist sync failed")
+
+async def _blacklist_purge_loop():
+    # expired tokens fail validation anyway, their rows only take up space.
+    while True:
+        await asyncio.sleep(BLACKLIST_PURGE_SECONDS)
+        try:
+            async with async_session() as db:
+                await purge_expired_tokens(db)
+        except Exception:
+            log.exception("token blacklist purge failed")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await _sync_blacklist()
+    sync_task = asyncio.create_task(_blacklist_sync_loop())
+    purge_task = asyncio.create_task(_blacklist_purge_loop())
+    start_pool()
+    extraction_engine.start()
+    job_workers.start()
+
+    yield
+
+    await job_workers.stop()
+    sync_task.cancel()
+    purge_task.cancel()
+    shutdown_pool()
+    await extraction_engine.stop()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(router)
+
+instrument_engine(async_engine)
+register_stats("password_hash_pool", pool_stats)
+register_stats("nlp_engine", extraction_engine.stats)
+register_stats("nlp_jobs", job_workers.stats)
+register_stats("nlp_extraction_cache", extraction_cache.stats)
+register(Collected("nlp_extraction_path_total", "Extractions answered by each path.", lambda: dict(path_counts), ("path",), "counter"))
+register_stats("auth_user_cache", user_cache.stats)
+register_stats("auth_token_cache", token_claims_cache.stats)
+register_stats("response_cache", response_cache.stats)
+register_stats("fx_rates", rate_cache.stats)
+register(Collected("auth_revoked_tokens", "Revoked tokens held in memory.", lambda: len(revoked_tokens)))
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    return Response(render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,331 @@
+"""
+Management commands, run from the backend directory:
+
+    python manage.py migrate [revision]   apply schema migrations (default: head)
+    python manage.py check-plans          fail if a hot query plans as a sequential scan
+    python manage.py rebuild-rollups      recompute the spending rollups from transactions
+    python manage.py rebuild-balance-history
+                                          recompute the daily balance snapshots from transactions
+    python manage.py generate-data        load synthetic users and transactions (see datagen.py)
+    python manage.py load-fx-rates FILE   store daily exchange rates from a csv or json file (see fx.py)
+    python manage.py rebuild-search-index refill sqlite's transaction search index (postgres keeps its own)
+"""
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import delete, text, tuple_
+from sqlmodel import Session, select
+from datetime import datetime, timedelta, timezone
+from db import engine
+from datagen import Settings, generate
+from models import (
+    User, Token, Transaction, Bank, Card, Cash, PaymentType, SpendingRollup, RollupPeriod, ResourceVersion, BalanceSnapshot,
+)
+from rollups import PAYMENT_MODELS, ROLLUP_FIELDS, aggregate, upsert_statements
+from ledger import daily_deltas
+import balance_history
+import fx
+import search
+import argparse
+import os
+import re
+import sys
+import time
+import uuid
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def migrate(args: argparse.Namespace) -> int:
+    command.upgrade(Config(os.path.join(BASE_DIR, "alembic.ini")), args.revision)
+
+    return 0
+
+def hot_queries() -> dict:
+    """
+    The lookups routes/ runs on every request to the matching endpoint,
+    with placeholder values. Plans don't depend on the values matching rows.
+    """
+    user_id = uuid.uuid4()
+    row_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+
+    transactions = (
+        select(Transaction)
+        .filter(Transaction.user_id == user_id)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .limit(11)
+    )
+
+    return {
+        "auth.login_user": select(User).filter(User.email == "user@example.com"),
+        "utils.get_user": select(User).filter(User.id == user_id),
+        "utils.sync_token_blacklist": select(Token.jti_hash, Token.expires_at)
+            .filter(Token.expires_at > now)
+            .filter(Token.created_at > now - timedelta(minutes=5)),
+        "utils.purge_expired_tokens": select(Token.id).filter(Token.expires_at < now).limit(10_000),
+        "transactions.get_transactions": transactions,
+        "transactions.get_transactions (cursor)": transactions.filter(
+            tuple_(Transaction.created_at, Transaction.id) < (now, row_id)
+        ),
+        "transactions.get_transactions (filters)": transactions
+            .filter(Transaction.payment_source_type == PaymentType.BANK)
+            .filter(Transaction.date >= now - timedelta(days=30))
+            .filter(Transaction.date <= now),
+        "transactions.update_transaction": select(Transaction)
+            .filter(Transaction.id == row_id)
+            .filter(Transaction.user_id == user_id),
+        "utils.conditional": select(ResourceVersion.resource, ResourceVersion.version, ResourceVersion.updated_at)
+            .filter(ResourceVersion.user_id == user_id)
+            .filter(ResourceVersion.resource.in_(["bank", "card", "cash", "transactions"])),
+        "bank.create_bank_account": select(Bank).filter(Bank.account_no == "0000000000"),
+        "bank.get_bank_accounts": select(Bank).filter(Bank.user_id == user_id),
+        "card.get_all_cards": select(Card).filter(Card.user_id == user_id),
+        "card.get_card": select(Card).filter(Card.user_id == user_id).filter(Card.id == row_id),
+        "cash.get_cash_details": select(Cash).filter(Cash.user_id == user_id),
+        "summary.get_balance_history": select(BalanceSnapshot).filter(BalanceSnapshot.user_id == user_id),
+        "transactions.search_transactions": search.search_query(user_id, ["rent"]).limit(11),
+        "summary.get_spending": select(SpendingRollup)
+            .filter(SpendingRollup.user_id == user_id)
+            .filter(SpendingRollup.period == RollupPeriod.MONTH)
+            .filter(SpendingRollup.period_start >= now.date()),
+    }
+
+def explain(connection, statement) -> list[str]:
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+
+    if connection.dialect.name == "sqlite":
+        return [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+    return [row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))]
+
+def is_sequential_scan(line: str) -> bool:
+    # sqlite reports "SCAN <table>" for a full table scan and "SEARCH ..." or
+    # "SCAN <table> USING INDEX ..." when an index is used.
+    if re.match(r"^\s*SCAN \S+\s*$", line):
+        return True
+
+    return "Seq Scan" in line
+
+def check_plans(args: argparse.Namespace) -> int:
+    failures = 0
+
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # small or freshly seeded tables make a seq scan the cheapest plan
+            # even with a usable index; this only leaves it when there is none.
+            connection.execute(text("SET enable_seqscan = off"))
+
+        for name, statement in hot_queries().items():
+            plan = explain(connection, statement)
+            failed = any(is_sequential_scan(line) for line in plan)
+            failures += failed
+
+            print(f"{'FAIL' if failed else 'ok':<5} {name}")
+            if failed or args.verbose:
+                for line in plan:
+                    print(f"      {line}")
+
+    return 1 if failures else 0
+
+def rebuild_rollups(args: argparse.Namespace) -> int:
+    """
+    Recomputes the rollups of every user (or of `--user`) in one DB
+    transaction. Transactions are streamed one user at a time, so memory
+    depends on the largest user's number of rollup rows, not on the table size.
+    Run it while the API isn't writing, or rows written meanwhile can be off
+    until the next rebuild.
+    """
+    query = select(*(getattr(Transaction, field) for field in ROLLUP_FIELDS)).order_by(Transaction.user_id)
+    clear = delete(SpendingRollup)
+
+    if args.user:
+        query = query.filter(Transaction.user_id == args.user)
+        clear = clear.filter(SpendingRollup.user_id == args.user)
+
+    with Session(engine) as db:
+        db.exec(clear)
+
+        users = 0
+        current_user = None
+        currencies = {}
+        totals = None
+
+        def flush():
+            for statement in upsert_statements(totals):
+                db.exec(statement)
+
+        for row in db.exec(query.execution_options(yield_per=10_000)):
+            if row.user_id != current_user:
+                if totals:
+                    flush()
+                current_user, totals = row.user_id, None
+                currencies = {
+                    source_id: currency
+                    for model in PAYMENT_MODELS.values()
+                    for source_id, currency in db.exec(select(model.id, model.currency).filter(model.user_id == row.user_id))
+                }
+                users += 1
+
+            totals = aggregate([row._mapping], currencies, totals=totals)
+
+        if totals:
+            flush()
+
+        db.commit()
+
+    print(f"rebuilt rollups for {users} user(s)")
+
+    return 0
+
+def rebuild_balance_history(args: argparse.Namespace) -> int:
+    """
+    Recomputes the balance snapshots of every user (or of `--user`) from
+    their transactions in one DB transaction, one user at a time like
+    `rebuild_rollups`.
+    """
+    fields = ("user_id", "date", "type", "amount", "payment_source_type", "payment_source_id")
+    query = select(*(getattr(Transaction, field) for field in fields)).order_by(Transaction.user_id)
+    clear = delete(BalanceSnapshot)
+
+    if args.user:
+        query = query.filter(Transaction.user_id == args.user)
+        clear = clear.filter(BalanceSnapshot.user_id == args.user)
+
+    with Session(engine) as db:
+        db.exec(clear)
+
+        users = 0
+        current_user = None
+        deltas = None
+
+        def flush():
+            for statement in balance_history.upsert_statements(deltas):
+                db.exec(statement)
+
+        for row in db.exec(query.execution_options(yield_per=10_000)):
+            if row.user_id != current_user:
+                if deltas:
+                    flush()
+                current_user, deltas = row.user_id, None
+                users += 1
+
+            deltas = daily_deltas([row._mapping], totals=deltas)
+
+        if deltas:
+            flush()
+
+        db.commit()
+
+    print(f"rebuilt balance history for {users} user(s)")
+
+    return 0
+
+def generate_data(args: argparse.Namespace) -> int:
+    settings = Settings(
+        users=args.users,
+        transactions=args.transactions,
+        seed=args.seed,
+        days=args.days,
+        end=args.end,
+        email=args.email,
+        rollups=not args.skip_rollups,
+    )
+
+    start = time.perf_counter()
+    written = generate(settings, jobs=args.jobs, password=args.password)
+    elapsed = time.perf_counter() - start
+
+    print(f"wrote {written} transactions in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f}/s)")
+
+    return 0
+
+def load_fx_rates(args: argparse.Namespace) -> int:
+    """
+    Stores the rates in `args.file`, replacing any already stored for the
+    same day and currency. API processes pick them up within `FX_CACHE_TTL`
+    seconds.
+    """
+    format = args.format or os.path.splitext(args.file)[1].lstrip(".").lower()
+
+    with open(args.file, "rb") as file:
+        try:
+            rates = fx.parse_rates(file.read(), format)
+        except ValueError as e:
+            print(f"{args.file}: {e}", file=sys.stderr)
+            return 1
+
+    with Session(engine) as db:
+        for statement in fx.upsert_statements(rates, datetime.now(timezone.utc)):
+            db.exec(statement)
+
+        db.commit()
+
+    days = sorted({rate.day for rate in rates})
+    print(f"loaded {len(rates)} rate(s)" + (f" from {days[0]} to {days[-1]}" if days else ""))
+
+    return 0
+
+def rebuild_search_index(args: argparse.Namespace) -> int:
+    """
+    Refills sqlite's `transaction_fts` from the transactions, after a VACUUM
+    or a batch migration renumbered their rowids (see migration 0012).
+    Postgres generates `search_vector` itself, so there is nothing to do.
+    """
+    if engine.dialect.name != "sqlite":
+        print("postgres keeps the search index up to date itself")
+        return 0
+
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO transaction_fts (transaction_fts) VALUES ('rebuild')"))
+
+    print("rebuilt the transaction search index")
+
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="apply schema migrations")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    migrate_parser.set_defaults(handler=migrate)
+
+    check_parser = commands.add_parser("check-plans", help="fail if a hot query plans as a sequential scan")
+    check_parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    check_parser.set_defaults(handler=check_plans)
+
+    rollups_parser = commands.add_parser("rebuild-rollups", help="recompute the spending rollups from transactions")
+    rollups_parser.add_argument("--user", type=uuid.UUID, help="only this user's rollups")
+    rollups_parser.set_defaults(handler=rebuild_rollups)
+
+    balances_parser = commands.add_parser("rebuild-balance-history", help="recompute the daily balance snapshots from transactions")
+    balances_parser.add_argument("--user", type=uuid.UUID, help="only this user's snapshots")
+    balances_parser.set_defaults(handler=rebuild_balance_history)
+
+    data_parser = commands.add_parser("generate-data", help="load synthetic users and transactions")
+    data_parser.add_argument("--users", type=int, default=100)
+    data_parser.add_argument("--transactions", type=int, default=1_000, help="per user")
+    data_parser.add_argument("--seed", type=int, default=0)
+    data_parser.add_argument("--days", type=int, default=730, help="length of each user's history")
+    data_parser.add_argument(
+        "--end", type=lambda value: datetime.fromisoformat(value).replace(tzinfo=timezone.utc),
+        help="UTC date the histories end on (default: today); fix it to get the same rows on another day"
+    )
+    data_parser.add_argument("--email", default="user{index}@example.com", help="email of user {index}")
+    data_parser.add_argument("--password", default="password", help="password of every user")
+    data_parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="processes writing at once, postgres only")
+    data_parser.add_argument("--skip-rollups", action="store_true", help="run rebuild-rollups and rebuild-balance-history afterwards instead")
+    data_parser.set_defaults(handler=generate_data)
+
+    fx_parser = commands.add_parser("load-fx-rates", help="store daily exchange rates from a csv or json file")
+    fx_parser.add_argument("file", help="`day,currency,per_usd` csv, or a json list of objects with those fields")
+    fx_parser.add_argument("--format", choices=["csv", "json"], help="default: the file's extension")
+    fx_parser.set_defaults(handler=load_fx_rates)
+
+    search_parser = commands.add_parser("rebuild-search-index", help="refill sqlite's transaction search index")
+    search_parser.set_defaults(handler=rebuild_search_index)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
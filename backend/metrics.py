@@ -0,0 +1,211 @@
+"""
+Prometheus metrics of the API process, served as text on `/metrics`.
+
+- `MetricsMiddleware` times every request into a histogram per method, route
+  template and status, along with the number of queries the request ran and
+  the time it spent in them.
+- SQLAlchemy cursor events on the engine passed to `instrument_engine` time
+  every query. Queries of a request add up in a context variable the
+  middleware sets up, so background work only counts in the totals.
+- Gauges and counters kept elsewhere (connection pool, password hashing pool,
+  NLP extraction and jobs, auth caches) are read when `/metrics` is scraped.
+
+Instruments are plain dicts updated on the event loop thread: an observation
+is a bisect and two increments, cheap enough to leave on under load. Every
+uvicorn worker keeps its own numbers; scrape each worker or run one per
+container.
+"""
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+import time
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# [queries, seconds] of the request being handled.
+_request_db: ContextVar[list | None] = ContextVar("request_db", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names: tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+def _sample(name: str, labels: str, value) -> str:
+    return f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+
+class Histogram:
+    """
+    Observations counted into `buckets` (upper bounds) per combination of label values.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values: [label text, per bucket counts (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [_label_text(self.labels, labels), [0] * (len(self.buckets) + 1), 0.0]
+
+        series[1][bisect_left(self.buckets, value)] += 1
+        series[2] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+
+        for labels, counts, total in list(self._series.values()):
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+
+            yield _sample(f"{self.name}_sum", labels, total)
+            yield _sample(f"{self.name}_count", labels, cumulative)
+
+
+class Collected:
+    """
+    A gauge or counter whose values `read` returns at scrape time, either
+    a number or `{label values: number}`.
+    """
+
+    def __init__(self, name: str, help: str, read: Callable, labels: tuple[str, ...] = (), type: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labels = labels
+        self.type = type
+
+    def render(self) -> Iterable[str]:
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+
+        for labels, value in values.items():
+            if not isinstance(labels, tuple):
+                labels = (labels,)
+            yield _sample(self.name, _label_text(self.labels, labels), value)
+
+
+registry: list[Histogram | Collected] = []
+
+def register(metric):
+    registry.append(metric)
+    return metric
+
+def render() -> str:
+    lines = []
+
+    for metric in registry:
+        lines.extend(metric.render())
+
+    return "\n".join(lines) + "\n"
+
+
+request_seconds = register(Histogram(
+    "http_request_duration_seconds", "Time to handle a request, until the response is sent.",
+    ("method", "route", "status"),
+))
+request_queries = register(Histogram(
+    "http_request_db_queries", "Queries run by one request.", ("method", "route"), QUERY_COUNT_BUCKETS,
+))
+request_db_seconds = register(Histogram(
+    "http_request_db_seconds", "Time one request spent in queries.", ("method", "route"),
+))
+query_seconds = register(Histogram(
+    "db_query_duration_seconds", "Time of a single query, background work included.", ("operation",),
+))
+
+
+class MetricsMiddleware:
+    """
+    Records every HTTP request into the `http_request_*` histograms. Routes are
+    labelled by their template (`/api/v1/transactions/{transaction_id}`),
+    requests that match no route as "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+        db = [0, 0.0]
+        token = _request_db.set(db)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_db.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+
+            request_seconds.observe(time.perf_counter() - start, method, path, status)
+            request_queries.observe(db[0], method, path)
+            request_db_seconds.observe(db[1], method, path)
+
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    # a connection runs one statement at a time.
+    connection.info["query_start"] = time.perf_counter()
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - connection.info["query_start"]
+    query_seconds.observe(elapsed, statement.split(None, 1)[0].upper())
+
+    db = _request_db.get()
+    if db is not None:
+        db[0] += 1
+        db[1] += elapsed
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Times the queries of `engine` and reports its connection pool.
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+    pool = engine.sync_engine.pool
+    # sqlite's in-memory and null pools don't count connections.
+    if hasattr(pool, "checkedout"):
+        register(Collected("db_pool_size", "Connections the pool keeps open.", pool.size))
+        register(Collected("db_pool_checked_out", "Connections in use.", pool.checkedout))
+        # counts up from -size while the pool fills.
+        register(Collected("db_pool_overflow", "Connections open beyond the pool size.", lambda: max(pool.overflow(), 0)))
+
+def register_stats(prefix: str, stats: Callable[[], dict]) -> None:
+    """
+    A gauge `<prefix>_<key>` for every number in the dict `stats()` returns.
+    """
+    for key, value in stats().items():
+        if isinstance(value, (int, float)):
+            register(Collected(f"{prefix}_{key}", f"`{key}` of {prefix.replace('_', ' ')} stats.", lambda key=key: stats()[key]))
@@ -0,0 +1,42 @@
+"""query indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 19:35:37
+
+Indexes for the lookups in routes/. `python manage.py check-plans` fails if
+any of those queries goes back to a sequential scan.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # get_bank_accounts, create/update_bank_account duplicate checks.
+    op.create_index(op.f('ix_bank_user_id'), 'bank', ['user_id'], unique=False)
+    op.create_index(op.f('ix_bank_account_no'), 'bank', ['account_no'], unique=False)
+    # get_all_cards, get_card.
+    op.create_index(op.f('ix_card_user_id'), 'card', ['user_id'], unique=False)
+    # get_transactions: keyset pagination and date range filters.
+    op.create_index('ix_transaction_user_created_id', 'transaction', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_transaction_user_date', 'transaction', ['user_id', 'date'], unique=False)
+    # transactions of a payment source.
+    op.create_index(op.f('ix_transaction_payment_source_id'), 'transaction', ['payment_source_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_transaction_payment_source_id'), table_name='transaction')
+    op.drop_index('ix_transaction_user_date', table_name='transaction')
+    op.drop_index('ix_transaction_user_created_id', table_name='transaction')
+    op.drop_index(op.f('ix_card_user_id'), table_name='card')
+    op.drop_index(op.f('ix_bank_account_no'), table_name='bank')
+    op.drop_index(op.f('ix_bank_user_id'), table_name='bank')
@@ -0,0 +1,42 @@
+"""transaction date with time zone
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:39:05
+
+asyncpg refuses aware datetimes for a `timestamp without time zone` column,
+and every transaction date is written as UTC.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.alter_column(
+            'date',
+            existing_type=sa.DateTime(),
+            type_=sa.DateTime(timezone=True),
+            existing_nullable=False,
+            postgresql_using="date AT TIME ZONE 'UTC'",
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.alter_column(
+            'date',
+            existing_type=sa.DateTime(timezone=True),
+            type_=sa.DateTime(),
+            existing_nullable=False,
+            postgresql_using="date AT TIME ZONE 'UTC'",
+        )
@@ -0,0 +1,31 @@
+"""transaction import fingerprint
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 19:46:50
+
+Statement imports fingerprint each record; the unique index makes
+re-importing a statement skip the rows that are already there.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transaction', sa.Column('import_fingerprint', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    op.create_index('uq_transaction_import_fingerprint', 'transaction', ['payment_source_id', 'import_fingerprint'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_transaction_import_fingerprint', table_name='transaction')
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.drop_column('import_fingerprint')
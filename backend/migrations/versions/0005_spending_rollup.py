@@ -0,0 +1,43 @@
+"""spending rollup
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 19:51:26
+
+Daily and monthly totals per category that the summary endpoints read
+instead of scanning transactions. Existing transactions are rolled up with
+`python manage.py rebuild-rollups`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import sqlmodel
+
+
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('spending_rollup',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('period', sa.Enum('DAY', 'MONTH', name='rollupperiod'), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    # the type already exists, created with the transaction table.
+    sa.Column('payment_source_type', postgresql.ENUM('BANK', 'CARD', 'CASH', name='paymenttype', create_type=False), nullable=False),
+    sa.Column('type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'period_start', 'category', 'payment_source_type', 'type')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('spending_rollup')
+    sa.Enum(name='rollupperiod').drop(op.get_bind(), checkfirst=True)
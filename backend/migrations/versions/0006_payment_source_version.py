@@ -0,0 +1,32 @@
+"""payment source version
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 19:54:36
+
+Version counters bumped by every balance change of a bank, card or cash
+entry. Setting a balance directly only succeeds if the version the request
+read is still current.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('bank', 'card', 'cash'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    for table in ('bank', 'card', 'cash'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
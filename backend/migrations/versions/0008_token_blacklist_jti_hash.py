@@ -0,0 +1,85 @@
+"""token blacklist jti hash
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 20:31:08
+
+Revoked tokens are stored as the sha256 of their `jti` instead of the full
+token text, with an indexed expiry so expired rows can be purged. Existing
+rows are converted; expired or unreadable ones are dropped.
+"""
+from typing import Sequence, Union
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+import hashlib
+import jwt
+
+
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+token_blacklist = sa.table(
+    'token_blacklist',
+    sa.column('id', sa.Integer()),
+    sa.column('token', sa.String()),
+    sa.column('jti_hash', sa.String()),
+    sa.column('expires_at', sa.DateTime(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    op.add_column('token_blacklist', sa.Column('jti_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    op.add_column('token_blacklist', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+
+    bind = op.get_bind()
+    now = datetime.now(timezone.utc)
+    seen = set()
+
+    for id, token in bind.execute(sa.select(token_blacklist.c.id, token_blacklist.c.token)).all():
+        try:
+            payload = jwt.decode(token, options={"verify_signature": False, "verify_exp": False})
+            expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+        except (jwt.InvalidTokenError, KeyError):
+            expires_at = None
+
+        # same key as routes.utils.revocation_key.
+        jti_hash = expires_at and hashlib.sha256((payload.get("jti") or token).encode()).hexdigest()
+
+        if not expires_at or expires_at < now or jti_hash in seen:
+            bind.execute(token_blacklist.delete().where(token_blacklist.c.id == id))
+            continue
+
+        seen.add(jti_hash)
+        bind.execute(
+            token_blacklist.update()
+            .where(token_blacklist.c.id == id)
+            .values(jti_hash=jti_hash, expires_at=expires_at)
+        )
+
+    with op.batch_alter_table('token_blacklist') as batch_op:
+        batch_op.alter_column('jti_hash', existing_type=sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False)
+        batch_op.alter_column('expires_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+        batch_op.drop_column('token')
+        batch_op.drop_column('expries_at')
+
+    op.create_index(op.f('ix_token_blacklist_jti_hash'), 'token_blacklist', ['jti_hash'], unique=True)
+    op.create_index(op.f('ix_token_blacklist_expires_at'), 'token_blacklist', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    # the token text can't be recovered from its hash: revocations are lost.
+    op.execute(token_blacklist.delete())
+    op.drop_index(op.f('ix_token_blacklist_expires_at'), table_name='token_blacklist')
+    op.drop_index(op.f('ix_token_blacklist_jti_hash'), table_name='token_blacklist')
+
+    with op.batch_alter_table('token_blacklist', recreate='always') as batch_op:
+        batch_op.drop_column('jti_hash')
+        batch_op.drop_column('expires_at')
+        batch_op.add_column(sa.Column('token', sqlmodel.sql.sqltypes.AutoString(), nullable=False))
+        batch_op.add_column(sa.Column('expries_at', sa.DateTime(), nullable=False))
@@ -0,0 +1,35 @@
+"""resource version
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 20:52:41
+
+Per user version of the payment source and transaction listings, behind
+their ETag and Last-Modified headers.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('resource_version',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('resource', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'resource')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('resource_version')
@@ -0,0 +1,38 @@
+"""balance snapshot
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 21:14:11
+
+Net change of every payment source's balance per day, that balance
+histories are summed from. Existing transactions are recorded with
+`python manage.py rebuild-balance-history`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('balance_snapshot',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    # the type already exists, created with the transaction table.
+    sa.Column('payment_source_type', postgresql.ENUM('BANK', 'CARD', 'CASH', name='paymenttype', create_type=False), nullable=False),
+    sa.Column('payment_source_id', sa.Uuid(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('delta', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'payment_source_type', 'payment_source_id', 'day')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('balance_snapshot')
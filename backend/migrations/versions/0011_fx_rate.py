@@ -0,0 +1,42 @@
+"""fx rate
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 21:22:29
+
+Daily exchange rates against the US dollar, and the currency each user's
+totals are converted to. Rates are loaded with
+`python manage.py load-fx-rates`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the type already exists, created with the bank table.
+currency = postgresql.ENUM('USD', 'EUR', 'GBP', 'INR', 'JPY', name='currency', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table('fx_rate',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('currency', currency, nullable=False),
+    sa.Column('per_usd', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'currency')
+    )
+    op.add_column('users', sa.Column('base_currency', currency, server_default='INR', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('base_currency')
+    op.drop_table('fx_rate')
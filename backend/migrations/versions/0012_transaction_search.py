@@ -0,0 +1,77 @@
+"""transaction search
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 21:33:53
+
+Full-text index over transaction categories and descriptions, for
+`GET /transactions/search` (see search.py). Both keep themselves up to date
+on insert, update and delete:
+
+  - postgres: a generated `search_vector` tsvector column with a GIN index.
+    Adding it rewrites the table, which takes a few minutes at 10M rows.
+  - sqlite: an FTS5 table over `transaction` kept in sync by triggers. It
+    points at rowids, which VACUUM and batch migrations of `transaction`
+    may renumber; run `python manage.py rebuild-search-index` after either.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0012'
+down_revision: Union[str, Sequence[str], None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the user's own lexeme ('#' and the id's hex, which no word can match)
+# lets one GIN index answer "this user's rows matching these words" without
+# btree_gin; categories rank above descriptions.
+SEARCH_VECTOR = """
+    ('#' || replace(user_id::text, '-', ''))::tsvector
+    || setweight(to_tsvector('simple', category), 'A')
+    || setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+"""
+
+SQLITE_TRIGGERS = (
+    """
+    CREATE TRIGGER transaction_fts_insert AFTER INSERT ON "transaction" BEGIN
+        INSERT INTO transaction_fts (rowid, category, description) VALUES (new.rowid, new.category, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER transaction_fts_delete AFTER DELETE ON "transaction" BEGIN
+        INSERT INTO transaction_fts (transaction_fts, rowid, category, description) VALUES ('delete', old.rowid, old.category, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER transaction_fts_update AFTER UPDATE OF category, description ON "transaction" BEGIN
+        INSERT INTO transaction_fts (transaction_fts, rowid, category, description) VALUES ('delete', old.rowid, old.category, old.description);
+        INSERT INTO transaction_fts (rowid, category, description) VALUES (new.rowid, new.category, new.description);
+    END
+    """,
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f'ALTER TABLE "transaction" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED')
+        op.create_index('ix_transaction_search', 'transaction', ['search_vector'], postgresql_using='gin')
+        return
+
+    op.execute("CREATE VIRTUAL TABLE transaction_fts USING fts5(category, description, content='transaction', content_rowid='rowid')")
+    op.execute("INSERT INTO transaction_fts (transaction_fts) VALUES ('rebuild')")
+    for trigger in SQLITE_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_transaction_search', table_name='transaction')
+        op.drop_column('transaction', 'search_vector')
+        return
+
+    for trigger in ('transaction_fts_insert', 'transaction_fts_delete', 'transaction_fts_update'):
+        op.execute(f'DROP TRIGGER {trigger}')
+    op.execute('DROP TABLE transaction_fts')
@@ -0,0 +1,41 @@
+"""token blacklist created at
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 21:56:17
+
+When each revoked token was inserted. Workers sync the blacklist by it
+instead of by id: ids are handed out at insert but become visible at
+commit, so a row can appear below ids a worker has already read. Existing
+rows get the time of the upgrade.
+"""
+from typing import Sequence, Union
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0013'
+down_revision: Union[str, Sequence[str], None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('token_blacklist', sa.Column('created_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(sa.table('token_blacklist', sa.column('created_at', sa.DateTime(timezone=True))).update().values(
+        created_at=datetime.now(timezone.utc)
+    ))
+
+    with op.batch_alter_table('token_blacklist') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+    op.create_index(op.f('ix_token_blacklist_created_at'), 'token_blacklist', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_token_blacklist_created_at'), table_name='token_blacklist')
+
+    with op.batch_alter_table('token_blacklist') as batch_op:
+        batch_op.drop_column('created_at')
@@ -0,0 +1,98 @@
+"""spending rollup currency
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 22:00:45
+
+Spending rollups are kept per currency of the payment source, so summaries
+can convert them instead of adding up amounts in different currencies. The
+rollup key has no payment source, so the rows are rebuilt from the
+transactions joined to their source. Transactions of deleted sources count
+as INR, the default currency of every source (see `rollups.DEFAULT_CURRENCY`).
+The rebuild reads every transaction: a few minutes at 10M rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '0014'
+down_revision: Union[str, Sequence[str], None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the type already exists, created with the bank table.
+currency = postgresql.ENUM('USD', 'EUR', 'GBP', 'INR', 'JPY', name='currency', create_type=False)
+
+KEY = ['user_id', 'period', 'period_start', 'category', 'payment_source_type', 'type']
+
+
+def rebuild(with_currency: bool) -> None:
+    """
+    Recomputes the daily and monthly rollups from the transactions, as
+    `python manage.py rebuild-rollups` does.
+    """
+    if op.get_bind().dialect.name == 'postgresql':
+        # buckets are UTC days, see rollups.period_starts.
+        periods = {
+            "'DAY'::rollupperiod": """("date" AT TIME ZONE 'UTC')::date""",
+            "'MONTH'::rollupperiod": """date_trunc('month', "date" AT TIME ZONE 'UTC')::date""",
+        }
+    else:
+        # timestamps are stored as UTC text without an offset.
+        periods = {
+            "'DAY'": 'date("date")',
+            "'MONTH'": """strftime('%Y-%m-01', "date")""",
+        }
+
+    source_currency = "coalesce(bank.currency, card.currency, cash.currency, 'INR')"
+    sources = """
+        LEFT JOIN bank ON t.payment_source_type = 'BANK' AND bank.id = t.payment_source_id
+        LEFT JOIN card ON t.payment_source_type = 'CARD' AND card.id = t.payment_source_id
+        LEFT JOIN cash ON t.payment_source_type = 'CASH' AND cash.id = t.payment_source_id
+    """
+    columns = ", ".join([*KEY, 'currency'] if with_currency else KEY)
+
+    op.execute('DELETE FROM spending_rollup')
+
+    for period, period_start in periods.items():
+        selected = f"t.user_id, {period}, {period_start}, t.category, t.payment_source_type, t.type"
+        if with_currency:
+            selected += f", {source_currency}"
+
+        op.execute(f"""
+            INSERT INTO spending_rollup ({columns}, total, count)
+            SELECT {selected}, sum(t.amount), count(*)
+            FROM "transaction" AS t {sources if with_currency else ''}
+            GROUP BY {selected}
+        """)
+
+
+def replace_primary_key(batch_op, columns: list[str]) -> None:
+    # sqlite's is unnamed; the batch copy takes the new one instead.
+    if op.get_bind().dialect.name == 'postgresql':
+        batch_op.drop_constraint('spending_rollup_pkey', type_='primary')
+    batch_op.create_primary_key('spending_rollup_pkey', columns)
+
+
+def upgrade() -> None:
+    op.add_column('spending_rollup', sa.Column('currency', currency, nullable=True))
+    rebuild(with_currency=True)
+
+    with op.batch_alter_table('spending_rollup') as batch_op:
+        batch_op.alter_column('currency', existing_type=currency, nullable=False)
+        replace_primary_key(batch_op, [*KEY[:5], 'currency', 'type'])
+
+
+def downgrade() -> None:
+    # totals of different currencies share a row again, rebuilt below.
+    op.execute('DELETE FROM spending_rollup')
+
+    with op.batch_alter_table('spending_rollup') as batch_op:
+        batch_op.drop_column('currency')
+        replace_primary_key(batch_op, KEY)
+
+    rebuild(with_currency=False)
@@ -2,3 +2,9 @@ from .user import *
 from .payment import *
 from .transaction import *
 from .token import *
+from .rollup import *
+from .job import *
+from .version import *
+from .dashboard import *
+from .balance import *
+from .fx import *
@@ -0,0 +1,50 @@
+from sqlmodel import SQLModel, Field
+from .payment import PaymentType, Currency
+from datetime import date
+from enum import Enum
+import uuid
+
+class Resolution(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    YEAR = "year"
+
+class SourceBalanceHistory(SQLModel):
+    payment_source_type: PaymentType
+    payment_source_id: uuid.UUID
+    name: str
+    currency: Currency
+    # bank and cash amounts; for cards minus the used amount, what they add
+    # to net worth. null before the source was created.
+    balances: list[float | None]
+
+class NetWorthHistory(SQLModel):
+    currency: Currency
+    balances: list[float]
+
+class BalanceHistory(SQLModel):
+    resolution: Resolution
+    # balances are at the end of each period, or of `to_date` for the last one.
+    periods: list[date]
+    sources: list[SourceBalanceHistory]
+    net_worth: list[NetWorthHistory]
+    # net worth over all currencies in `base_currency`, at the rates of the
+    # last day of each period; null where a rate is missing (see fx.py).
+    base_currency: Currency
+    base_net_worth: list[float | None]
+
+class BalanceSnapshot(SQLModel, table=True):
+    """
+    Net change of one payment source's balance over one UTC day, recorded by
+    `ledger` in the same DB transaction as the balance itself.
+    `python manage.py rebuild-balance-history` recomputes them from scratch.
+    """
+    __tablename__ = "balance_snapshot"
+
+    user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE", primary_key=True)
+    payment_source_type: PaymentType = Field(primary_key=True)
+    payment_source_id: uuid.UUID = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+
+    delta: float = 0
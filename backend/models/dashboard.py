@@ -0,0 +1,35 @@
+from sqlmodel import SQLModel
+from .payment import Currency, BankResponse, CardResponse, CashResponse
+from .transaction import TransactionResponse
+import uuid
+
+class CurrencyTotal(SQLModel):
+    currency: Currency
+    bank: float
+    cash: float
+    card_usage: float
+    card_limit: float
+    # card_usage / card_limit, null without cards.
+    card_utilization: float | None
+    # bank + cash - card_usage
+    net: float
+
+class CardUtilization(SQLModel):
+    card_id: uuid.UUID
+    name: str
+    currency: Currency
+    utilization: float | None
+
+class Dashboard(SQLModel):
+    banks: list[BankResponse]
+    cards: list[CardResponse]
+    cash: CashResponse | None
+    totals: list[CurrencyTotal]
+    card_utilization: list[CardUtilization]
+    # `totals` summed in `base_currency` at the latest rates, null when a
+    # rate is missing (see fx.py).
+    base_currency: Currency
+    base_total: CurrencyTotal | None
+    # newest first; continue with `/transactions/?cursor=<next_cursor>`.
+    transactions: list[TransactionResponse]
+    next_cursor: str | None = None
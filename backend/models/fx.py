@@ -0,0 +1,36 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import DateTime
+from pydantic import PositiveFloat
+from .payment import Currency
+from datetime import date, datetime, timezone
+
+class FxRateBase(SQLModel):
+    day: date
+    currency: Currency
+    # units of `currency` one US dollar bought on `day`.
+    per_usd: PositiveFloat
+
+class FxRateCreate(FxRateBase):
+    pass
+
+class FxRateLoadResponse(SQLModel):
+    loaded: int
+    first_day: date | None
+    last_day: date | None
+
+class FxRate(FxRateBase, table=True):
+    """
+    Daily exchange rates against the US dollar, loaded from a file with
+    `python manage.py load-fx-rates` or through `PUT /admin/fx-rates`;
+    nothing is fetched from the network. See fx.py.
+    """
+    __tablename__ = "fx_rate"
+
+    day: date = Field(primary_key=True)
+    currency: Currency = Field(primary_key=True)
+    per_usd: float
+
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True)
+    )
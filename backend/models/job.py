@@ -0,0 +1,67 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import JSON, DateTime, Index
+from .transaction import NLPTransactionCreate
+from datetime import datetime, timezone
+from enum import Enum
+import uuid
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class ExtractionMode(str, Enum):
+    SYNC = "sync"
+    ASYNC = "async"
+
+class ExtractionJobResponse(SQLModel):
+    id: uuid.UUID
+    status: JobStatus
+    attempts: int
+    result: list[NLPTransactionCreate] | None = None
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+class ExtractionJob(SQLModel, table=True):
+    """
+    A `create-transaction` text waiting for or done with extraction. Any API
+    worker can claim a queued job, see nlp/jobs.py.
+    """
+    __tablename__ = "extraction_job"
+    __table_args__ = (
+        # workers polling for the next job to claim.
+        Index("ix_extraction_job_status_run_after", "status", "run_after"),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE", index=True)
+    text: str
+
+    status: JobStatus = JobStatus.QUEUED
+    # bumped by every claim; a worker only writes back the attempt it claimed.
+    attempts: int = 0
+    result: list[dict] | None = Field(default=None, sa_type=JSON)
+    error: str | None = None
+
+    # not claimed before this (retry backoff).
+    run_after: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True)
+    )
+    # a running job whose worker didn't finish by then is claimed again.
+    claimed_until: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True)
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={
+            "onupdate": lambda: datetime.now(timezone.utc)
+        },
+        sa_type=DateTime(timezone=True)
+    )
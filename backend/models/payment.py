@@ -28,6 +28,7 @@ class BankCreate(BankBase):
 
 class BankResponse(BankBase):
     id: uuid.UUID
+    version: int
     created_at: datetime
     updated_at: datetime 
 
@@ -38,7 +39,10 @@ class BankUpdate(BaseModel):
 
 class Bank(BankBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE")
+    user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE", index=True)
+    account_no: str = Field(max_length=64, index=True)
+    # bumped by every balance change, see ledger.py.
+    version: int = 0
 
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -62,16 +66,20 @@ class CashCreate(CashBase):
 
 class CashResponse(CashBase):
     id: uuid.UUID
+    version: int
     created_at: datetime 
     updated_at: datetime
 
 class CashUpdate(BaseModel):
     amount: float | None = None
     currency: Currency | None = None
+    # `version` from the last read; the amount isn't changed if it moved on since.
+    version: int | None = None
 
 class Cash(CashBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE", unique=True)
+    version: int = 0
 
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -106,16 +114,21 @@ class CardUpdate(BaseModel):
     currency: Currency | None = None 
     issuing_bank_name: str | None = None
     card_network: str | None = None
+    # `version` from the last read; current_usage isn't changed if it moved on since.
+    version: int | None = None
 
 class CardResponse(CardBase):
     id: uuid.UUID
+    balance: float
+    version: int
     created_at: datetime
     updated_at: datetime
 
 class Card(CardBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE")
+    user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE", index=True)
     balance: float
+    version: int = 0
 
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -0,0 +1,48 @@
+from sqlmodel import SQLModel, Field
+from .payment import Currency, PaymentType
+from datetime import date
+from enum import Enum
+import uuid
+
+class RollupPeriod(str, Enum):
+    DAY = "day"
+    MONTH = "month"
+
+class SpendingSummary(SQLModel):
+    period_start: date
+    category: str
+    type: str
+    currency: Currency
+    # null when a currency in it has no exchange rate.
+    total: float | None
+    count: int
+
+class CategoryTotal(SQLModel):
+    category: str
+    type: str
+    currency: Currency
+    # null when a currency in it has no exchange rate.
+    total: float | None
+    count: int
+
+class SpendingRollup(SQLModel, table=True):
+    """
+    Running totals of a user's transactions per day and per month, kept up to
+    date by `rollups.record_transactions` in the same DB transaction as the
+    write. `python manage.py rebuild-rollups` recomputes them from scratch.
+    """
+    __tablename__ = "spending_rollup"
+
+    # primary key order is the lookup order: a user's rows for one period
+    # type over a range of period starts.
+    user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE", primary_key=True)
+    period: RollupPeriod = Field(primary_key=True)
+    period_start: date = Field(primary_key=True)
+    category: str = Field(primary_key=True)
+    payment_source_type: PaymentType = Field(primary_key=True)
+    # of the payment source, see `rollups.change_currency`.
+    currency: Currency = Field(primary_key=True)
+    type: str = Field(primary_key=True)
+
+    total: float = 0
+    count: int = 0
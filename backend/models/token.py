@@ -1,7 +1,8 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import DateTime
 from pydantic import BaseModel
 from uuid import UUID 
-from datetime import datetime
+from datetime import datetime, timezone
 
 class TokenResponse(BaseModel):
     access_token: str
@@ -12,8 +13,20 @@ class TokenData(BaseModel):
     email: str
 
 class Token(SQLModel, table=True):
+    """
+    A revoked token, stored as the sha256 of its `jti` (see
+    `routes.utils.revocation_key`). Rows are purged once the token has
+    expired anyway.
+    """
     __tablename__ = "token_blacklist"
 
     id: int = Field(default=None, primary_key=True)
-    token: str
-    expries_at: datetime
+    jti_hash: str = Field(max_length=64, unique=True, index=True)
+    expires_at: datetime = Field(sa_type=DateTime(timezone=True), index=True)
+    # when the row was inserted; workers sync the rows of the last few
+    # minutes by it, see `routes.utils.sync_token_blacklist`.
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),
+        index=True
+    )
@@ -1,6 +1,7 @@
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, DateTime, func
+from sqlalchemy import Column, DateTime, Index, func
 from .payment import PaymentType
+from pydantic import BaseModel
 from datetime import datetime, timezone
 from enum import Enum
 import uuid
@@ -11,6 +12,15 @@ class TransactionType(str, Enum):
     IADJUST = "IAdjust"
     DADJUST = "DAdjust"
 
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    OFX = "ofx"
+    QIF = "qif"
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
 class TransactionBase(SQLModel):
     amount: float
     category: str
@@ -33,17 +43,75 @@ class TransactionResponse(TransactionBase):
     created_at: datetime 
     updated_at: datetime
 
+class TransactionPage(SQLModel):
+    items: list[TransactionResponse]
+    next_cursor: str | None = None
+
+class TransactionSearchResult(TransactionResponse):
+    # higher is a better match; only comparable within one search.
+    rank: float
+
+class TransactionSearchPage(SQLModel):
+    items: list[TransactionSearchResult]
+    next_cursor: str | None = None
+
+class TransactionBulkResult(SQLModel):
+    index: int
+    id: uuid.UUID | None = None
+    error: str | None = None
+
+class TransactionBulkResponse(SQLModel):
+    created: int
+    failed: int
+    results: list[TransactionBulkResult]
+
+class CsvColumnMapping(BaseModel):
+    """
+    Which CSV header holds each field. Either `amount` (negative for
+    expenses) or both `debit` and `credit` columns must be present.
+    """
+    date: str = "date"
+    amount: str | None = "amount"
+    debit: str | None = None
+    credit: str | None = None
+    description: str | None = "description"
+    category: str | None = "category"
+    delimiter: str = ","
+
+class TransactionImportResponse(SQLModel):
+    parsed: int
+    imported: int
+    duplicates: int
+    skipped: int
+    errors: list[str]
+
 class NLPTransactionCreate(TransactionCreate):
     pass
 
 class Transaction(TransactionBase, table=True):
+    __table_args__ = (
+        # keyset pagination in get_transactions walks (created_at, id) per user.
+        Index("ix_transaction_user_created_id", "user_id", "created_at", "id"),
+        # date range filters in get_transactions.
+        Index("ix_transaction_user_date", "user_id", "date"),
+        # re-importing a statement skips rows that were already imported.
+        Index("uq_transaction_import_fingerprint", "payment_source_id", "import_fingerprint", unique=True),
+        # the full-text index of search.py differs per database, it only
+        # exists in migration 0012.
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE")
 
     type: str
+    date: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True)
+    )
 
-    payment_source_id: uuid.UUID
+    payment_source_id: uuid.UUID = Field(index=True)
     payment_source_type: PaymentType
+    import_fingerprint: str | None = Field(default=None, max_length=64)
 
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
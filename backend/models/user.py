@@ -2,12 +2,15 @@ from sqlmodel import SQLModel, Field
 from datetime import datetime, timezone
 from sqlalchemy.types import DateTime
 from pydantic import EmailStr
+from .payment import Currency
 import uuid
 
 class UserBase(SQLModel):
     first_name: str
     last_name: str | None = None
     email: EmailStr = Field(unique=True)
+    # what totals across currencies are converted to, see fx.py.
+    base_currency: Currency = Currency.INR
 
 class UserCreate(UserBase):
     password: str
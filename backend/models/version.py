@@ -0,0 +1,28 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import DateTime
+from datetime import datetime, timezone
+from enum import Enum
+import uuid
+
+class Resource(str, Enum):
+    BANK = "bank"
+    CARD = "card"
+    CASH = "cash"
+    TRANSACTIONS = "transactions"
+
+class ResourceVersion(SQLModel, table=True):
+    """
+    Bumped by `versions.touch` in the same DB transaction as every write to
+    one of a user's listings, so a listing's ETag only needs this row.
+    """
+    __tablename__ = "resource_version"
+
+    user_id: uuid.UUID = Field(foreign_key="users.id", ondelete="CASCADE", primary_key=True)
+    # a `Resource` value; plain text so new listings need no enum migration.
+    resource: str = Field(max_length=32, primary_key=True)
+    version: int = 0
+
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True)
+    )
@@ -0,0 +1,5 @@
+from .schema import ExtractedTransaction
+from .engine import ExtractionEngine, extraction_engine
+from .sources import PaymentSources, load_payment_sources, match_payment_source, resolve_transactions
+from .extract import extract_transactions, extraction_stats
+from .jobs import ExtractionJobWorkers, job_workers, enqueue_job, get_job, cancel_job
@@ -0,0 +1,263 @@
+from fastapi import HTTPException, status
+from ollama import AsyncClient
+from pydantic import TypeAdapter, ValidationError
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from .schema import ExtractedTransaction, BatchExtraction
+import asyncio
+import json
+import logging
+import os
+
+load_dotenv()
+
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+# texts sent to the model in one prompt.
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", 8))
+# how long an idle engine waits for more texts before sending a batch.
+NLP_BATCH_WAIT = float(os.getenv("NLP_BATCH_WAIT_MS", 20)) / 1000
+# prompts in flight to the model at once.
+NLP_MAX_CONCURRENCY = int(os.getenv("NLP_MAX_CONCURRENCY", 2))
+# seconds a request waits for its result, queueing included.
+NLP_TIMEOUT = float(os.getenv("NLP_TIMEOUT", 30))
+# texts waiting for a batch; beyond this requests are shed with 503.
+NLP_QUEUE_LIMIT = int(os.getenv("NLP_QUEUE_LIMIT", 256))
+
+SYSTEM_PROMPT = """\
+You extract financial transactions from short texts written by users of a personal finance app.
+The user message is JSON with today's date and numbered inputs. For every input return the
+transactions it describes, under the input's index:
+- amount: positive number, without the currency
+- type: "Expense" for money spent or sent, "Income" for money received
+- category: one or two lowercase words, e.g. "groceries", "rent", "salary"
+- date: ISO 8601 date when the text mentions one (resolve "yesterday" against today), else null
+- description: a short summary of the text
+- payment_source_type: "Bank", "Card" or "Cash" when the text says how it was paid, else null
+- payment_source_name: the bank or card name mentioned, e.g. "hdfc", else null
+Return an empty list for inputs that don't describe a transaction."""
+
+log = logging.getLogger(__name__)
+_transaction = TypeAdapter(ExtractedTransaction)
+
+
+@dataclass
+class _Pending:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float
+
+@dataclass
+class ExtractionStats:
+    requests: int = 0
+    batches: int = 0
+    timeouts: int = 0
+    rejected: int = 0
+    failed: int = 0
+    prompt_tokens: int = 0
+    eval_tokens: int = 0
+    eval_seconds: float = 0.0
+    queue_wait_total: float = 0.0
+    queue_wait_max: float = 0.0
+    batch_sizes: dict[int, int] = field(default_factory=dict)
+
+
+class ExtractionEngine:
+    """
+    Extracts transactions from free text with the local Ollama model.
+
+    Concurrent `extract` calls are queued and sent together: one prompt holds
+    up to `batch_size` texts, and at most `max_concurrency` prompts are in
+    flight. While all slots are busy texts keep queueing, so batches grow
+    with load instead of the queue of prompts.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient | None = None,
+        model: str = OLLAMA_MODEL,
+        batch_size: int = NLP_BATCH_SIZE,
+        batch_wait: float = NLP_BATCH_WAIT,
+        max_concurrency: int = NLP_MAX_CONCURRENCY,
+        timeout: float = NLP_TIMEOUT,
+        queue_limit: int = NLP_QUEUE_LIMIT,
+    ):
+        self.client = client or AsyncClient(host=OLLAMA_HOST, timeout=timeout)
+        self.model = model
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        self.queue_limit = queue_limit
+        self.max_concurrency = max_concurrency
+
+        self._queue: asyncio.Queue[_Pending] | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._collector: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self._stats = ExtractionStats()
+
+    def start(self) -> None:
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self) -> None:
+        tasks = [*self._running, *([self._collector] if self._collector else [])]
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._collector = None
+
+    async def extract(self, text: str) -> list[ExtractedTransaction]:
+        self.start()
+
+        if self._queue.qsize() >= self.queue_limit:
+            self._stats.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put_nowait(_Pending(text, future, loop.time()))
+        self._stats.requests += 1
+
+        try:
+            # cancels the future on timeout, so a queued text is dropped from its batch.
+            return await asyncio.wait_for(future, self.timeout)
+        except TimeoutError:
+            self._stats.timeouts += 1
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="transaction extraction timed out.")
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), deadline - loop.time()))
+                except TimeoutError:
+                    break
+
+            batch = [pending for pending in batch if not pending.future.done()]
+
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: list[_Pending]) -> None:
+        sent_at = asyncio.get_running_loop().time()
+        stats = self._stats
+
+        for pending in batch:
+            wait = sent_at - pending.enqueued_at
+            stats.queue_wait_total += wait
+            stats.queue_wait_max = max(stats.queue_wait_max, wait)
+        stats.batches += 1
+        stats.batch_sizes[len(batch)] = stats.batch_sizes.get(len(batch), 0) + 1
+
+        try:
+            results = await self._prompt([pending.text for pending in batch])
+        except Exception as e:
+            log.warning("extraction batch of %d failed: %r", len(batch), e)
+            stats.failed += len(batch)
+            results = {}
+        finally:
+            self._slots.release()
+
+        for index, pending in enumerate(batch):
+            if pending.future.done():
+                continue
+
+            if index in results:
+                pending.future.set_result(results[index])
+            else:
+                pending.future.set_exception(HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail="couldn't extract transactions from the text."
+                ))
+
+    async def _prompt(self, texts: list[str]) -> dict[int, list[ExtractedTransaction]]:
+        """
+        Sends one prompt for `texts`. Returns the valid transactions of each
+        text by position; a text missing from the answer is left out.
+        """
+        content = json.dumps({
+            "today": datetime.now(timezone.utc).date().isoformat(),
+            "inputs": [{"index": index, "text": text} for index, text in enumerate(texts)],
+        })
+        response = await self.client.chat(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": content},
+            ],
+            format=BatchExtraction.model_json_schema(),
+            options={"temperature": 0},
+        )
+
+        self._stats.prompt_tokens += response.prompt_eval_count or 0
+        self._stats.eval_tokens += response.eval_count or 0
+        self._stats.eval_seconds += (response.eval_duration or 0) / 1e9
+
+        # validated per transaction, one bad item doesn't fail the whole batch.
+        answer = json.loads(response.message.content)
+        results = {}
+
+        for result in answer.get("results", []):
+            try:
+                index = int(result["index"])
+                items = list(result["transactions"])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+            if 0 <= index < len(texts):
+                results[index] = []
+                for item in items:
+                    try:
+                        results[index].append(_transaction.validate_python(item))
+                    except ValidationError:
+                        continue
+
+        return results
+
+    def stats(self) -> dict:
+        stats = self._stats
+        sent = sum(size * count for size, count in stats.batch_sizes.items())
+
+        return {
+            "requests": stats.requests,
+            "batches": stats.batches,
+            "avg_batch_size": sent / stats.batches if stats.batches else 0,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_flight_batches": len(self._running),
+            "timeouts": stats.timeouts,
+            "rejected": stats.rejected,
+            "failed": stats.failed,
+            "prompt_tokens": stats.prompt_tokens,
+            "eval_tokens": stats.eval_tokens,
+            "tokens_per_second": stats.eval_tokens / stats.eval_seconds if stats.eval_seconds else 0,
+            "queue_wait_avg_ms": stats.queue_wait_total / sent * 1000 if sent else 0,
+            "queue_wait_max_ms": stats.queue_wait_max * 1000,
+        }
+
+
+extraction_engine = ExtractionEngine()
@@ -0,0 +1,51 @@
+from cache import TTLCache
+from datetime import datetime, timezone
+from .engine import extraction_engine
+from .rules import NLP_RULES_MIN_CONFIDENCE, normalize, parse
+from .schema import ExtractedTransaction
+from .sources import PaymentSources
+import os
+
+
+# LLM answers by text; they don't depend on the user, only on the words and
+# on today's date for texts like "yesterday".
+extraction_cache = TTLCache(
+    maxsize=int(os.getenv("NLP_CACHE_SIZE", 10_000)),
+    ttl=float(os.getenv("NLP_CACHE_TTL", 3600))
+)
+path_counts = {"rules": 0, "cache": 0, "llm": 0}
+
+
+async def extract_transactions(text: str, sources: PaymentSources) -> list[ExtractedTransaction]:
+    """
+    Tries the rule parser first, then previous LLM answers for the same
+    normalized text, and only then the LLM.
+    """
+    result = parse(text, sources)
+
+    if result.confidence >= NLP_RULES_MIN_CONFIDENCE:
+        path_counts["rules"] += 1
+        return result.transactions
+
+    key = (datetime.now(timezone.utc).date(), normalize(text))
+    cached = extraction_cache.get(key)
+
+    if cached is not None:
+        path_counts["cache"] += 1
+        return cached
+
+    transactions = await extraction_engine.extract(text)
+    extraction_cache.set(key, transactions)
+    path_counts["llm"] += 1
+
+    return transactions
+
+def extraction_stats() -> dict:
+    total = sum(path_counts.values())
+
+    return {
+        "paths": dict(path_counts),
+        "hit_rates": {path: count / total if total else 0 for path, count in path_counts.items()},
+        "cache": extraction_cache.stats(),
+        "engine": extraction_engine.stats(),
+    }
@@ -0,0 +1,319 @@
+"""
+Background extraction for `create-transaction?mode=async`.
+
+The request only stores an `ExtractionJob` and returns its id. One poller
+in every API process claims queued jobs for its idle workers with a guarded
+`UPDATE` (the row's `attempts` must still be what it read), so a job runs
+on one worker at a time without row locks, and hands them over through an
+`asyncio.Queue`. A claim is a lease: if the worker dies, the job is claimed
+again once `claimed_until` passes.
+"""
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, func, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import datetime, timedelta, timezone
+from db import async_session
+from models import ExtractionJob, JobStatus
+from .engine import NLP_TIMEOUT
+from .extract import extract_transactions
+from .sources import PaymentSources, load_payment_sources, resolve_transactions
+from uuid import UUID
+import asyncio
+import logging
+import os
+
+
+NLP_JOB_WORKERS = int(os.getenv("NLP_JOB_WORKERS", 8))
+NLP_JOB_MAX_ATTEMPTS = int(os.getenv("NLP_JOB_MAX_ATTEMPTS", 3))
+# queued jobs across all users; beyond this new jobs are refused with 503.
+NLP_JOB_QUEUE_LIMIT = int(os.getenv("NLP_JOB_QUEUE_LIMIT", 1000))
+NLP_JOB_POLL_SECONDS = float(os.getenv("NLP_JOB_POLL_SECONDS", 1))
+# an empty queue is polled less and less often, up to this; jobs queued in
+# this process are picked up straight away regardless.
+NLP_JOB_POLL_MAX_SECONDS = float(os.getenv("NLP_JOB_POLL_MAX_SECONDS", 30))
+NLP_JOB_LEASE_SECONDS = float(os.getenv("NLP_JOB_LEASE_SECONDS", NLP_TIMEOUT * 2))
+# finished jobs are deleted this long after they finished.
+NLP_JOB_RETENTION_HOURS = float(os.getenv("NLP_JOB_RETENTION_HOURS", 24))
+
+ACTIVE = (JobStatus.QUEUED, JobStatus.RUNNING)
+FINISHED = (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+# model unavailable, busy or slow: worth another attempt.
+RETRYABLE = {
+    status.HTTP_502_BAD_GATEWAY,
+    status.HTTP_503_SERVICE_UNAVAILABLE,
+    status.HTTP_504_GATEWAY_TIMEOUT,
+}
+
+log = logging.getLogger(__name__)
+
+
+async def enqueue_job(db: AsyncSession, user_id: UUID, text: str) -> ExtractionJob:
+    queued = (await db.exec(
+        select(func.count())
+        .select_from(ExtractionJob)
+        .filter(ExtractionJob.status == JobStatus.QUEUED)
+    )).one()
+
+    if queued >= NLP_JOB_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+    job = ExtractionJob(user_id=user_id, text=text)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    job_workers.wake()
+
+    return job
+
+async def get_job(db: AsyncSession, job_id: UUID, user_id: UUID) -> ExtractionJob:
+    job = (await db.exec(
+        select(ExtractionJob)
+        .filter(ExtractionJob.id == job_id)
+        .filter(ExtractionJob.user_id == user_id)
+    )).first()
+
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="job not found.")
+
+    return job
+
+async def cancel_job(db: AsyncSession, job_id: UUID, user_id: UUID) -> ExtractionJob:
+    job = await get_job(db, job_id, user_id)
+
+    cancelled = await db.exec(
+        update(ExtractionJob)
+        .filter(ExtractionJob.id == job.id)
+        .filter(ExtractionJob.status.in_(ACTIVE))
+        .values(status=JobStatus.CANCELLED, claimed_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await db.refresh(job)
+
+    if cancelled.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"job already {job.status.value}.")
+
+    # stop waiting on it here; a worker in another process drops the result instead.
+    job_workers.cancel_local(job.id)
+
+    return job
+
+
+class ExtractionJobWorkers:
+    """
+    `workers` tasks per process, each running one job at a time, fed by a
+    single poller. Their extractions go through the same `ExtractionEngine`,
+    which batches them.
+    """
+
+    def __init__(
+        self,
+        workers: int = NLP_JOB_WORKERS,
+        max_attempts: int = NLP_JOB_MAX_ATTEMPTS,
+        poll_interval: float = NLP_JOB_POLL_SECONDS,
+        max_poll_interval: float = NLP_JOB_POLL_MAX_SECONDS,
+        lease: float = NLP_JOB_LEASE_SECONDS,
+        retention: float = NLP_JOB_RETENTION_HOURS,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(max_poll_interval, poll_interval)
+        self.lease = timedelta(seconds=lease)
+        self.retention = timedelta(hours=retention)
+
+        self._tasks: list[asyncio.Task] = []
+        self._poller: asyncio.Task | None = None
+        self._wake: asyncio.Event | None = None
+        self._jobs: asyncio.Queue[ExtractionJob] | None = None
+        # claimed jobs waiting in `_jobs` or being processed.
+        self._busy = 0
+        self._running: dict[UUID, asyncio.Task] = {}
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._wake = asyncio.Event()
+            self._jobs = asyncio.Queue()
+            self._busy = 0
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+            self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks, self._poller] if self._poller else self._tasks
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # jobs left running or waiting in the queue are claimed again when their lease runs out.
+        self._tasks = []
+        self._poller = None
+
+    def wake(self) -> None:
+        # a job was queued or a worker freed up in this process, don't wait for the next poll.
+        if self._wake:
+            self._wake.set()
+
+    def cancel_local(self, job_id: UUID) -> None:
+        if task := self._running.get(job_id):
+            task.cancel()
+
+    async def _poll(self) -> None:
+        swept_at = datetime.min.replace(tzinfo=timezone.utc)
+        interval = self.poll_interval
+
+        while True:
+            self._wake.clear()
+            claimed = 0
+
+            try:
+                idle = self.workers - self._busy
+                if idle > 0:
+                    for job in await self._claim(idle):
+                        self._busy += 1
+                        self._jobs.put_nowait(job)
+                        claimed += 1
+
+                if datetime.now(timezone.utc) - swept_at > timedelta(minutes=1):
+                    await self._sweep()
+                    swept_at = datetime.now(timezone.utc)
+            except Exception as e:
+                log.warning("extraction job poller: %r", e)
+
+            # back off while the table has nothing for us; all workers busy
+            # isn't an empty queue, they wake the poller as they finish.
+            if claimed or self._busy >= self.workers:
+                interval = self.poll_interval
+            else:
+                interval = min(interval * 2, self.max_poll_interval)
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except TimeoutError:
+                pass
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._jobs.get()
+
+            try:
+                await self._process(job)
+            except Exception as e:
+                log.warning("extraction job worker: %r", e)
+            finally:
+                self._busy -= 1
+                self.wake()
+
+    async def _claim(self, limit: int) -> list[ExtractionJob]:
+        now = datetime.now(timezone.utc)
+        jobs = []
+
+        async with async_session() as db:
+            candidates = (await db.exec(
+                select(ExtractionJob.id, ExtractionJob.attempts)
+                .filter(or_(
+                    and_(ExtractionJob.status == JobStatus.QUEUED, ExtractionJob.run_after <= now),
+                    and_(ExtractionJob.status == JobStatus.RUNNING, ExtractionJob.claimed_until < now),
+                ))
+                .order_by(ExtractionJob.run_after)
+                .limit(limit)
+            )).all()
+
+            for job_id, attempts in candidates:
+                claimed = await db.exec(
+                    update(ExtractionJob)
+                    .filter(ExtractionJob.id == job_id)
+                    .filter(ExtractionJob.attempts == attempts)
+                    .filter(ExtractionJob.status.in_(ACTIVE))
+                    .values(status=JobStatus.RUNNING, attempts=attempts + 1, claimed_until=now + self.lease)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+
+                # another process got it first when nothing was updated.
+                if claimed.rowcount:
+                    jobs.append(await db.get(ExtractionJob, job_id))
+
+        return jobs
+
+    async def _process(self, job: ExtractionJob) -> None:
+        if job.attempts > self.max_attempts:
+            # its last worker never came back.
+            await self._finish(job, status=JobStatus.FAILED, error="extraction didn't finish.")
+            return
+
+        async with async_session() as db:
+            sources = await load_payment_sources(job.user_id, db)
+
+        # only the extraction is cancelled with the job, never a query halfway through.
+        work = asyncio.create_task(self._extract(job, sources))
+        self._running[job.id] = work
+
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # shutting down, not a cancelled job.
+                work.cancel()
+                raise
+            return
+        except HTTPException as e:
+            await self._retry_or_fail(job, str(e.detail), retryable=e.status_code in RETRYABLE)
+            return
+        except Exception as e:
+            log.warning("extraction job %s failed: %r", job.id, e)
+            await self._retry_or_fail(job, "extraction failed.", retryable=True)
+            return
+        finally:
+            self._running.pop(job.id, None)
+
+        await self._finish(job, status=JobStatus.DONE, result=result, error=None)
+
+    async def _extract(self, job: ExtractionJob, sources: PaymentSources) -> list[dict]:
+        transactions = resolve_transactions(await extract_transactions(job.text, sources), sources)
+
+        return [transaction.model_dump(mode="json") for transaction in transactions]
+
+    async def _retry_or_fail(self, job: ExtractionJob, error: str, retryable: bool) -> None:
+        if retryable and job.attempts < self.max_attempts:
+            backoff = timedelta(seconds=min(2 ** job.attempts, 60))
+            await self._finish(job, status=JobStatus.QUEUED, error=error, run_after=datetime.now(timezone.utc) + backoff)
+        else:
+            await self._finish(job, status=JobStatus.FAILED, error=error)
+
+    async def _finish(self, job: ExtractionJob, **values) -> None:
+        # only while it's still our claim: not cancelled, not re-claimed after our lease ran out.
+        async with async_session() as db:
+            await db.exec(
+                update(ExtractionJob)
+                .filter(ExtractionJob.id == job.id)
+                .filter(ExtractionJob.attempts == job.attempts)
+                .filter(ExtractionJob.status == JobStatus.RUNNING)
+                .values(**values, claimed_until=None)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def _sweep(self) -> None:
+        async with async_session() as db:
+            await db.exec(
+                delete(ExtractionJob)
+                .filter(ExtractionJob.status.in_(FINISHED))
+                .filter(ExtractionJob.updated_at < datetime.now(timezone.utc) - self.retention)
+            )
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "running": len(self._running),
+            "claimed": self._busy,
+        }
+
+
+job_workers = ExtractionJobWorkers()
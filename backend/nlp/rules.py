@@ -0,0 +1,186 @@
+"""
+Deterministic parser for the common one-transaction texts, e.g.
+"spent 250 on groceries with hdfc card" or "got 5000 salary in sbi yesterday".
+
+It reads the amount, currency, type, date, category and payment source
+(matched against the user's own banks and cards) with a few patterns and
+scores how sure it is. Below `NLP_RULES_MIN_CONFIDENCE` the text goes to the LLM.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from models import Currency, PaymentType
+from .schema import ExtractedTransaction
+from .sources import PaymentSources, match_payment_source
+import os
+import re
+
+
+CURRENCY_TOKENS = {
+    "₹": Currency.INR, "rs": Currency.INR, "rs.": Currency.INR, "inr": Currency.INR, "rupees": Currency.INR,
+    "$": Currency.USD, "usd": Currency.USD, "dollars": Currency.USD,
+    "€": Currency.EUR, "eur": Currency.EUR, "euros": Currency.EUR,
+    "£": Currency.GBP, "gbp": Currency.GBP, "pounds": Currency.GBP,
+    "¥": Currency.JPY, "jpy": Currency.JPY, "yen": Currency.JPY,
+}
+INCOME_WORDS = {"received", "receive", "got", "salary", "credited", "earned", "refund", "refunded", "income", "deposited", "cashback"}
+EXPENSE_WORDS = {"spent", "spend", "paid", "pay", "bought", "buy", "purchased", "debited", "sent", "withdrew", "bill"}
+STOP_WORDS = {"a", "an", "the", "my", "some", "of", "with", "using", "via", "from", "in", "to", "at", "on", "for", "by", "and", "i", "me"}
+# words that say how or when, never what the money was for. Nouns like
+# "salary" or "refund" stay usable as categories.
+NOT_CATEGORY = (
+    STOP_WORDS | set(CURRENCY_TOKENS)
+    | {"received", "receive", "got", "credited", "earned", "deposited", "spent", "spend", "paid", "pay", "bought",
+       "buy", "purchased", "debited", "sent", "withdrew", "card", "credit", "debit", "bank", "account", "upi", "cash", "days", "ago"}
+)
+MONTHS = {month: index for index, month in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+
+_currency = "|".join(re.escape(token) for token in sorted(CURRENCY_TOKENS, key=len, reverse=True))
+# "₹1,250", "250rs", "1.5k", but not the 2 in "card2" or "2nd".
+AMOUNT = re.compile(
+    rf"(?:(?P<before>{_currency})\s*|(?<![\w.]))(?P<amount>\d{{1,3}}(?:,\d{{2,3}})+(?:\.\d+)?|\d+(?:\.\d+)?)(?P<k>k)?(?:\s*(?P<after>{_currency}))?(?!\w)"
+)
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+# not ".", that's a decimal amount.
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?\b")
+NAMED_DATE = re.compile(r"\b(?:(\d{1,2})(?:st|nd|rd|th)?\s+([a-z]{3})[a-z]*|([a-z]{3})[a-z]*\s+(\d{1,2})(?:st|nd|rd|th)?)\b")
+DAYS_AGO = re.compile(r"\b(\d+)\s+days?\s+ago\b")
+CATEGORY = re.compile(r"\b(?:on|for|at)\s+((?:[a-z]+\s*){1,2})")
+
+NLP_RULES_MIN_CONFIDENCE = float(os.getenv("NLP_RULES_MIN_CONFIDENCE", 0.75))
+
+
+class RuleResult(NamedTuple):
+    transactions: list[ExtractedTransaction]
+    confidence: float
+
+def normalize(text: str) -> str:
+    # the cache key: same words, any case and spacing.
+    return " ".join(text.lower().split()).strip(" .!?")
+
+def _date(text: str, today: datetime) -> tuple[datetime | None, str]:
+    """
+    Returns the date the text mentions, or None, and the text with it removed
+    so its numbers aren't read as the amount.
+    """
+    if "day before yesterday" in text:
+        return today - timedelta(days=2), text.replace("day before yesterday", " ")
+    if "yesterday" in text:
+        return today - timedelta(days=1), text.replace("yesterday", " ")
+    if "today" in text:
+        return today, text.replace("today", " ")
+
+    if match := DAYS_AGO.search(text):
+        return today - timedelta(days=int(match.group(1))), text[:match.start()] + " " + text[match.end():]
+
+    try:
+        if match := ISO_DATE.search(text):
+            year, month, day = map(int, match.groups())
+        elif match := NUMERIC_DATE.search(text):
+            # day first, as the app's users write it.
+            day, month = int(match.group(1)), int(match.group(2))
+            year = int(match.group(3)) if match.group(3) else today.year
+            year += 2000 if year < 100 else 0
+        elif match := next((m for m in NAMED_DATE.finditer(text) if (m.group(2) or m.group(3)) in MONTHS), None):
+            day = int(match.group(1) or match.group(4))
+            month = MONTHS[match.group(2) or match.group(3)]
+            year = today.year
+        else:
+            return None, text
+
+        date = today.replace(year=year, month=month, day=day)
+    except ValueError:
+        return None, text
+
+    # "5 dec" read in january means last december.
+    if date > today and not (match.re is ISO_DATE or (match.re is NUMERIC_DATE and match.group(3))):
+        date = date.replace(year=date.year - 1)
+
+    return date, text[:match.start()] + " " + text[match.end():]
+
+def _source_names(sources: PaymentSources) -> list[tuple[PaymentType, str]]:
+    names = [(PaymentType.BANK, bank.name.lower()) for bank in sources.banks if bank.name]
+    for card in sources.cards:
+        names += [(PaymentType.CARD, name.lower()) for name in (card.name, card.issuing_bank_name) if name]
+
+    return names
+
+def parse(text: str, sources: PaymentSources, now: datetime | None = None) -> RuleResult:
+    now = now or datetime.now(timezone.utc)
+    confidence = 1.0
+    normalized = normalize(text)
+
+    date, rest = _date(normalized, now)
+
+    amounts = list(AMOUNT.finditer(rest))
+    if len(amounts) != 1:
+        # none, or several transactions / numbers we can't tell apart.
+        return RuleResult([], 0.0)
+
+    match = amounts[0]
+    amount = float(match.group("amount").replace(",", "")) * (1000 if match.group("k") else 1)
+    if amount <= 0:
+        return RuleResult([], 0.0)
+
+    currency = CURRENCY_TOKENS.get(match.group("before") or match.group("after") or "")
+    rest = rest[:match.start()] + " " + rest[match.end():]
+    words = set(re.findall(r"[a-z]+", rest))
+
+    if words & INCOME_WORDS and not words & EXPENSE_WORDS:
+        transaction_type = "Income"
+    elif words & EXPENSE_WORDS and not words & INCOME_WORDS:
+        transaction_type = "Expense"
+    else:
+        # most texts are spending; fine unless something else is unsure too.
+        transaction_type = "Expense"
+        confidence *= 0.85
+
+    # payment source: "cash", or the user's own bank/card names as whole words.
+    if "cash" in words:
+        payment_type, payment_name = PaymentType.CASH, None
+    else:
+        hinted = PaymentType.CARD if "card" in words else PaymentType.BANK if words & {"bank", "account", "upi"} else None
+        named = {
+            (source_type, name) for source_type, name in _source_names(sources)
+            if re.search(rf"(?<!\w){re.escape(name)}(?!\w)", rest) and hinted in (None, source_type)
+        }
+        payment_type, payment_name = next(iter(named)) if len(named) == 1 else (hinted, None)
+
+    resolved = match_payment_source(sources, payment_type, payment_name)
+    if not resolved:
+        confidence *= 0.3
+    else:
+        source = next(
+            source for source in (*sources.banks, *sources.cards, *([sources.cash] if sources.cash else []))
+            if source.id == resolved[1]
+        )
+        if currency and currency != source.currency:
+            # "$20 with hdfc card" on an INR card: something we don't model.
+            confidence *= 0.3
+        if not payment_name and payment_type != PaymentType.CASH:
+            # only source of the hinted type.
+            confidence *= 0.9
+
+    # "on groceries", "for rent", else the first word that can be a category.
+    source_words = {word for _, name in _source_names(sources) for word in name.split()}
+    usable = lambda word: word not in NOT_CATEGORY and word not in source_words
+
+    category = None
+    if category_match := CATEGORY.search(rest):
+        category = " ".join(filter(usable, category_match.group(1).split())) or None
+    if not category:
+        category = next(filter(usable, re.findall(r"[a-z]+", rest)), None)
+        confidence *= 0.85 if category else 0.7
+
+    transaction = ExtractedTransaction(
+        amount=amount,
+        category=category or "general",
+        type=transaction_type,
+        date=date,
+        description=text.strip(),
+        payment_source_type=payment_type,
+        payment_source_name=payment_name,
+    )
+
+    return RuleResult([transaction], confidence)
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from models.payment import PaymentType
+from datetime import datetime
+
+
+class ExtractedTransaction(BaseModel):
+    """
+    A transaction as the model reads it from the text. The payment source is
+    a name, `sources.resolve_transactions` maps it to one of the user's own.
+    """
+    amount: float = Field(gt=0)
+    category: str
+    type: str = Field(pattern="^(Expense|Income)$")
+    date: datetime | None = None
+    description: str | None = None
+    payment_source_type: PaymentType | None = None
+    payment_source_name: str | None = None
+
+class ExtractionResult(BaseModel):
+    index: int
+    transactions: list[ExtractedTransaction]
+
+class BatchExtraction(BaseModel):
+    # what the model is asked to answer for a batch of texts.
+    results: list[ExtractionResult]
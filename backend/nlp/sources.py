@@ -0,0 +1,88 @@
+from fastapi import HTTPException, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Bank, Card, Cash, PaymentType, NLPTransactionCreate
+from typing import NamedTuple
+from uuid import UUID
+from .schema import ExtractedTransaction
+
+
+class PaymentSources(NamedTuple):
+    banks: list[Bank]
+    cards: list[Card]
+    cash: Cash | None
+
+async def load_payment_sources(user_id: UUID, db: AsyncSession) -> PaymentSources:
+    banks = (await db.exec(select(Bank).filter(Bank.user_id == user_id))).all()
+    cards = (await db.exec(select(Card).filter(Card.user_id == user_id))).all()
+    cash = (await db.exec(select(Cash).filter(Cash.user_id == user_id))).first()
+
+    return PaymentSources(list(banks), list(cards), cash)
+
+def _names(source: Bank | Card) -> list[str]:
+    names = [source.name]
+    if isinstance(source, Card):
+        names.append(source.issuing_bank_name)
+
+    return [name.lower() for name in names if name]
+
+def match_payment_source(
+    sources: PaymentSources, payment_type: PaymentType | None, name: str | None
+) -> tuple[PaymentType, UUID] | None:
+    """
+    Finds the user's bank account or card called `name` (either name contains
+    the other, case insensitive). Without a usable name, falls back to the only
+    source of `payment_type` the user has.
+    """
+    if payment_type == PaymentType.CASH:
+        return (PaymentType.CASH, sources.cash.id) if sources.cash else None
+
+    candidates = []
+    if payment_type in (None, PaymentType.BANK):
+        candidates += [(PaymentType.BANK, bank) for bank in sources.banks]
+    if payment_type in (None, PaymentType.CARD):
+        candidates += [(PaymentType.CARD, card) for card in sources.cards]
+
+    if name:
+        name = name.lower().strip()
+        matches = [
+            (source_type, source.id)
+            for source_type, source in candidates
+            if any(name in source_name or source_name in name for source_name in _names(source))
+        ]
+        if len(matches) == 1:
+            return matches[0]
+
+    if payment_type and len(candidates) == 1:
+        return candidates[0][0], candidates[0][1].id
+
+    return None
+
+def resolve_transactions(
+    extracted: list[ExtractedTransaction], sources: PaymentSources
+) -> list[NLPTransactionCreate]:
+    """
+    Validates extracted transactions against the user's payment sources.
+    Raises 422 when none of them names a payment source the user has.
+    """
+    transactions = []
+
+    for item in extracted:
+        source = match_payment_source(sources, item.payment_source_type, item.payment_source_name)
+        if not source:
+            continue
+
+        transactions.append(NLPTransactionCreate.model_validate({
+            # no date -> the model default, now.
+            **item.model_dump(exclude={"payment_source_type", "payment_source_name"}, exclude_none=True),
+            "payment_source_type": source[0],
+            "payment_source_id": source[1],
+        }))
+
+    if not transactions:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="no transaction with a known payment source found in the text."
+        )
+
+    return transactions
@@ -0,0 +1,83 @@
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+import asyncio
+import multiprocessing
+import os
+
+load_dotenv()
+
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+# hashes queued or running at once; beyond this requests are shed with 503.
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", HASH_WORKERS * 8))
+
+# hashes made with any other cost are flagged by `verify_and_update`,
+# so changing BCRYPT_ROUNDS rehashes users as they log in.
+bcrypt_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_pool: ProcessPoolExecutor | None = None
+_pending = 0
+
+
+def _hash(password: str) -> str:
+    return bcrypt_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return bcrypt_context.verify_and_update(password, hashed_password)
+
+def start_pool() -> None:
+    global _pool
+
+    if _pool is None:
+        # spawn, not fork: the API process runs an event loop and threads.
+        _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def shutdown_pool() -> None:
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+async def _submit(fn, *args):
+    global _pending
+
+    if _pending >= HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+    start_pool()
+    _pending += 1
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hash, password)
+
+async def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Returns whether the password matches and, if the stored hash was made with
+    outdated cost parameters, a new hash to store in its place.
+    """
+    return await _submit(_verify_and_update, password, hashed_password)
+
+def pool_stats() -> dict[str, int]:
+    return {
+        "workers": HASH_WORKERS,
+        "pending": _pending,
+        "queue_limit": HASH_QUEUE_LIMIT,
+    }
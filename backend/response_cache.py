@@ -0,0 +1,146 @@
+"""
+Read-through cache of listing response bodies, shared by a user's identical
+reads (a dashboard refresh, several screens loading at once).
+
+Keys are the listing's ETag (which covers the user, the listing and its
+version, see versions.py) plus the path and the sorted query string. A
+write bumps the version in the same DB transaction, so later reads look
+for a new key and never see the old body; entries left behind just age
+out. Reads still check the version (one primary key lookup), but skip
+loading and serializing the rows.
+
+Backends, picked by `RESPONSE_CACHE`:
+  - `memory` (default): a bounded LRU in each API process
+  - `redis://...`: any server speaking the Redis protocol, shared by all
+    processes; `RedisBackend` takes any client with redis-py's async
+    `get`/`set`, so tests can pass a stand-in (or run bench/fake_redis.py)
+  - `none`: off
+
+A failing backend counts as a miss, it never fails the request.
+"""
+from collections.abc import Mapping
+from typing import Protocol
+from urllib.parse import urlencode
+from cache import TTLCache
+from dotenv import load_dotenv
+import logging
+import os
+import time
+
+load_dotenv()
+
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "memory")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 2_000))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 60))
+# bigger bodies (long transaction pages) aren't worth the memory.
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024))
+
+log = logging.getLogger(__name__)
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self._cache = TTLCache(maxsize=maxsize)
+
+    async def get(self, key: str) -> bytes | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, expires_at=time.time() + ttl)
+
+
+class RedisBackend:
+    def __init__(self, client, prefix: str = "aix:response:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        # only needed when configured.
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url))
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        backend: CacheBackend | None,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def key(etag: str, path: str, query: Mapping | list[tuple[str, str]]) -> str:
+        items = query.multi_items() if hasattr(query, "multi_items") else list(query)
+        etag = etag.strip('"')
+
+        return f"{etag}:{path}?{urlencode(sorted(items))}"
+
+    async def get(self, key: str) -> bytes | None:
+        if self.backend is None:
+            return None
+
+        try:
+            body = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            log.warning("response cache get failed: %r", e)
+            body = None
+
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return body
+
+    async def set(self, key: str, body: bytes) -> None:
+        if self.backend is None or len(body) > self.max_bytes:
+            return
+
+        try:
+            await self.backend.set(key, body, self.ttl)
+        except Exception as e:
+            self.errors += 1
+            log.warning("response cache set failed: %r", e)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+def backend_from_env(setting: str = RESPONSE_CACHE) -> CacheBackend | None:
+    if setting == "none":
+        return None
+    if setting == "memory":
+        return MemoryBackend()
+    if setting.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(setting)
+
+    raise ValueError(f"RESPONSE_CACHE must be memory, none or a redis:// URL, not {setting!r}")
+
+
+response_cache = ResponseCache(backend_from_env())
@@ -0,0 +1,171 @@
+"""
+Keeps `SpendingRollup` in step with `Transaction`.
+
+Every write path calls `record_transactions` with the rows it inserted
+(`added`) or deleted (`removed`) before committing, so the totals change in
+the same DB transaction as the transactions themselves. An update removes
+the old values and adds the new ones.
+
+Totals are kept per currency, the one of the transaction's payment source.
+Changing a source's currency goes through `change_currency`, which moves
+the totals of its transactions along.
+"""
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from datetime import date, datetime, timezone
+from uuid import UUID
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db import insert_on_conflict
+from models import Bank, Card, Cash, Currency, SpendingRollup, RollupPeriod, Transaction, TransactionType, PaymentType
+
+ROLLUP_FIELDS = ("user_id", "date", "category", "payment_source_type", "payment_source_id", "type", "amount")
+# rows per upsert statement, 9 parameters each.
+UPSERT_BATCH_SIZE = 1000
+
+PAYMENT_MODELS = {
+    PaymentType.BANK: Bank,
+    PaymentType.CARD: Card,
+    PaymentType.CASH: Cash,
+}
+
+# currency of transactions whose payment source was deleted since; the
+# default of every source, as in migration 0014.
+DEFAULT_CURRENCY = Currency.INR
+
+
+def rollup_fields(transaction: Transaction | Mapping) -> dict:
+    """
+    The fields the rollups depend on, from a `Transaction` or a row mapping.
+    Take it before changing a transaction to know what to subtract.
+    """
+    if isinstance(transaction, Mapping):
+        return {field: transaction[field] for field in ROLLUP_FIELDS}
+
+    return {field: getattr(transaction, field) for field in ROLLUP_FIELDS}
+
+def period_starts(moment: datetime) -> dict[RollupPeriod, date]:
+    # buckets are UTC days; sqlite hands back naive datetimes, which are UTC already.
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc)
+
+    day = moment.date()
+
+    return {
+        RollupPeriod.DAY: day,
+        RollupPeriod.MONTH: day.replace(day=1),
+    }
+
+def aggregate(
+    transactions: Iterable, currencies: Mapping[UUID, Currency], sign: int = 1, totals: dict | None = None
+) -> dict[tuple, list]:
+    """
+    Sums transactions into `{rollup key: [total, count]}`, adding to `totals` when given.
+    `currencies` maps payment source ids to their currency.
+    """
+    if totals is None:
+        totals = defaultdict(lambda: [0.0, 0])
+
+    for transaction in transactions:
+        fields = rollup_fields(transaction)
+        transaction_type = TransactionType(fields["type"]).value
+        payment_type = PaymentType(fields["payment_source_type"])
+        currency = Currency(currencies.get(fields["payment_source_id"], DEFAULT_CURRENCY))
+
+        for period, period_start in period_starts(fields["date"]).items():
+            entry = totals[(fields["user_id"], period, period_start, fields["category"], payment_type, currency, transaction_type)]
+            entry[0] += sign * fields["amount"]
+            entry[1] += sign
+
+    return totals
+
+def upsert_statements(totals: dict[tuple, list]) -> list:
+    """
+    `INSERT .. ON CONFLICT DO UPDATE` statements adding `totals` to the stored rollups.
+    Keys are unique within `totals`, which a single upsert statement requires,
+    and sorted so concurrent requests lock rollup rows in the same order.
+    """
+    rows = [
+        {
+            "user_id": user_id,
+            "period": period,
+            "period_start": period_start,
+            "category": category,
+            "payment_source_type": payment_type,
+            "currency": currency,
+            "type": transaction_type,
+            "total": total,
+            "count": count,
+        }
+        for (user_id, period, period_start, category, payment_type, currency, transaction_type), (total, count) in sorted(totals.items())
+        # an update that didn't touch the rolled up fields cancels out.
+        if total or count
+    ]
+    table = SpendingRollup.__table__
+    statements = []
+
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        statement = insert_on_conflict(table).values(rows[start:start + UPSERT_BATCH_SIZE])
+        statements.append(statement.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={
+                "total": table.c.total + statement.excluded.total,
+                "count": table.c.count + statement.excluded.count,
+            }
+        ))
+
+    return statements
+
+async def source_currencies(db: AsyncSession, transactions: Iterable) -> dict[UUID, Currency]:
+    """
+    Currency of the payment source of each of `transactions`, by source id.
+    Sources the session already holds (the write path loaded them) cost no query.
+    """
+    sources = {
+        (PaymentType(fields["payment_source_type"]), fields["payment_source_id"])
+        for fields in map(rollup_fields, transactions)
+    }
+    currencies = {}
+
+    for payment_type, source_id in sources:
+        if source := await db.get(PAYMENT_MODELS[payment_type], source_id):
+            currencies[source_id] = source.currency
+
+    return currencies
+
+async def record_transactions(db: AsyncSession, added: Iterable = (), removed: Iterable = ()) -> None:
+    """
+    Adds `added` to and subtracts `removed` from the rollups.
+    Doesn't commit; the caller commits it along with the transactions.
+    """
+    added, removed = list(added), list(removed)
+    currencies = await source_currencies(db, [*added, *removed])
+    totals = aggregate(removed, currencies, sign=-1, totals=aggregate(added, currencies))
+
+    for statement in upsert_statements(totals):
+        await db.exec(statement)
+
+async def change_currency(db: AsyncSession, source: Bank | Card | Cash, currency: Currency) -> None:
+    """
+    Sets the currency of a payment source and moves the rollups of its
+    transactions from the old currency to it. Reads every transaction of
+    the source, which is fine for a setting that rarely changes.
+    Doesn't commit.
+    """
+    if currency == source.currency:
+        return
+
+    payment_type = next(payment_type for payment_type, model in PAYMENT_MODELS.items() if isinstance(source, model))
+    rows = [
+        row._mapping for row in (await db.exec(
+            select(*(getattr(Transaction, field) for field in ROLLUP_FIELDS))
+            .filter(Transaction.payment_source_id == source.id)
+            .filter(Transaction.payment_source_type == payment_type)
+        )).all()
+    ]
+    totals = aggregate(rows, {source.id: source.currency}, sign=-1)
+    totals = aggregate(rows, {source.id: currency}, totals=totals)
+    source.currency = currency
+
+    for statement in upsert_statements(totals):
+        await db.exec(statement)
@@ -3,6 +3,9 @@ from .auth import router as auth_router
 from .transactions import router as transactions_router
 from .user import router as users_router
 from .payment import router as payment_router
+from .summary import router as summary_router
+from .dashboard import router as dashboard_router
+from .admin import router as admin_router
 
 router = APIRouter(
     prefix="/api/v1"
@@ -12,3 +15,6 @@ router.include_router(auth_router)
 router.include_router(transactions_router)
 router.include_router(users_router)
 router.include_router(payment_router)
+router.include_router(summary_router)
+router.include_router(dashboard_router)
+router.include_router(admin_router)
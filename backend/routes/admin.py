@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import Annotated
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from db import db_dependency
+from models import FxRateCreate, FxRateLoadResponse
+from fx import rate_cache, upsert_statements
+import hmac
+import os
+
+load_dotenv()
+
+
+# unset: the admin endpoints answer 404.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: Annotated[str | None, Header()] = None) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="invalid admin token")
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+    include_in_schema=False,
+)
+
+@router.put("/fx-rates", response_model=FxRateLoadResponse)
+async def load_fx_rates(*, rates: list[FxRateCreate], db: db_dependency) -> FxRateLoadResponse:
+    """
+    Stores daily exchange rates, replacing any already stored for the same
+    day and currency. Needs the `X-Admin-Token` header to match `ADMIN_TOKEN`.
+    Other API processes pick them up within `FX_CACHE_TTL` seconds.
+    """
+    updated_at = datetime.now(timezone.utc)
+
+    for statement in upsert_statements(rates, updated_at):
+        await db.exec(statement)
+
+    await db.commit()
+    rate_cache.invalidate()
+
+    return FxRateLoadResponse(
+        loaded=len({(rate.day, rate.currency) for rate in rates}),
+        first_day=min((rate.day for rate in rates), default=None),
+        last_day=max((rate.day for rate in rates), default=None),
+    )
@@ -5,11 +5,14 @@ from models.user import UserCreate, User
 from models.token import TokenResponse
 from typing import Annotated
 from db import db_dependency 
+from passwords import hash_password, verify_password
 from jwt.exceptions import InvalidTokenError
 from datetime import timedelta
+import logging
 
 from .utils import *
 
+log = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/auth",
     tags=["auth"]
@@ -17,9 +20,9 @@ router = APIRouter(
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def create_user(db: db_dependency, user_data: UserCreate) -> User:
+async def create_user(db: db_dependency, user_data: UserCreate) -> User:
     try:
-        email = db.exec(select(User).filter(User.email == user_data.email)).first()
+        email = (await db.exec(select(User).filter(User.email == user_data.email))).first()
 
         if email:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="email already exists")
@@ -28,39 +31,47 @@ def create_user(db: db_dependency, user_data: UserCreate) -> User:
             first_name=user_data.first_name,
             last_name=user_data.last_name,
             email=user_data.email,
-            hashed_password=bcrypt_context.hash(user_data.password)
+            hashed_password=await hash_password(user_data.password)
         )
 
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
         return user
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
-    except Exception as e:
-        db.rollback()
-        print(e)
+    except Exception:
+        await db.rollback()
+        log.exception("failed to create user")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create user.")
 
 
 @router.post("/login", status_code=status.HTTP_200_OK)
-def login_user(response: Response, db: db_dependency, user_form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> TokenResponse:
+async def login_user(response: Response, db: db_dependency, user_form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> TokenResponse:
     try:
         """
         I am using the `username` instead of email,
         Becuase OAuth2PasswordRequestForm have username and password fieldsalone. 
         I'm considering username as email.
         """
-        user = db.exec(select(User).filter(User.email == user_form_data.username)).first()
+        user = (await db.exec(select(User).filter(User.email == user_form_data.username))).first()
 
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found. Try to register")
 
-        if not bcrypt_context.verify(user_form_data.password, user.hashed_password):
+        verified, new_hash = await verify_password(user_form_data.password, user.hashed_password)
+
+        if not verified:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email or password is incorrect.")
 
+        if new_hash:
+            # hash was made with outdated cost parameters.
+            user.hashed_password = new_hash
+            await db.commit()
+            invalidate_user(user.id)
+
         access_token = generate_jwt_token(user.id, user.email, timedelta(minutes=30))
         refresh_token = generate_jwt_token(user.id, user.email, timedelta(days=30))
 
@@ -79,21 +90,21 @@ def login_user(response: Response, db: db_dependency, user_form_data: Annotated[
 
         return token
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
-    except Exception as e:
-        print(e)
-        db.rollback()
+    except Exception:
+        log.exception("failed to login user")
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to login user.")
 
 @router.post("/refresh", status_code=status.HTTP_201_CREATED)
-def refresh_token(request: Request, db: db_dependency) -> TokenResponse:
+def refresh_token(request: Request) -> TokenResponse:
     refresh_token = request.cookies.get("refresh_token")
 
     if refresh_token is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="refresh_token not found.")
     
-    user_data = validate_token(refresh_token, db)
+    user_data = validate_token(refresh_token)
 
     if not user_data:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token.")
@@ -106,9 +117,9 @@ def refresh_token(request: Request, db: db_dependency) -> TokenResponse:
     )
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-def logout_user(response: Response, access_token: Annotated[str, Depends(oauth2_scheme)], db: db_dependency) -> dict[str, str]:
+async def logout_user(response: Response, access_token: Annotated[str, Depends(oauth2_scheme)], db: db_dependency) -> dict[str, str]:
     try:
-        blacklist_token(access_token, db)
+        await blacklist_token(access_token, db)
         response.delete_cookie("refresh_token")
 
         return {"message": "logged out successfully."}
@@ -0,0 +1,153 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlmodel import select
+from typing import Annotated
+from db import db_dependency
+from serialization import serialize
+from models import (
+    User,
+    Bank,
+    Card,
+    Cash,
+    Currency,
+    Transaction,
+    Resource,
+    Dashboard,
+    CurrencyTotal,
+    CardUtilization,
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import datetime, timezone
+from fx import rate_cache, currency_codes
+from .utils import get_user, encode_cursor, cached, CachedListing
+import numpy as np
+
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["dashboard"]
+)
+
+def utilization(usage: float, limit: float) -> float | None:
+    return usage / limit if limit > 0 else None
+
+def currency_totals(banks: list[Bank], cards: list[Card], cash: Cash | None) -> list[CurrencyTotal]:
+    totals = {}
+
+    def total(currency: Currency) -> dict:
+        return totals.setdefault(currency, {"bank": 0.0, "cash": 0.0, "card_usage": 0.0, "card_limit": 0.0})
+
+    for bank in banks:
+        total(bank.currency)["bank"] += bank.amount
+    for card in cards:
+        total(card.currency)["card_usage"] += card.current_usage
+        total(card.currency)["card_limit"] += card.limit
+    if cash:
+        total(cash.currency)["cash"] += cash.amount
+
+    return [
+        CurrencyTotal(
+            currency=currency,
+            **values,
+            card_utilization=utilization(values["card_usage"], values["card_limit"]),
+            net=values["bank"] + values["cash"] - values["card_usage"],
+        )
+        for currency, values in sorted(totals.items())
+    ]
+
+TOTAL_FIELDS = ("bank", "cash", "card_usage", "card_limit")
+
+def base_total(totals: list[CurrencyTotal], base_currency: Currency, factors: np.ndarray) -> CurrencyTotal | None:
+    """
+    `totals` (one per currency) summed after multiplying each by its
+    conversion factor to `base_currency`.
+    """
+    values = np.array([[getattr(total, field) for field in TOTAL_FIELDS] for total in totals]).reshape(-1, len(TOTAL_FIELDS))
+    converted = (values * factors[:, None]).sum(axis=0)
+
+    if np.isnan(converted).any():
+        return None
+
+    values = dict(zip(TOTAL_FIELDS, converted.tolist()))
+
+    return CurrencyTotal(
+        currency=base_currency,
+        **values,
+        card_utilization=utilization(values["card_usage"], values["card_limit"]),
+        net=values["bank"] + values["cash"] - values["card_usage"],
+    )
+
+async def base_currency_version(db: AsyncSession, user: User) -> tuple[str, list[datetime]]:
+    # the base total changes with the user's base currency, the rates and
+    # the day they are taken from.
+    rates = await rate_cache.get(db)
+    today = datetime.now(timezone.utc).date()
+
+    return f"{user.base_currency.value}:{rates.version}:{today}", [user.updated_at, *filter(None, [rates.updated_at])]
+
+@router.get("/", response_model=Dashboard)
+async def get_dashboard(
+    *,
+    user: User = Depends(get_user),
+    n: Annotated[int, Query(ge=1, le=100)] = 10,
+    currency: Currency | None = None,
+    listing: Annotated[CachedListing, Depends(cached(
+        Resource.BANK, Resource.CARD, Resource.CASH, Resource.TRANSACTIONS, extra=base_currency_version
+    ))],
+    db: db_dependency
+) -> Response:
+    """
+    Everything the home screen shows, in one response: the user's banks,
+    cards and cash, totals per currency, card utilization and the latest
+    `n` transactions (DEFAULT: 10).
+
+    One query per table on the request's connection; totals are worked out
+    from the loaded rows. Spreading the queries over pooled connections
+    to run them at once measured slower (every session adds its own
+    BEGIN/ROLLBACK) and can exhaust the pool under load.
+    """
+    if response := listing.response():
+        return response
+
+    transactions_query = (
+        select(Transaction)
+        .filter(Transaction.user_id == user.id)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .limit(n + 1)
+    )
+
+    transactions = (await db.exec(transactions_query)).all()
+    banks = (await db.exec(select(Bank).filter(Bank.user_id == user.id))).all()
+    cards = (await db.exec(select(Card).filter(Card.user_id == user.id))).all()
+    cash = (await db.exec(select(Cash).filter(Cash.user_id == user.id))).first()
+    next_cursor = None
+
+    if len(transactions) > n:
+        transactions = transactions[:n]
+        next_cursor = encode_cursor(transactions[-1].created_at, transactions[-1].id)
+
+    totals = currency_totals(banks, cards, cash)
+    base_currency = currency or user.base_currency
+    rates = await rate_cache.get(db)
+    factors = rates.factors(currency_codes(total.currency for total in totals), datetime.now(timezone.utc).date(), base_currency)
+
+    dashboard = {
+        "banks": banks,
+        "cards": cards,
+        "cash": cash,
+        "totals": totals,
+        "card_utilization": [
+            CardUtilization(
+                card_id=card.id,
+                name=card.name,
+                currency=card.currency,
+                utilization=utilization(card.current_usage, card.limit),
+            )
+            for card in cards
+        ],
+        "base_currency": base_currency,
+        "base_total": base_total(totals, base_currency, factors),
+        "transactions": transactions,
+        "next_cursor": next_cursor,
+    }
+
+    return await listing.store(serialize(Dashboard, dashboard, headers=listing.headers))
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Response, status, HTTPException
 from fastapi.responses import JSONResponse
-from ..utils import get_user
-from models import User, Bank, BankCreate, BankUpdate, BankResponse
+from ..utils import get_user, cached, CachedListing
+from models import User, Bank, BankCreate, BankUpdate, BankResponse, Resource
 from db import db_dependency
+from serialization import serialize
 from sqlmodel import select
+from typing import Annotated
 from uuid import UUID
+from rollups import change_currency
+from versions import touch
 
 
 router = APIRouter(
@@ -14,17 +18,17 @@ router = APIRouter(
 
 
 @router.post("/")
-def create_bank_account(
+async def create_bank_account(
     *,
     bank_data: BankCreate,
     user: User = Depends(get_user),
     db: db_dependency
 ) -> BankResponse:
 
-    bank_exists = db.exec(
+    bank_exists = (await db.exec(
         select(Bank)
         .filter(Bank.account_no == bank_data.account_no)
-    ).first()
+    )).first()
 
     if bank_exists:
         raise HTTPException(
@@ -35,13 +39,14 @@ def create_bank_account(
     bank = Bank(**bank_data.__dict__, user_id=user.id)        
 
     db.add(bank)
-    db.commit()
-    db.refresh(bank)
+    await touch(db, user.id, Resource.BANK)
+    await db.commit()
+    await db.refresh(bank)
 
-    return BankResponse(**bank.__dict__)
+    return bank
 
 @router.patch("/{bank_id}")
-def update_bank(
+async def update_bank(
     *,
     bank_id: UUID,
     bank_update_data: BankUpdate,
@@ -49,11 +54,11 @@ def update_bank(
     db: db_dependency
 ) -> BankResponse:
 
-    bank = db.exec(
+    bank = (await db.exec(
         select(Bank)
         .filter(Bank.id == bank_id)
         .filter(Bank.user_id == user.id)
-    ).first()
+    )).first()
 
     if not bank:
         raise HTTPException(
@@ -62,10 +67,10 @@ def update_bank(
         )
     
     if bank_update_data.account_no and bank_update_data.account_no != bank.account_no:
-        account_exists = db.exec(
+        account_exists = (await db.exec(
             select(Bank.id)
             .filter(Bank.account_no == bank_update_data.account_no)
-        ).first()
+        )).first()
 
         if account_exists:
             raise HTTPException(
@@ -79,24 +84,25 @@ def update_bank(
         bank.name = bank_update_data.name
     
     if bank_update_data.currency:
-        bank.currency = bank_update_data.currency
+        await change_currency(db, bank, bank_update_data.currency)
     
-    db.commit()
-    db.refresh(bank)
+    await touch(db, user.id, Resource.BANK)
+    await db.commit()
+    await db.refresh(bank)
 
-    return BankResponse(**bank.__dict__)
+    return bank
 
 @router.delete("/{bank_id}")
-def remove_bank(
+async def remove_bank(
     *,
     bank_id: UUID,
     user: User = Depends(get_user),
     db: db_dependency
 ) -> JSONResponse:
-    bank = db.exec(
+    bank = (await db.exec(
         select(Bank)
         .filter(Bank.id == bank_id)
-    ).first()
+    )).first()
 
     if not bank:
         raise HTTPException(
@@ -104,8 +110,9 @@ def remove_bank(
             detail=f"Bank with ID:{bank_id} doesn't exists.",
         )
 
-    db.delete(bank)
-    db.commit()
+    await db.delete(bank)
+    await touch(db, bank.user_id, Resource.BANK)
+    await db.commit()
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -114,33 +121,36 @@ def remove_bank(
         }
     )
 
-@router.get("/")
-def get_bank_accounts(
+@router.get("/", response_model=list[BankResponse])
+async def get_bank_accounts(
     *,
     user: User = Depends(get_user),
+    listing: Annotated[CachedListing, Depends(cached(Resource.BANK))],
     db: db_dependency
-) -> list[Bank]:
+) -> Response:
+    if response := listing.response():
+        return response
 
-    banks = db.exec(
+    banks = (await db.exec(
         select(Bank)
         .filter(Bank.user_id == user.id)
-    ).all()
+    )).all()
 
-    return banks
+    return await listing.store(serialize(list[BankResponse], banks, headers=listing.headers))
 
 @router.get("/{bank_id}")
-def get_bank_by_ac(
+async def get_bank_by_ac(
     *,
     bank_id: UUID,
     user: User = Depends(get_user),
     db: db_dependency
 ) -> BankResponse:
 
-    bank = db.exec(
+    bank = (await db.exec(
         select(Bank)
         .filter(Bank.user_id == user.id)
         .filter(Bank.id == bank_id)
-    ).first()
+    )).first()
 
     if not bank:
         raise HTTPException(
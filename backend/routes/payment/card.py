@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import select, Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from db import db_dependency
+from serialization import serialize
 from models import (
     User,
     Card,
@@ -9,11 +11,16 @@ from models import (
     CardResponse,
     Transaction,
     TransactionType,
-    PaymentType
+    PaymentType,
+    Resource
 )
 from datetime import datetime, timezone
 from uuid import UUID
-from ..utils import get_user
+from rollups import change_currency, record_transactions
+from ledger import adjust_balance, check_version, set_card_limit
+from versions import touch, touch_transactions
+from typing import Annotated
+from ..utils import get_user, cached, CachedListing
 
 
 router = APIRouter(
@@ -21,12 +28,12 @@ router = APIRouter(
     tags=["card"]
 )
 
-def get_card(card_id: UUID, user_id: UUID, db: Session) -> Card | None:
-    card = db.exec(
+async def get_card(card_id: UUID, user_id: UUID, db: AsyncSession) -> Card | None:
+    card = (await db.exec(
         select(Card)
         .filter(Card.user_id == user_id)
         .filter(Card.id == card_id)
-    ).first()
+    )).first()
 
     if not card:
         raise HTTPException(
@@ -37,7 +44,7 @@ def get_card(card_id: UUID, user_id: UUID, db: Session) -> Card | None:
     return card
 
 @router.post("/", status_code=status.HTTP_200_OK)
-def create_card(
+async def create_card(
     *,
     card_create_data: CardCreate,
     user: User = Depends(get_user),
@@ -52,41 +59,42 @@ def create_card(
     )    
 
     db.add(card)
-    db.commit()
-    db.refresh(card)
+    await touch(db, user.id, Resource.CARD)
+    await db.commit()
+    await db.refresh(card)
 
-    return CardResponse(**card.__dict__)
+    return card
 
 @router.delete("/{card_id}", status_code=status.HTTP_200_OK)
-def remove_card(
+async def remove_card(
     *,
     card_id: UUID,
     user: User = Depends(get_user),
     db: db_dependency
 ) -> dict[str, str]:
-    card = get_card(card_id, user.id, db) 
+    card = await get_card(card_id, user.id, db) 
     
-    db.delete(card)
-    db.commit()
+    await db.delete(card)
+    await touch(db, user.id, Resource.CARD)
+    await db.commit()
 
     return {
         "message": "Card deleted successfully."
     } 
 
 @router.patch("/{card_id}")
-def update_card(
+async def update_card(
     *,
     card_id: UUID,
     card_update_data: CardUpdate,
     user: User = Depends(get_user),
     db: db_dependency
 ) -> CardResponse:
-    card = get_card(card_id, user.id, db)
+    card = await get_card(card_id, user.id, db)
+    check_version(card, card_update_data.version)
 
     if card_update_data.name:
         card.name = card_update_data.name
-    if card_update_data.limit is not None and card_update_data.limit != card.limit:
-        card.limit = card_update_data.limit
     if card_update_data.current_usage is not None and card_update_data.current_usage != card.current_usage:
         amount = abs(card.current_usage - card_update_data.current_usage)
 
@@ -107,36 +115,40 @@ def update_card(
             description=f"Card usage adjusted from {card.current_usage} to {card_update_data.current_usage}"
         )
 
-        if transaction_type == TransactionType.IADJUST:
-            card.balance -= amount 
-        else:
-            card.balance += amount
-
-        card.current_usage = card_update_data.current_usage
-
         db.add(adjustment_transaction)
+        await record_transactions(db, added=[adjustment_transaction])
+        await touch_transactions(db, added=[adjustment_transaction])
+        # moves usage and balance by `amount` in SQL, 409 if they changed since the read.
+        await adjust_balance(db, card, adjustment_transaction)
+    if card_update_data.limit is not None and card_update_data.limit != card.limit:
+        await set_card_limit(db, card, card_update_data.limit)
     if card_update_data.currency:
-        card.currency = card_update_data.currency
+        await change_currency(db, card, card_update_data.currency)
     if card_update_data.issuing_bank_name:
         card.issuing_bank_name = card_update_data.issuing_bank_name
-    if card_update_data.network:
-        card.network = card_update_data.network
+    if card_update_data.card_network:
+        card.network = card_update_data.card_network
     
-    db.commit()
-    db.refresh(card)
+    await touch(db, user.id, Resource.CARD)
+    await db.commit()
+    await db.refresh(card)
 
-    return CardResponse(**card.__dict__)
+    return card
 
-@router.get("/", status_code=status.HTTP_200_OK)
-def get_all_cards(
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[CardResponse])
+async def get_all_cards(
     *,
     user: User = Depends(get_user),
+    listing: Annotated[CachedListing, Depends(cached(Resource.CARD))],
     db: db_dependency
-) -> list[CardResponse]:
-    results = db.exec(
+) -> Response:
+    if response := listing.response():
+        return response
+
+    results = (await db.exec(
         select(Card)
         .filter(Card.user_id == user.id)
-    ).all()
+    )).all()
 
     if not results:
         raise HTTPException(
@@ -144,17 +156,15 @@ def get_all_cards(
             detail="Nocards found."
         )
 
-    cards = [CardResponse(**result.__dict__) for result in results] 
-
-    return cards
+    return await listing.store(serialize(list[CardResponse], results, headers=listing.headers))
     
 @router.get("/{card_id}")
-def get_card_by_id(
+async def get_card_by_id(
     *,
     card_id: UUID,
     user: User = Depends(get_user),
     db: db_dependency
 ) -> CardResponse:
 
-    card = get_card(card_id, user.id, db)
+    card = await get_card(card_id, user.id, db)
     return card
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.responses import JSONResponse
 from db import db_dependency
 from sqlalchemy.exc import IntegrityError
-from sqlmodel import select, Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models import (
     User,
     Cash,
@@ -12,10 +13,16 @@ from models import (
     Transaction,
     TransactionType,
     PaymentType,
+    Resource,
 )
+from typing import Annotated
 from uuid import UUID
 from datetime import datetime, timezone
-from ..utils import get_user
+from rollups import change_currency, record_transactions
+from ledger import adjust_balance, check_version
+from versions import touch, touch_transactions
+from serialization import serialize
+from ..utils import get_user, cached, CachedListing
 
 
 router = APIRouter(
@@ -23,12 +30,12 @@ router = APIRouter(
     tags=["cash"]
 )
 
-def get_cash(cash_id: UUID, user_id: UUID, db: Session) -> Cash:
-    cash = db.exec(
+async def get_cash(cash_id: UUID, user_id: UUID, db: AsyncSession) -> Cash:
+    cash = (await db.exec(
         select(Cash)
         .filter(Cash.id == cash_id) 
         .filter(Cash.user_id == user_id)
-    ).first()
+    )).first()
 
     if not cash:
         raise HTTPException(
@@ -40,7 +47,7 @@ def get_cash(cash_id: UUID, user_id: UUID, db: Session) -> Cash:
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-def create_cash(
+async def create_cash(
     *,
     cash_create_data: CashCreate,
     user: User = Depends(get_user),
@@ -54,13 +61,14 @@ def create_cash(
         )
 
         db.add(cash)
-        db.commit()
-        db.refresh(cash)
+        await touch(db, user.id, Resource.CASH)
+        await db.commit()
+        await db.refresh(cash)
 
-        return CashResponse(**cash.__dict__) 
+        return cash
 
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot create more that one cash entry."
@@ -69,7 +77,7 @@ def create_cash(
         raise
 
 @router.patch("/{cash_id}", status_code=status.HTTP_200_OK)
-def update_cash(
+async def update_cash(
     *,
     cash_id: UUID,
     user: User = Depends(get_user),
@@ -77,11 +85,12 @@ def update_cash(
     db: db_dependency
 ) -> CashResponse:
 
-    cash = get_cash(cash_id, user.id, db)
+    cash = await get_cash(cash_id, user.id, db)
+    check_version(cash, update_cash.version)
 
     if update_cash.currency:
-        cash.currency = update_cash.currency 
-    if update_cash.amount:
+        await change_currency(db, cash, update_cash.currency)
+    if update_cash.amount is not None and update_cash.amount != cash.amount:
         amount = abs(update_cash.amount - cash.amount)
 
         transaction = Transaction(
@@ -96,26 +105,29 @@ def update_cash(
         )
 
         db.add(transaction)
+        await record_transactions(db, added=[transaction])
+        await touch_transactions(db, added=[transaction])
+        await adjust_balance(db, cash, transaction)
 
-        cash.amount = update_cash.amount
+    await touch(db, user.id, Resource.CASH)
+    await db.commit()
+    await db.refresh(cash)
 
-    db.commit()
-    db.refresh(cash)
-
-    return CashResponse.model_validate(cash)
+    return cash
 
 @router.delete("/{cash_id}", status_code=status.HTTP_200_OK)
-def remove_cash(
+async def remove_cash(
     *,
     cash_id: UUID,
     user: User = Depends(get_user),
     db: db_dependency
 ) -> JSONResponse:
 
-    cash = get_cash(cash_id, user.id, db)
+    cash = await get_cash(cash_id, user.id, db)
 
-    db.delete(cash)
-    db.commit()
+    await db.delete(cash)
+    await touch(db, user.id, Resource.CASH)
+    await db.commit()
 
     return JSONResponse(
         content={
@@ -123,17 +135,20 @@ def remove_cash(
         }
     )
 
-@router.get("/", status_code=status.HTTP_200_OK)
-def get_cash_details(
+@router.get("/", status_code=status.HTTP_200_OK, response_model=CashResponse)
+async def get_cash_details(
     *,
     user: User = Depends(get_user),
+    listing: Annotated[CachedListing, Depends(cached(Resource.CASH))],
     db: db_dependency
-) -> CashResponse:
+) -> Response:
+    if response := listing.response():
+        return response
 
-    cash = db.exec(
+    cash = (await db.exec(
         select(Cash)
         .filter(Cash.user_id == user.id)
-    ).first()
+    )).first()
 
     if not cash:
         raise HTTPException(
@@ -141,5 +156,4 @@ def get_cash_details(
             detail="Cash Entry not found."
         )
 
-    print(cash.__dict__)
-    return CashResponse(**cash.__dict__)
+    return await listing.store(serialize(CashResponse, cash, headers=listing.headers))
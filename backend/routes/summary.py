@@ -0,0 +1,226 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlmodel import select
+from sqlalchemy import func
+from db import db_dependency
+from serialization import serialize
+from models import (
+    User,
+    SpendingRollup,
+    SpendingSummary,
+    CategoryTotal,
+    RollupPeriod,
+    TransactionType,
+    PaymentType,
+    Resolution,
+    BalanceHistory,
+    Currency,
+)
+from fx import RateTable, currency_codes, day_numbers, rate_cache
+from balance_history import history, period_count
+from datetime import date, datetime, timedelta, timezone
+from .utils import get_user
+
+
+router = APIRouter(
+    prefix="/summary",
+    tags=["summary"]
+)
+
+# points per series one request may ask for, over 13 years of days.
+MAX_BALANCE_POINTS = 5_000
+
+def validate_range(from_date: date | None, to_date: date | None) -> None:
+    if (from_date and to_date) and from_date > to_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid date filter")
+
+def filter_rollups(query, user_id, type: TransactionType | None, payment_type: PaymentType | None):
+    query = query.filter(SpendingRollup.user_id == user_id)
+
+    if type:
+        query = query.filter(SpendingRollup.type == type.value)
+    if payment_type:
+        query = query.filter(SpendingRollup.payment_source_type == payment_type)
+
+    return query
+
+def converted(rows: list, keys: tuple[str, ...], rates: RateTable, currency: Currency) -> list[dict]:
+    """
+    Rollup `rows` (per currency) converted to `currency` at the rate of each
+    row's `period_start` and summed per `keys`, in order of first appearance.
+    A total is None where a rate is missing.
+    """
+    amounts = rates.convert(
+        [row.total for row in rows],
+        currency_codes(row.currency for row in rows),
+        day_numbers(row.period_start for row in rows),
+        currency,
+    )
+    totals = {}
+
+    for row, amount in zip(rows, amounts.tolist()):
+        key = tuple(getattr(row, name) for name in keys)
+        entry = totals.setdefault(key, {**dict(zip(keys, key)), "currency": currency, "total": 0.0, "count": 0})
+        entry["total"] += amount
+        entry["count"] += row.count
+
+    for entry in totals.values():
+        # NaN, where a rate was missing, is the only value unequal to itself.
+        entry["total"] = None if entry["total"] != entry["total"] else round(entry["total"], 2)
+
+    return list(totals.values())
+
+@router.get("/spending", response_model=list[SpendingSummary])
+async def get_spending(
+    *,
+    user: User = Depends(get_user),
+    period: RollupPeriod = RollupPeriod.MONTH,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    type: TransactionType | None = None,
+    payment_type: PaymentType | None = None,
+    currency: Currency | None = None,
+    db: db_dependency
+) -> Response:
+    """
+    Totals per period and category, oldest period first. Reads only the
+    rollups, so the cost depends on the number of periods and categories,
+    not on the number of transactions.
+
+    Rollups are kept per currency; each is converted at the rate of the
+    first day of its period.
+
+    - period -> `day` or `month` (DEFAULT)
+    - from_date[Optional], to_date[Optional] -> periods starting in this range;
+      for `month` the month containing `from_date` is included
+    - type[Optional] -> only this transaction type
+    - payment_type[Optional] -> only this payment source type
+    - currency[Optional] -> the currency of the totals (DEFAULT: the user's base currency)
+    """
+    validate_range(from_date, to_date)
+
+    query = filter_rollups(
+        select(
+            SpendingRollup.period_start,
+            SpendingRollup.category,
+            SpendingRollup.type,
+            SpendingRollup.currency,
+            func.sum(SpendingRollup.total).label("total"),
+            func.sum(SpendingRollup.count).label("count"),
+        ),
+        user.id, type, payment_type
+    ).filter(SpendingRollup.period == period)
+
+    if from_date:
+        if period == RollupPeriod.MONTH:
+            from_date = from_date.replace(day=1)
+        query = query.filter(SpendingRollup.period_start >= from_date)
+    if to_date:
+        query = query.filter(SpendingRollup.period_start <= to_date)
+
+    query = (
+        query
+        .group_by(SpendingRollup.period_start, SpendingRollup.category, SpendingRollup.type, SpendingRollup.currency)
+        .having(func.sum(SpendingRollup.count) > 0)
+        .order_by(SpendingRollup.period_start, SpendingRollup.category, SpendingRollup.type)
+    )
+
+    rows = (await db.exec(query)).all()
+    rates = await rate_cache.get(db)
+
+    return serialize(
+        list[SpendingSummary],
+        converted(rows, ("period_start", "category", "type"), rates, currency or user.base_currency)
+    )
+
+@router.get("/categories", response_model=list[CategoryTotal])
+async def get_category_totals(
+    *,
+    user: User = Depends(get_user),
+    from_date: date | None = None,
+    to_date: date | None = None,
+    type: TransactionType | None = None,
+    payment_type: PaymentType | None = None,
+    currency: Currency | None = None,
+    db: db_dependency
+) -> Response:
+    """
+    Totals per category, largest first, over the whole history or the days
+    from `from_date` to `to_date` (inclusive). Reads only the rollups, per
+    period so each can be converted to `currency` (DEFAULT: the user's base
+    currency) at its own rate.
+    """
+    validate_range(from_date, to_date)
+
+    query = filter_rollups(
+        select(
+            SpendingRollup.period_start,
+            SpendingRollup.category,
+            SpendingRollup.type,
+            SpendingRollup.currency,
+            func.sum(SpendingRollup.total).label("total"),
+            func.sum(SpendingRollup.count).label("count"),
+        ),
+        user.id, type, payment_type
+    )
+
+    if from_date or to_date:
+        query = query.filter(SpendingRollup.period == RollupPeriod.DAY)
+        if from_date:
+            query = query.filter(SpendingRollup.period_start >= from_date)
+        if to_date:
+            query = query.filter(SpendingRollup.period_start <= to_date)
+    else:
+        # whole history: month rows are ~30x fewer than day rows.
+        query = query.filter(SpendingRollup.period == RollupPeriod.MONTH)
+
+    query = (
+        query
+        .group_by(SpendingRollup.period_start, SpendingRollup.category, SpendingRollup.type, SpendingRollup.currency)
+        .having(func.sum(SpendingRollup.count) > 0)
+    )
+
+    rows = (await db.exec(query)).all()
+    rates = await rate_cache.get(db)
+    totals = converted(rows, ("category", "type"), rates, currency or user.base_currency)
+    # totals without a rate last.
+    totals.sort(key=lambda total: (total["total"] is None, -(total["total"] or 0), total["category"]))
+
+    return serialize(list[CategoryTotal], totals)
+
+@router.get("/balances", response_model=BalanceHistory)
+async def get_balance_history(
+    *,
+    user: User = Depends(get_user),
+    resolution: Resolution = Resolution.DAY,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    currency: Currency | None = None,
+    db: db_dependency
+) -> Response:
+    """
+    Balance of every payment source, and net worth per currency and in one
+    base currency, at the end of every period from `from_date` to `to_date`.
+    Reads the daily balance snapshots, so the cost depends on the number of
+    days with changes, not on the number of transactions.
+
+    - resolution -> `day` (DEFAULT), `week`, `month` or `year`
+    - from_date[Optional] -> DEFAULT: a year before `to_date`
+    - to_date[Optional] -> DEFAULT: today (UTC)
+    - currency[Optional] -> the currency of `base_net_worth` (DEFAULT: the user's base currency)
+    """
+    to_date = to_date or datetime.now(timezone.utc).date()
+    from_date = from_date or to_date - min(timedelta(days=365), to_date - date.min)
+    validate_range(from_date, to_date)
+
+    # counted, not enumerated: a range up to year 9999 would take seconds to list.
+    if period_count(from_date, to_date, resolution) > MAX_BALANCE_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"more than {MAX_BALANCE_POINTS} periods, use a shorter range or a coarser resolution"
+        )
+
+    rates = await rate_cache.get(db)
+
+    return serialize(BalanceHistory, await history(
+        db, user.id, resolution, from_date, to_date, rates, currency or user.base_currency
+    ))
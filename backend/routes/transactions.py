@@ -1,50 +1,177 @@
-from fastapi import APIRouter, Body, status, Depends, HTTPException
-from fastapi.responses import JSONResponse 
+from fastapi import APIRouter, Body, Query, Request, Response, status, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from models.payment import PaymentType, Bank, Cash, Card
 from sqlmodel import select 
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Annotated
 from models.transaction import (
     Transaction,
+    TransactionType,
     TransactionCreate,
     TransactionUpdate,
     TransactionResponse,
+    TransactionPage,
+    TransactionSearchPage,
+    TransactionBulkResult,
+    TransactionBulkResponse,
+    TransactionImportResponse,
+    CsvColumnMapping,
+    ImportFormat,
+    ExportFormat,
     NLPTransactionCreate
 )
-from db import db_dependency
+from db import db_dependency, insert_on_conflict, async_session
+from serialization import serialize
+from importers import parse_statement, Fingerprinter, RecordError
+from nlp import (
+    extract_transactions,
+    load_payment_sources,
+    resolve_transactions,
+    enqueue_job,
+    get_job,
+    cancel_job,
+)
+from rollups import record_transactions
+from ledger import PAYMENT_MODELS, apply_transactions
+from versions import touch_transactions
 from models.user import User
-from .utils import get_user
+from models.job import ExtractionMode, ExtractionJobResponse
+from models.version import Resource
+from search import search_query, terms
+from .utils import get_user, encode_cursor, decode_cursor, encode_search_cursor, decode_search_cursor, cached, CachedListing
 from uuid import UUID
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy import desc
+from sqlalchemy import desc, tuple_, insert
 from datetime import datetime, timezone
+from collections import defaultdict
+from typing import AsyncIterator
+import csv
+import io
+import json
+import os
+import uuid
+import zlib
 
 router = APIRouter(
     prefix="/transactions",
     tags=["transactions"]
 )
 
+BULK_LIMIT = int(os.getenv("TRANSACTION_BULK_LIMIT", 5000))
+BULK_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = int(os.getenv("TRANSACTION_IMPORT_BATCH_SIZE", 1000))
+IMPORT_MAX_ERRORS = 20
+NLP_MAX_TEXT_LENGTH = 1000
+EXPORT_BATCH_SIZE = int(os.getenv("TRANSACTION_EXPORT_BATCH_SIZE", 1000))
+EXPORT_COLUMNS = [
+    Transaction.id,
+    Transaction.date,
+    Transaction.amount,
+    Transaction.type,
+    Transaction.category,
+    Transaction.description,
+    Transaction.payment_source_type,
+    Transaction.payment_source_id,
+    Transaction.created_at,
+    Transaction.updated_at,
+]
+
+
+async def get_payment_source(
+    payment_type: PaymentType, payment_id: UUID, user_id: UUID, db: AsyncSession
+) -> Bank | Card | Cash | None:
+    model = PAYMENT_MODELS[payment_type]
+
+    return (await db.exec(
+        select(model)
+        .filter(model.id == payment_id)
+        .filter(model.user_id == user_id)
+    )).first()
+
+async def get_owned_payment_sources(
+    requested: dict[PaymentType, set[UUID]], user_id: UUID, db: AsyncSession
+) -> set[tuple[PaymentType, UUID]]:
+    """
+    Resolves many payment sources with one `IN` query per payment type.
+    Returns the (type, id) pairs that exist and belong to the user.
+    """
+    owned = set()
+
+    for payment_type, payment_ids in requested.items():
+        model = PAYMENT_MODELS[payment_type]
+        found = (await db.exec(
+            select(model.id)
+            .filter(model.id.in_(payment_ids))
+            .filter(model.user_id == user_id)
+        )).all()
+
+        owned.update((payment_type, payment_id) for payment_id in found)
 
-@router.post("/create-transaction", status_code=status.HTTP_200_OK)
-def create_transaction(nlp_text: Annotated[str, Body()], user: User = Depends(get_user)) -> list[NLPTransactionCreate]:
-    # TODO: use llm to extract structured transaction from text.
-    pass
+    return owned
+
+
+@router.post(
+    "/create-transaction",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_202_ACCEPTED: {"model": ExtractionJobResponse}}
+)
+async def create_transaction(
+    *,
+    nlp_text: Annotated[str, Body(min_length=1, max_length=NLP_MAX_TEXT_LENGTH)],
+    mode: ExtractionMode = ExtractionMode.SYNC,
+    user: User = Depends(get_user),
+    db: db_dependency
+) -> list[NLPTransactionCreate]:
+    """
+    Extracts transactions from free text, e.g. "spent 250 on groceries with
+    hdfc card". Nothing is saved: the client confirms the result through
+    `/add` or `/bulk`.
+
+    Simple texts are read by rules; the rest go to the local LLM, whose
+    answers are cached by text. Payment sources named in the text are matched
+    against the user's own banks, cards and cash; transactions whose source
+    can't be matched are left out.
+
+    - mode -> `sync` (DEFAULT) answers with the transactions. `async` answers
+      202 with a job right away; poll `GET /transactions/jobs/{id}` for the result.
+    """
+    if mode == ExtractionMode.ASYNC:
+        job = await enqueue_job(db, user.id, nlp_text)
+
+        return serialize(
+            ExtractionJobResponse, job,
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"{router.prefix}/jobs/{job.id}"}
+        )
+
+    sources = await load_payment_sources(user.id, db)
+    extracted = await extract_transactions(nlp_text, sources)
+
+    return resolve_transactions(extracted, sources)
+
+@router.get("/jobs/{job_id}")
+async def get_extraction_job(*, job_id: UUID, user: User = Depends(get_user), db: db_dependency) -> ExtractionJobResponse:
+    """
+    Status of an async `create-transaction`; `result` is set once it's `done`,
+    `error` once it's `failed` (or the last attempt's error while it's retried).
+    """
+    return await get_job(db, job_id, user.id)
+
+@router.delete("/jobs/{job_id}")
+async def cancel_extraction_job(*, job_id: UUID, user: User = Depends(get_user), db: db_dependency) -> ExtractionJobResponse:
+    """
+    Cancels a queued or running job, 409 if it already finished.
+    """
+    return await cancel_job(db, job_id, user.id)
 
 @router.post("/add", status_code=status.HTTP_201_CREATED)
-def add_transaction(
+async def add_transaction(
     *, transaction: TransactionCreate, user: User = Depends(get_user), db: db_dependency
 ) -> TransactionResponse:
-    # TODO: need testing for this route as I have added the validation for payment methods.
-    payment_id = transaction.payment_source_id
     payment_type = transaction.payment_source_type
+    payment_source = await get_payment_source(payment_type, transaction.payment_source_id, user.id, db)
 
-    if payment_type == PaymentType.BANK:
-        payment_id = db.exec(select(Bank).filter(Bank.id == transaction.payment_source_id)).one()
-    elif payment_type == PaymentType.CARD:
-        payment_id = db.exec(select(Card).filter(Card.id == transaction.payment_source_id)).one()
-    elif payment_type == PaymentType.CASH:
-        payment_id = db.exec(select(Cash).filter(Cash.id == transaction.payment_source_id)).one()
-
-    if payment_id:
+    if payment_source:
         transaction = Transaction(
             amount=transaction.amount,
             category=transaction.category,
@@ -52,29 +179,194 @@ def add_transaction(
             date=transaction.date,
             description=transaction.description,
             user_id=user.id,
-            payment_source_id=payment_id,
+            payment_source_id=payment_source.id,
             payment_source_type=payment_type
         )
 
         db.add(transaction)
-        db.commit()
-        db.refresh(transaction)
+        await record_transactions(db, added=[transaction])
+        await apply_transactions(db, added=[transaction])
+        await touch_transactions(db, added=[transaction])
+        await db.commit()
+        await db.refresh(transaction)
 
         return transaction
     else:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND ,detail="payment id not found.")
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def add_transactions_bulk(
+    *,
+    transactions: Annotated[list[TransactionCreate], Body(max_length=BULK_LIMIT)],
+    user: User = Depends(get_user),
+    db: db_dependency
+) -> TransactionBulkResponse:
+    """
+    Inserts up to `TRANSACTION_BULK_LIMIT` transactions in one DB transaction.
+    Items whose payment source doesn't exist are skipped and reported,
+    the rest are inserted in batches of `BULK_BATCH_SIZE` rows.
+    """
+    requested = defaultdict(set)
+    for transaction in transactions:
+        requested[transaction.payment_source_type].add(transaction.payment_source_id)
+
+    owned = await get_owned_payment_sources(requested, user.id, db)
+
+    rows = []
+    results = []
+    now = datetime.now(timezone.utc)
+
+    for index, transaction in enumerate(transactions):
+        if (transaction.payment_source_type, transaction.payment_source_id) not in owned:
+            results.append(TransactionBulkResult(index=index, error="payment id not found."))
+            continue
+
+        transaction_id = uuid.uuid4()
+        rows.append({
+            "id": transaction_id,
+            "user_id": user.id,
+            "amount": transaction.amount,
+            "category": transaction.category,
+            "type": transaction.type.value,
+            "date": transaction.date,
+            "description": transaction.description,
+            "payment_source_id": transaction.payment_source_id,
+            "payment_source_type": transaction.payment_source_type,
+            "created_at": now,
+            "updated_at": now,
+        })
+        results.append(TransactionBulkResult(index=index, id=transaction_id))
+
+    for start in range(0, len(rows), BULK_BATCH_SIZE):
+        await db.exec(insert(Transaction), params=rows[start:start + BULK_BATCH_SIZE])
+
+    await record_transactions(db, added=rows)
+    await apply_transactions(db, added=rows)
+    await touch_transactions(db, added=rows)
+    await db.commit()
+
+    return TransactionBulkResponse(
+        created=len(rows),
+        failed=len(transactions) - len(rows),
+        results=results
+    )
+
+async def _insert_imported(rows: list[dict], db: AsyncSession) -> int:
+    """
+    Inserts a batch of imported rows, skipping the ones whose fingerprint is
+    already stored for the payment source. Returns how many were inserted.
+    """
+    statement = (
+        insert_on_conflict(Transaction.__table__)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["payment_source_id", "import_fingerprint"])
+        .returning(Transaction.__table__.c.id)
+    )
+    inserted = set((await db.exec(statement)).scalars())
+    rows = [row for row in rows if row["id"] in inserted]
+    await record_transactions(db, added=rows)
+    await apply_transactions(db, added=rows)
+    await touch_transactions(db, added=rows)
+    await db.commit()
+
+    return len(inserted)
+
+@router.post("/import", status_code=status.HTTP_201_CREATED)
+async def import_transactions(
+    *,
+    request: Request,
+    format: ImportFormat,
+    payment_source_type: PaymentType,
+    payment_source_id: UUID,
+    date_format: str | None = None,
+    mapping: Annotated[CsvColumnMapping, Depends()],
+    user: User = Depends(get_user),
+    db: db_dependency
+) -> TransactionImportResponse:
+    """
+    Imports a CSV, OFX or QIF statement sent as the raw request body into a
+    bank account or card.
+
+    The body is parsed as it streams in and rows are written in batches of
+    `TRANSACTION_IMPORT_BATCH_SIZE`, each committed on its own, so memory
+    stays flat whatever the file size. Every row is fingerprinted; rows that
+    were imported before are counted as duplicates instead of inserted, which
+    also makes retrying a failed import safe.
+
+    - date_format[Optional] -> strptime format of the dates in the file
+    - mapping -> CSV column names (ignored for OFX and QIF)
+    """
+    if payment_source_type == PaymentType.CASH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="statements can only be imported into a bank account or card.")
+
+    payment_source = await get_payment_source(payment_source_type, payment_source_id, user.id, db)
+
+    if not payment_source:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="payment id not found.")
+
+    fingerprint = Fingerprinter(payment_source.id)
+    parsed = imported = skipped = 0
+    errors = []
+    batch = []
+
+    try:
+        async for record in parse_statement(format, request.stream(), mapping, date_format):
+            if isinstance(record, RecordError):
+                skipped += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append(str(record))
+                continue
+
+            parsed += 1
+            now = datetime.now(timezone.utc)
+            batch.append({
+                "id": uuid.uuid4(),
+                "user_id": user.id,
+                "amount": abs(record.amount),
+                "category": record.category or "Imported",
+                "type": (TransactionType.EXPENSE if record.amount < 0 else TransactionType.INCOME).value,
+                "date": record.date,
+                "description": record.description,
+                "payment_source_id": payment_source.id,
+                "payment_source_type": payment_source_type,
+                "import_fingerprint": fingerprint(record),
+                "created_at": now,
+                "updated_at": now,
+            })
+
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += await _insert_imported(batch, db)
+                batch = []
+
+        if batch:
+            imported += await _insert_imported(batch, db)
+
+    except ValueError as e:
+        # malformed file as a whole (e.g. CSV header without the mapped columns).
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return TransactionImportResponse(
+        parsed=parsed,
+        imported=imported,
+        duplicates=parsed - imported,
+        skipped=skipped,
+        errors=errors
+    )
+
 @router.delete("/remove")
-def remove_transaction(*, transaction_id: Annotated[UUID, Body(embed=True)], user: User = Depends(get_user), db: db_dependency) -> dict[str, str]:
+async def remove_transaction(*, transaction_id: Annotated[UUID, Body(embed=True)], user: User = Depends(get_user), db: db_dependency) -> dict[str, str]:
     try:
-        transaction = db.exec(select(Transaction).filter(Transaction.id == transaction_id)).filter(Transaction.user_id == user.id).one() # searches for exactly only one record.
-        db.delete(transaction)
-        db.commit()
+        transaction = (await db.exec(select(Transaction).filter(Transaction.id == transaction_id).filter(Transaction.user_id == user.id))).one() # searches for exactly only one record.
+        await db.delete(transaction)
+        await record_transactions(db, removed=[transaction])
+        await apply_transactions(db, removed=[transaction])
+        await touch_transactions(db, removed=[transaction])
+        await db.commit()
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={
-                "id": transaction.id,
+                "id": str(transaction.id),
                 "message": "deleted successfully.",
             } 
         )
@@ -88,11 +380,12 @@ def remove_transaction(*, transaction_id: Annotated[UUID, Body(embed=True)], use
         )
 
 @router.patch("/update", status_code=status.HTTP_200_OK)
-def update_transaction(
+async def update_transaction(
     *, tid: UUID, update_data: TransactionUpdate, user: User = Depends(get_user), db: db_dependency
-): 
+) -> TransactionResponse:
     try:
-        transaction: Transaction = db.exec(select(Transaction).filter(Transaction.id == tid)).filter(Transaction.user_id == user.id).one() # searches for exactly only one record if it doesn't find it raises Exception
+        transaction: Transaction = (await db.exec(select(Transaction).filter(Transaction.id == tid).filter(Transaction.user_id == user.id))).one() # searches for exactly only one record if it doesn't find it raises Exception
+        previous = transaction.model_dump()
 
         if update_data.amount:
             transaction.amount = update_data.amount
@@ -102,7 +395,7 @@ def update_transaction(
             transaction.type = update_data.type.value
         if update_data.date:
             if update_data.date > datetime.now(timezone.utc):
-                db.rollback()
+                await db.rollback()
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="invalid transaction date."
@@ -111,48 +404,31 @@ def update_transaction(
         if update_data.description:
             transaction.description = update_data.description
         
-        if transaction.payment_source_type != update_data.payment_source_type:
-            if update_data.payment_source_type == PaymentType.BANK:
-                bank = db.exec(select(Bank).filter(Bank.id == update_data.payment_source_id)).first()
-
-                if not bank:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Bank not found"
-                    )
-
-                transaction.payment_source_id = bank.id
-                transaction.payment_source_type = PaymentType.BANK
-            
-            elif update_data.payment_source_id == PaymentType.CARD:
-                card = db.exec(select(Card).filter(Card.id == update_data.payment_source_id)).first()
-
-                if not card:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Card not found"
-                    )
-
-                transaction.payment_source_id = card.id
-                transaction.payment_source_type = PaymentType.CARD
-
-            elif update_data.payment_source_id == PaymentType.CASH:
-                cash = db.exec(select(Cash).filter(Cash.id == update_data.payment_source_id)).first()
-
-                if not cash:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Cash not found"
-                    )
-
-                transaction.payment_source_id = cash.id
-                transaction.payment_source_type = PaymentType.CASH
-            
-            db.add(transaction) 
-            db.commit()
-            db.refresh(transaction)
-
-            return TransactionResponse(**transaction.__dict__)
+        if (
+            transaction.payment_source_type != update_data.payment_source_type
+            or transaction.payment_source_id != update_data.payment_source_id
+        ):
+            payment_source = await get_payment_source(
+                update_data.payment_source_type, update_data.payment_source_id, user.id, db
+            )
+
+            if not payment_source:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"{update_data.payment_source_type.value} not found"
+                )
+
+            transaction.payment_source_id = payment_source.id
+            transaction.payment_source_type = update_data.payment_source_type
+
+        db.add(transaction) 
+        await record_transactions(db, added=[transaction], removed=[previous])
+        await apply_transactions(db, added=[transaction], removed=[previous])
+        await touch_transactions(db, added=[transaction], removed=[previous])
+        await db.commit()
+        await db.refresh(transaction)
+
+        return transaction
 
     except NoResultFound:
         return JSONResponse(
@@ -163,27 +439,30 @@ def update_transaction(
             }
         )
 
-@router.get("/")
-def get_transactions(
+@router.get("/", response_model=TransactionPage)
+async def get_transactions(
     *,
     user: User = Depends(get_user),
     payment_type: PaymentType | None = None,
     from_date: datetime | None = None,
     to_date: datetime | None = None,
-    n: int = 10,
+    n: Annotated[int, Query(ge=1, le=1000)] = 10,
+    cursor: str | None = None,
+    listing: Annotated[CachedListing, Depends(cached(Resource.TRANSACTIONS))],
     db: db_dependency
-) -> list[Transaction]:
+) -> Response:
     # TODO: test this route having error in date comparsion.
     # Handle offset value in the datetime while comparing.
     """
-    Fetches transactions from the db and filters it out
-    if no transactions found then just return `[]`
+    Fetches a page of transactions, newest first, and filters it out
+    if no transactions found then just return `items: []`
 
     - user -> User who is performing the transaction request
     - payment_type[Optional] -> One of the BANK or CARD or CASH
     - from_date[Optional]
     - to_date[Optional]
-    - n -> number of transactions to fetch with all the applied filters (DEFAULT: 10)
+    - n -> number of transactions per page with all the applied filters (DEFAULT: 10)
+    - cursor[Optional] -> `next_cursor` of the previous page, `null` when there are no more pages
     """
 
     if from_date and from_date > datetime.now(timezone.utc):
@@ -195,6 +474,9 @@ def get_transactions(
     if (from_date and to_date) and from_date > to_date:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid date filter")
 
+    if response := listing.response():
+        return response
+
     query = select(Transaction).filter(Transaction.user_id == user.id)
 
     if payment_type:
@@ -204,9 +486,176 @@ def get_transactions(
         query = query.filter(Transaction.date >= from_date)
     if to_date:
         query = query.filter(Transaction.date <= to_date)
-    
-    query = query.order_by(Transaction.created_at.desc()).limit(n)
 
-    transactions = db.exec(query).all()
+    if cursor:
+        # seek past the last row of the previous page instead of rescanning it.
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Transaction.created_at, Transaction.id) < (created_at, last_id))
+
+    query = query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(n + 1)
+
+    transactions = (await db.exec(query)).all()
+    next_cursor = None
+
+    if len(transactions) > n:
+        transactions = transactions[:n]
+        next_cursor = encode_cursor(transactions[-1].created_at, transactions[-1].id)
+
+    return await listing.store(
+        serialize(TransactionPage, {"items": transactions, "next_cursor": next_cursor}, headers=listing.headers)
+    )
+
+
+@router.get("/search", response_model=TransactionSearchPage)
+async def search_transactions(
+    *,
+    user: User = Depends(get_user),
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    payment_type: PaymentType | None = None,
+    from_date: datetime | None = None,
+    to_date: datetime | None = None,
+    n: Annotated[int, Query(ge=1, le=100)] = 10,
+    cursor: str | None = None,
+    listing: Annotated[CachedListing, Depends(cached(Resource.TRANSACTIONS))],
+    db: db_dependency
+) -> Response:
+    """
+    Transactions whose category or description contain every word of `q`,
+    best match first (category matches rank higher), then newest first.
+    Uses the full-text index (see search.py), so the cost depends on the
+    number of matches, not on the number of transactions.
+
+    - q -> words to look for, e.g. `uber` or `rent january`; end a word with `*` to match words starting with it (`ub*`)
+    - payment_type[Optional], from_date[Optional], to_date[Optional] -> as for `/transactions/`
+    - n -> number of transactions per page (DEFAULT: 10)
+    - cursor[Optional] -> `next_cursor` of the previous page, `null` when there are no more pages
+    """
+    words = terms(q)
+
+    if not words:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="no words to search for")
+
+    if (from_date and to_date) and from_date > to_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid date filter")
+
+    after = decode_search_cursor(cursor) if cursor else None
+
+    if response := listing.response():
+        return response
+
+    filters = []
+    if payment_type:
+        filters.append(Transaction.payment_source_type == payment_type)
+    if from_date:
+        filters.append(Transaction.date >= from_date)
+    if to_date:
+        filters.append(Transaction.date <= to_date)
+
+    rows = (await db.exec(search_query(user.id, words, filters, after).limit(n + 1))).all()
+    next_cursor = None
+
+    if len(rows) > n:
+        rows = rows[:n]
+        last, rank = rows[-1]
+        next_cursor = encode_search_cursor(rank, last.created_at, last.id)
+
+    items = [{**transaction.model_dump(), "rank": rank} for transaction, rank in rows]
+
+    return await listing.store(
+        serialize(TransactionSearchPage, {"items": items, "next_cursor": next_cursor}, headers=listing.headers)
+    )
+
+def _export_value(value):
+    if isinstance(value, PaymentType):
+        return value.value
+    if isinstance(value, (UUID, datetime)):
+        return str(value)
+
+    return value
+
+def _encode_ndjson(rows, header: bool) -> str:
+    names = [column.key for column in EXPORT_COLUMNS]
+
+    return "".join(
+        json.dumps(dict(zip(names, map(_export_value, row)))) + "\n"
+        for row in rows
+    )
+
+def _encode_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if header:
+        writer.writerow(column.key for column in EXPORT_COLUMNS)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+
+    return buffer.getvalue()
+
+async def _stream_export(query, format: ExportFormat, compress: bool) -> AsyncIterator[bytes]:
+    """
+    Streams the query through a server-side cursor, `EXPORT_BATCH_SIZE` rows
+    at a time, so only one batch is ever held in memory.
+
+    Uses its own session: the request's session is closed before a
+    streaming body is sent.
+    """
+    encode = _encode_csv if format == ExportFormat.CSV else _encode_ndjson
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> gzip container
+    header = True
+
+    async with async_session() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+        async for rows in result.partitions():
+            chunk = encode(rows, header).encode()
+            header = False
+
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+        if header and format == ExportFormat.CSV:
+            # no rows, still send the header.
+            chunk = encode([], header).encode()
+            yield compressor.compress(chunk) if compressor else chunk
+
+    if compressor:
+        yield compressor.flush()
+
+@router.get("/export")
+async def export_transactions(
+    *,
+    user: User = Depends(get_user),
+    format: ExportFormat = ExportFormat.NDJSON,
+    gzip: bool = False,
+    payment_type: PaymentType | None = None,
+    from_date: datetime | None = None,
+    to_date: datetime | None = None,
+) -> StreamingResponse:
+    """
+    Streams the user's whole transaction history, oldest first, as NDJSON or
+    CSV. Memory use doesn't grow with the size of the history.
+
+    - format -> `ndjson` (DEFAULT) or `csv`
+    - gzip -> gzip the body (sent with `Content-Encoding: gzip`)
+    - payment_type[Optional], from_date[Optional], to_date[Optional] -> same filters as `GET /transactions/`
+    """
+    query = select(*EXPORT_COLUMNS).filter(Transaction.user_id == user.id)
+
+    if payment_type:
+        query = query.filter(Transaction.payment_source_type == payment_type)
+    if from_date:
+        query = query.filter(Transaction.date >= from_date)
+    if to_date:
+        query = query.filter(Transaction.date <= to_date)
+
+    query = query.order_by(Transaction.created_at, Transaction.id)
+
+    media_type = "text/csv" if format == ExportFormat.CSV else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="transactions.{format.value}"'}
+
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
 
-    return transactions
+    return StreamingResponse(_stream_export(query, format, gzip), media_type=media_type, headers=headers)
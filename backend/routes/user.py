@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from sqlmodel import select
 from models.user import User, UserData
-from .utils import get_user, bcrypt_context
+from models.payment import Currency
+from .utils import get_user, invalidate_user
+from passwords import hash_password, verify_password
 from db import db_dependency
 from typing import Annotated 
 from sqlalchemy.exc import NoResultFound
@@ -19,14 +21,17 @@ async def get_user_info(user: User = Depends(get_user)) -> UserData:
 async def update_password(
     *, user: User = Depends(get_user), new_password: Annotated[str, Body()], db: db_dependency
 ) -> dict[str, str]:
-    if bcrypt_context.verify(new_password, user.hashed_password):
+    same_password, _ = await verify_password(new_password, user.hashed_password)
+
+    if same_password:
         raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, detail="Create New password that is unlike your old password.")
 
-    user.hashed_password = bcrypt_context.hash(new_password) 
+    user.hashed_password = await hash_password(new_password)
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user.id)
 
     return {"message": "password updated successfully"}
 
@@ -34,7 +39,7 @@ async def update_password(
 async def update_email(
     *, user: User = Depends(get_user), new_email: Annotated[str, Body()], db: db_dependency
 ) -> dict[str, str]:
-    email_exists = db.exec(select(User).filter(User.email == new_email)).first()
+    email_exists = (await db.exec(select(User).filter(User.email == new_email))).first()
 
     if email_exists:
         raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, detail="email already exists.")
@@ -42,21 +47,40 @@ async def update_email(
     user.email = new_email
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user.id)
 
     return {"message": "email updated successfully"}
 
+@router.post("/update/base-currency")
+async def update_base_currency(
+    *, user: User = Depends(get_user), base_currency: Annotated[Currency, Body(embed=True)], db: db_dependency
+) -> UserData:
+    """
+    The currency that dashboard and summary totals across currencies are
+    converted to.
+    """
+    user.base_currency = base_currency
+
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user.id)
+
+    return user
+
 @router.delete("/close-account")
-def close_account(*, user: User = Depends(get_user), db: db_dependency) -> dict[str, str]:
+async def close_account(*, user: User = Depends(get_user), db: db_dependency) -> dict[str, str]:
     try:
-        user = db.exec(select(User).filter(User.id == user.id)).one()
+        user = (await db.exec(select(User).filter(User.id == user.id))).one()
 
-        db.delete(user)
-        db.commit()
+        await db.delete(user)
+        await db.commit()
+        invalidate_user(user.id)
 
         return {
-            "id": user.id,
+            "id": str(user.id),
             "message": "account deleted successfully.",
         }
     except NoResultFound:
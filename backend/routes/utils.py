@@ -1,15 +1,24 @@
-from fastapi import Depends, status, HTTPException
+from fastapi import Depends, Request, Response, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import select, Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import delete
+from sqlalchemy.orm import make_transient_to_detached
 from models.user import User
 from models.token import TokenData, Token
+from models.version import Resource, ResourceVersion
 from typing import Annotated
-from db import db_dependency 
+from collections.abc import Awaitable, Callable
+from db import db_dependency, insert_on_conflict
 from jwt import encode, decode
 from jwt.exceptions import InvalidTokenError, ExpiredSignatureError
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from email.utils import format_datetime, parsedate_to_datetime
+from cache import TTLCache, ExpiringSet
+from response_cache import response_cache
+import base64
+import hashlib
 import os
 import uuid
 
@@ -22,24 +31,61 @@ ALGORITHM = "HS256"
 TIMEDELTAHOURS = 2
 
 oauth2_scheme =  OAuth2PasswordBearer(tokenUrl="auth/login")
-bcrypt_context = CryptContext(schemes=["bcrypt"])
 
 
-def validate_token(token: str, db: Session) -> TokenData | None:
-    try:
-        blacklist_token = db.exec(select(Token).filter(Token.token == token)).first()
+token_claims_cache = TTLCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", 10_000)))
+revoked_tokens = ExpiringSet()
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", 10_000)),
+    ttl=float(os.getenv("USER_CACHE_TTL", 60))
+)
 
-        if blacklist_token:
-            return None
-        
+BLACKLIST_PURGE_BATCH = int(os.getenv("BLACKLIST_PURGE_BATCH", 10_000))
+# how far back each sync re-reads; longer than a logout takes to commit,
+# plus any clock skew between API hosts.
+BLACKLIST_SYNC_LOOKBACK_SECONDS = float(os.getenv("BLACKLIST_SYNC_LOOKBACK_SECONDS", 5 * 60))
+
+_blacklist_synced_at: datetime | None = None
+
+# version of what else a listing depends on, and when its parts changed; see `conditional`.
+ExtraVersion = Callable[[AsyncSession, User], Awaitable[tuple[str, list[datetime]]]]
+
+
+def revocation_key(payload: dict, token: str) -> str:
+    """
+    sha256 of the token's `jti`, the key a revoked token is stored and
+    looked up by. Tokens issued before `jti` was added use their full text.
+    """
+    return hashlib.sha256((payload.get("jti") or token).encode()).hexdigest()
+
+def validate_token(token: str) -> TokenData | None:
+    """
+    Verifies the token in memory. The decoded claims are cached until the
+    token expires and revocation is checked against `revoked_tokens`, so
+    validating a token never touches the database.
+    """
+    cached = token_claims_cache.get(token)
+
+    if cached:
+        token_data, key = cached
+        return None if key in revoked_tokens else token_data
+
+    try:
         payload = decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         if not payload.get("sub") or not payload.get("user_id"):
             return None
 
-        return TokenData(
+        token_data = TokenData(
             email=payload.get("sub"),
             user_id=payload.get("user_id")
         )
+        key = revocation_key(payload, token)
+        token_claims_cache.set(token, (token_data, key), expires_at=payload["exp"])
+
+        if key in revoked_tokens:
+            return None
+
+        return token_data
 
     except ExpiredSignatureError:
         return None
@@ -47,42 +93,264 @@ def validate_token(token: str, db: Session) -> TokenData | None:
     except InvalidTokenError:
         return None
 
-def blacklist_token(token: str, db: Session):
-    token_exists = db.exec(select(Token).filter(Token.token == token)).first()
+async def sync_token_blacklist(db: AsyncSession) -> int:
+    """
+    Loads unexpired blacklist rows (added by this or any other worker) into
+    `revoked_tokens`: all of them on the first sync, after that the ones
+    inserted since `BLACKLIST_SYNC_LOOKBACK_SECONDS` before the previous
+    sync. Rows become visible when their transaction commits, not in the
+    order they were inserted, so the window overlaps instead of following
+    the highest id seen. Returns the number of rows read.
+    """
+    global _blacklist_synced_at
 
-    if token_exists:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token")
+    now = datetime.now(timezone.utc)
+    query = select(Token.jti_hash, Token.expires_at).filter(Token.expires_at > now)
+
+    if _blacklist_synced_at:
+        query = query.filter(Token.created_at > _blacklist_synced_at - timedelta(seconds=BLACKLIST_SYNC_LOOKBACK_SECONDS))
+
+    rows = (await db.exec(query)).all()
+
+    for jti_hash, expires_at in rows:
+        # SQLite hands back naive datetimes; they were stored as UTC.
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        revoked_tokens.add(jti_hash, expires_at.timestamp())
+
+    _blacklist_synced_at = now
+
+    return len(rows)
+
+async def purge_expired_tokens(db: AsyncSession, batch_size: int = BLACKLIST_PURGE_BATCH) -> int:
+    """
+    Deletes blacklist rows of tokens that have expired, `batch_size` rows
+    per statement so the table is never locked for long. Returns the number
+    of rows deleted.
+    """
+    now = datetime.now(timezone.utc)
+    deleted = 0
 
+    while True:
+        expired = select(Token.id).filter(Token.expires_at < now).limit(batch_size)
+        result = await db.exec(delete(Token).filter(Token.id.in_(expired)))
+        await db.commit()
+
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+async def blacklist_token(token: str, db: AsyncSession):
     payload = decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    expries_at = datetime.fromtimestamp(payload.get("exp"))
-    expire_token = Token(
-        token=token,
-        expries_at=expries_at
+    key = revocation_key(payload, token)
+
+    if key in revoked_tokens:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token")
+
+    # revoking the same token twice (two workers, a retried logout) is a no-op.
+    await db.exec(
+        insert_on_conflict(Token)
+        .values(
+            jti_hash=key,
+            expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+            created_at=datetime.now(timezone.utc),
+        )
+        .on_conflict_do_nothing(index_elements=["jti_hash"])
     )
-    db.add(expire_token)
-    db.commit()
-    db.refresh(expire_token)
+    await db.commit()
+
+    revoked_tokens.add(key, payload["exp"])
+
+def _cache_user(user: User) -> None:
+    user_cache.set(user.id, {column.name: getattr(user, column.name) for column in User.__table__.columns})
+
+def _cached_user(user_id: uuid.UUID) -> User | None:
+    """
+    Builds a fresh detached `User` from the cached row, so every request gets
+    its own instance that can be `db.add`-ed and updated like a loaded one.
+    """
+    data = user_cache.get(user_id)
+
+    if data is None:
+        return None
+
+    user = User(**data)
+    make_transient_to_detached(user)
+
+    return user
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    user_cache.pop(user_id)
 
-def get_user(token: Annotated[str, Depends(oauth2_scheme)], db: db_dependency) -> User:
-    token_data = validate_token(token, db)
+async def get_user(token: Annotated[str, Depends(oauth2_scheme)], db: db_dependency) -> User:
+    token_data = validate_token(token)
 
     if not token_data:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authenticated")
-    
-    user: User = db.exec(select(User).filter(User.id == token_data.user_id)).first()
+
+    user = _cached_user(token_data.user_id)
+
+    if user:
+        return user
+
+    user: User = (await db.exec(select(User).filter(User.id == token_data.user_id))).first()
 
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
+    _cache_user(user)
+
     return user
     
 def generate_jwt_token(user_id: uuid.UUID, user_email: str, time_delta: timedelta) -> str:
     payload = {
         "sub": user_email,
         "user_id": str(user_id),
+        "jti": uuid.uuid4().hex,
         "exp": datetime.now(timezone.utc) + time_delta
     }
 
     token = encode(payload=payload, algorithm=ALGORITHM, key=SECRET_KEY)
 
     return token
+
+def encode_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{id.hex}"
+
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, id = raw.split("|")
+
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+
+def encode_search_cursor(rank: float, created_at: datetime, id: uuid.UUID) -> str:
+    # repr keeps every digit, so the next page starts exactly after this row.
+    raw = f"{rank!r}|{created_at.isoformat()}|{id.hex}"
+
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> tuple[float, datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        rank, created_at, id = raw.split("|")
+
+        return float(rank), datetime.fromisoformat(created_at), uuid.UUID(id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # weak comparison, as If-None-Match asks for.
+    if if_none_match.strip() == "*":
+        return True
+
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def _not_modified_since(if_modified_since: str | None, updated_at: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    # HTTP dates have whole seconds.
+    return since.tzinfo is not None and updated_at.replace(microsecond=0) <= since
+
+def conditional(*resources: Resource, extra: ExtraVersion | None = None):
+    """
+    Dependency for a GET listing of the user's `resources` (see versions.py).
+    Answers 304 before the route runs when the client's `If-None-Match`, or
+    else `If-Modified-Since`, shows its copy is current. Otherwise sets
+    `ETag` and `Last-Modified` on the response and returns them, for routes
+    that build their own `Response` to pass on.
+
+    The versions are read before the route loads any rows, so a write in
+    between can only make the ETag older than the data, never newer.
+
+    `extra(db, user)`, for listings that also depend on something else,
+    returns that thing's version and when its parts last changed.
+    """
+    async def check(request: Request, response: Response, db: db_dependency, user: User = Depends(get_user)) -> dict[str, str]:
+        rows = (await db.exec(
+            select(ResourceVersion.resource, ResourceVersion.version, ResourceVersion.updated_at)
+            .filter(ResourceVersion.user_id == user.id)
+            .filter(ResourceVersion.resource.in_([resource.value for resource in resources]))
+        )).all()
+        versions = {row.resource: row.version for row in rows}
+        changes = [row.updated_at for row in rows]
+
+        # per user, so a browser shared by two accounts never revalidates one's copy for the other.
+        tag = ",".join(f"{resource.value}:{versions.get(resource.value, 0)}" for resource in resources)
+
+        if extra:
+            extra_version, extra_changes = await extra(db, user)
+            tag = f"{tag};{extra_version}"
+            changes.extend(extra_changes)
+
+        # sqlite hands back naive datetimes, which are UTC already.
+        updated_at = max(
+            (change.replace(tzinfo=change.tzinfo or timezone.utc).astimezone(timezone.utc) for change in changes),
+            default=None,
+        )
+        etag = hashlib.sha256(f"{user.id}:{tag}".encode()).hexdigest()[:32]
+        headers = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+        if updated_at:
+            headers["Last-Modified"] = format_datetime(updated_at, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, headers["ETag"])
+        else:
+            not_modified = updated_at is not None and _not_modified_since(request.headers.get("if-modified-since"), updated_at)
+
+        if not_modified:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+
+        return headers
+
+    return check
+
+class CachedListing:
+    """
+    A listing's cached body, if any, and where to store a freshly built one.
+    """
+
+    def __init__(self, key: str, headers: dict[str, str], body: bytes | None):
+        self.key = key
+        self.headers = headers
+        self.body = body
+
+    def response(self) -> Response | None:
+        if self.body is None:
+            return None
+
+        return Response(content=self.body, headers=self.headers, media_type="application/json")
+
+    async def store(self, response: Response) -> Response:
+        if response.status_code == status.HTTP_200_OK:
+            await response_cache.set(self.key, response.body)
+
+        return response
+
+def cached(*resources: Resource, extra: ExtraVersion | None = None):
+    """
+    `conditional`, plus the body cached for these versions of the listing and
+    the request's path and query (see response_cache.py). Routes return
+    `listing.response()` when there is one, else build the response and
+    pass it through `listing.store`.
+    """
+    check = conditional(*resources, extra=extra)
+
+    async def lookup(request: Request, headers: Annotated[dict, Depends(check)]) -> CachedListing:
+        key = response_cache.key(headers["ETag"], request.url.path, request.query_params)
+
+        return CachedListing(key, headers, await response_cache.get(key))
+
+    return lookup
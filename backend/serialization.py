@@ -0,0 +1,38 @@
+"""
+JSON responses built straight from ORM rows.
+
+FastAPI validates whatever a handler returns against its return type and
+then encodes it, so copying a row into a response model first
+(`CardResponse(**card.__dict__)`) validates every row twice. Handlers return
+the row itself instead: the response models are SQLModels, which read
+attributes, so FastAPI validates it once.
+
+List endpoints go one step further and return `serialize(...)`: rows are
+validated once from their attributes and rendered to JSON by pydantic-core,
+and FastAPI sends the response as is. Such routes declare their model with
+`response_model=` to keep it in the OpenAPI schema.
+
+Everything else is encoded with orjson, the app's `default_response_class`.
+"""
+from fastapi import Response
+from pydantic import TypeAdapter
+from functools import cache
+from typing import Any, Mapping
+
+
+@cache
+def adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+def dump_json(schema: Any, value: Any) -> bytes:
+    schema_adapter = adapter(schema)
+
+    return schema_adapter.dump_json(schema_adapter.validate_python(value, from_attributes=True))
+
+def serialize(schema: Any, value: Any, status_code: int = 200, headers: Mapping[str, str] | None = None) -> Response:
+    return Response(
+        content=dump_json(schema, value),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -0,0 +1,40 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db import ASYNC_DB_URL
+from models import Token
+from routes import utils
+
+
+def test_sync_picks_up_rows_committed_out_of_id_order(client, monkeypatch):
+    monkeypatch.setattr(utils, "_blacklist_synced_at", None)
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(hours=1)
+    early, late = uuid.uuid4().hex, uuid.uuid4().hex
+
+    async def run():
+        engine = create_async_engine(ASYNC_DB_URL)
+        try:
+            async with AsyncSession(engine) as db:
+                await utils.sync_token_blacklist(db)
+                base = 1_000_000 + uuid.uuid4().int % 1_000_000
+
+                # two logouts insert with ids base and base + 1; the second commits first.
+                db.add(Token(id=base + 1, jti_hash=late, expires_at=expires_at, created_at=now))
+                await db.commit()
+                await utils.sync_token_blacklist(db)
+                assert late in utils.revoked_tokens
+
+                db.add(Token(id=base, jti_hash=early, expires_at=expires_at, created_at=now - timedelta(seconds=1)))
+                await db.commit()
+                await utils.sync_token_blacklist(db)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+    assert early in utils.revoked_tokens
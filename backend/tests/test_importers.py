@@ -0,0 +1,38 @@
+import asyncio
+
+from importers import ImportedRecord, RecordError
+from importers.csv_parser import MAX_RECORD_LENGTH, parse_csv
+from models import CsvColumnMapping
+
+
+async def chunks(data: bytes):
+    yield data
+
+def parse(data: bytes, mapping: CsvColumnMapping | None = None) -> list:
+    async def collect():
+        return [record async for record in parse_csv(chunks(data), mapping or CsvColumnMapping(description="description"))]
+
+    return asyncio.run(collect())
+
+
+def test_short_row_is_a_record_error():
+    records = parse(b"date,amount,description\n2024-01-01,-5,coffee\n2024-01-02\n2024-01-03,7,refund\n")
+
+    assert [type(record) for record in records] == [ImportedRecord, RecordError, ImportedRecord]
+    assert "record 2: missing column amount" in str(records[1])
+
+def test_short_row_with_debit_and_credit_columns():
+    mapping = CsvColumnMapping(amount=None, debit="debit", credit="credit")
+    records = parse(b"date,debit,credit\n2024-01-01,5,\n2024-01-02,5\n", mapping)
+
+    assert records[0].amount == -5
+    assert isinstance(records[1], RecordError)
+    assert "missing column credit" in str(records[1])
+
+def test_unmatched_quote_doesnt_swallow_the_file():
+    rows = b"".join(b"2024-01-02,-1,row %d\n" % i for i in range(MAX_RECORD_LENGTH // 10))
+    records = parse(b'date,amount,description\n2024-01-01,-5,"unclosed\n' + rows)
+
+    assert isinstance(records[0], RecordError)
+    assert "unmatched quote" in str(records[0])
+    assert any(isinstance(record, ImportedRecord) for record in records[1:])
@@ -0,0 +1,56 @@
+import uuid
+
+import pytest
+
+
+@pytest.mark.parametrize("resolution", ["day", "week", "month", "year"])
+def test_balances_reject_too_many_periods(client, auth, resolution):
+    response = client.get("/api/v1/summary/balances", headers=auth, params={
+        "from_date": "0001-01-01", "to_date": "9999-12-31", "resolution": resolution,
+    })
+
+    assert response.status_code == 400
+
+def test_balances_up_to_the_last_date(client, auth):
+    response = client.get("/api/v1/summary/balances", headers=auth, params={
+        "from_date": "9990-06-01", "to_date": "9999-12-31", "resolution": "year",
+    })
+
+    assert response.status_code == 200
+    assert response.json()["periods"][-1] == "9999-01-01"
+
+def test_totals_are_converted_to_one_currency(client, auth):
+    client.put("/api/v1/admin/fx-rates", headers={"X-Admin-Token": "test-admin-token"}, json=[
+        {"day": "2024-01-01", "currency": "INR", "per_usd": 80.0},
+    ]).raise_for_status()
+
+    sources = {}
+    for currency in ("INR", "USD"):
+        bank = client.post("/api/v1/payment/banks/", headers=auth, json={
+            "name": f"{currency} bank", "account_no": uuid.uuid4().hex, "currency": currency,
+        })
+        bank.raise_for_status()
+        sources[currency] = bank.json()["id"]
+
+    for currency, amount in (("INR", 800.0), ("USD", 10.0)):
+        client.post("/api/v1/transactions/add", headers=auth, json={
+            "amount": amount, "category": "groceries", "type": "Expense", "date": "2024-01-05T10:00:00Z",
+            "payment_source_id": sources[currency], "payment_source_type": "Bank",
+        }).raise_for_status()
+
+    def categories(currency: str) -> list[dict]:
+        response = client.get("/api/v1/summary/categories", headers=auth, params={"currency": currency})
+        response.raise_for_status()
+        return response.json()
+
+    assert categories("USD") == [{"category": "groceries", "type": "Expense", "currency": "USD", "total": 20.0, "count": 2}]
+    assert categories("INR")[0]["total"] == 1600.0
+    # no rate for euros.
+    assert categories("EUR")[0]["total"] is None
+
+    spending = client.get("/api/v1/summary/spending", headers=auth, params={"period": "day", "currency": "USD"}).json()
+    assert [(row["period_start"], row["total"]) for row in spending] == [("2024-01-05", 20.0)]
+
+    # the rupee account's transactions count in dollars from now on.
+    client.patch(f"/api/v1/payment/banks/{sources['INR']}", headers=auth, json={"currency": "USD"}).raise_for_status()
+    assert categories("USD")[0]["total"] == 810.0
@@ -0,0 +1,44 @@
+import uuid
+
+from models import TransactionResponse
+
+
+def create_bank(client, auth) -> dict:
+    bank = client.post("/api/v1/payment/banks/", headers=auth, json={
+        "name": "test bank", "account_no": uuid.uuid4().hex,
+    })
+    bank.raise_for_status()
+
+    return {"payment_source_id": bank.json()["id"], "payment_source_type": "Bank"}
+
+
+def test_update_returns_transaction_response(client, auth):
+    source = create_bank(client, auth)
+    added = client.post("/api/v1/transactions/add", headers=auth, json={
+        "amount": 120.0, "category": "groceries", "type": "Expense", **source,
+    })
+    added.raise_for_status()
+
+    response = client.patch(
+        "/api/v1/transactions/update",
+        headers=auth,
+        params={"tid": added.json()["id"]},
+        json={"amount": 80.0, "category": "dining", "type": "Expense", **source},
+    )
+
+    assert response.status_code == 200
+    assert set(response.json()) == set(TransactionResponse.model_fields)
+    assert response.json()["amount"] == 80.0
+    assert response.json()["category"] == "dining"
+
+def test_import_skips_short_csv_rows(client, auth):
+    response = client.post(
+        "/api/v1/transactions/import",
+        headers=auth,
+        params={"format": "csv", "description": "description", **create_bank(client, auth)},
+        content=b"date,amount,description\n2024-01-01,-5,coffee\n2024-01-02\n",
+    )
+
+    assert response.status_code == 201
+    assert response.json()["imported"] == 1
+    assert response.json()["skipped"] == 1
@@ -0,0 +1,60 @@
+"""
+Per user versions of the listings clients poll, behind their ETags.
+
+Every write path calls `touch` (or `touch_transactions`, next to
+`record_transactions` and `apply_transactions`) before committing, so the
+version changes in the same DB transaction as the data. A poll then only
+reads one `ResourceVersion` row to tell whether its copy is current; see
+`routes.utils.conditional`.
+"""
+from collections.abc import Iterable, Mapping
+from datetime import datetime, timezone
+from uuid import UUID
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db import insert_on_conflict
+from models import PaymentType, Resource, ResourceVersion, Transaction
+
+SOURCE_RESOURCES = {
+    PaymentType.BANK: Resource.BANK,
+    PaymentType.CARD: Resource.CARD,
+    PaymentType.CASH: Resource.CASH,
+}
+
+
+async def touch(db: AsyncSession, user_id: UUID, *resources: Resource) -> None:
+    """
+    Bumps the version of the user's `resources`.
+    Doesn't commit; the caller commits it along with the change.
+    """
+    now = datetime.now(timezone.utc)
+    table = ResourceVersion.__table__
+    # sorted, so concurrent requests lock version rows in the same order.
+    statement = insert_on_conflict(table).values([
+        {"user_id": user_id, "resource": resource.value, "version": 1, "updated_at": now}
+        for resource in sorted(set(resources), key=lambda resource: resource.value)
+    ])
+
+    await db.exec(statement.on_conflict_do_update(
+        index_elements=["user_id", "resource"],
+        set_={"version": table.c.version + 1, "updated_at": statement.excluded.updated_at},
+    ))
+
+def _field(transaction: Transaction | Mapping, name: str):
+    if isinstance(transaction, Mapping):
+        return transaction[name]
+
+    return getattr(transaction, name)
+
+async def touch_transactions(db: AsyncSession, added: Iterable = (), removed: Iterable = ()) -> None:
+    """
+    Bumps the transaction listing and, since their balances change, the
+    payment source listings of the users of `added` and `removed`.
+    """
+    resources = {}
+
+    for transaction in (*added, *removed):
+        user_resources = resources.setdefault(_field(transaction, "user_id"), {Resource.TRANSACTIONS})
+        user_resources.add(SOURCE_RESOURCES[PaymentType(_field(transaction, "payment_source_type"))])
+
+    for user_id, user_resources in sorted(resources.items()):
+        await touch(db, user_id, *user_resources)